@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+
+from campus_index import CAMPUSES, segment_topk
+
+ANN_FORMAT_VERSION = 2
+
+
+def spherical_kmeans(x, n_lists, n_iter=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=n_lists)
+        empty = counts == 0
+        # reseed empty lists with random points so every list stays usable
+        sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32), np.argmax(x @ centroids.T, axis=1)
+
+
+class IVFIndex:
+    """Inverted-file ANN index over a CampusEmbeddingIndex.
+
+    Every campus block gets its own coarse centroids, so the campus filter is
+    free: a query only probes the lists of the campuses it asks for. Lists are
+    stored CSR-style (`list_indptr`, `list_members`) as positions into the
+    campus-sorted matrix of the exact index, which is reused for scoring.
+    """
+
+    def __init__(self, base, centroids, centroid_offsets, list_indptr, list_members, nprobe=16):
+        self.base = base
+        self.matrix = base.matrix.numpy() if base.is_torch else base.matrix
+        self.centroids = centroids
+        self.centroid_offsets = centroid_offsets
+        self.list_indptr = list_indptr
+        self.list_members = list_members
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, base, lists_per_sqrt=4, n_iter=10, seed=0):
+        matrix = base.matrix.numpy() if base.is_torch else base.matrix
+        centroids, offsets, indptr, members = [], {}, [0], []
+        n_centroids = 0
+        for campus, (start, end) in sorted(base.offsets.items()):
+            block = np.asarray(matrix[start:end], dtype=np.float32)
+            n_lists = max(1, min(len(block), int(lists_per_sqrt * np.sqrt(len(block)))))
+            c, assign = spherical_kmeans(block, n_lists, n_iter=n_iter, seed=seed)
+            order = np.argsort(assign, kind='stable')
+            counts = np.bincount(assign, minlength=n_lists)
+            centroids.append(c)
+            members.append((order + start).astype(np.int32))
+            indptr.extend((np.cumsum(counts) + indptr[-1]).tolist())
+            offsets[campus] = (n_centroids, n_centroids + n_lists)
+            n_centroids += n_lists
+        return cls(base, np.concatenate(centroids), offsets,
+                   np.asarray(indptr, dtype=np.int64), np.concatenate(members))
+
+    def save(self, path):
+        campuses = sorted(self.centroid_offsets)
+        # the lists are only valid for the vectors they were clustered from
+        np.savez(path, version=ANN_FORMAT_VERSION, n_rows=len(self.base), source=str(self.base.source_digest),
+                 centroids=self.centroids,
+                 list_indptr=self.list_indptr, list_members=self.list_members,
+                 campuses=np.array(campuses),
+                 centroid_offsets=np.array([self.centroid_offsets[c] for c in campuses], dtype=np.int64),
+                 row_offsets=np.array([self.base.offsets[c] for c in campuses], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path, base, nprobe=16):
+        with np.load(path) as f:
+            if int(f['version']) != ANN_FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported ANN index version {int(f['version'])}")
+            campuses = [str(c) for c in f['campuses']]
+            row_offsets = {c: tuple(int(v) for v in o) for c, o in zip(campuses, f['row_offsets'])}
+            if int(f['n_rows']) != len(base) or row_offsets != base.offsets:
+                raise ValueError(f"{path} was built for a different catalog; rebuild it with build_ann_index.py")
+            if str(f['source']) != str(base.source_digest):
+                raise ValueError(f"{path} was built from different embeddings; rebuild it with build_ann_index.py")
+            offsets = {c: tuple(int(v) for v in o) for c, o in zip(campuses, f['centroid_offsets'])}
+            return cls(base, f['centroids'], offsets, f['list_indptr'], f['list_members'], nprobe=nprobe)
+
+    def candidates(self, q, campus, nprobe):
+        start, end = self.centroid_offsets[campus]
+        probe = segment_topk((self.centroids[start:end] @ q)[None, :], nprobe)[0][0] + start
+        return np.concatenate([self.list_members[self.list_indptr[l]:self.list_indptr[l + 1]] for l in probe])
+
+    def search(self, rows, k=5, campuses=CAMPUSES, exclude=None, nprobe=None):
+        nprobe = nprobe or self.nprobe
+        pos = self.base.positions[np.atleast_1d(np.asarray(rows, dtype=np.int64))]
+        results = []
+        for q in self.matrix[pos]:
+            res = {}
+            for c in campuses:
+                if c == exclude or c not in self.centroid_offsets:
+                    res[c] = []
+                    continue
+                cand = self.candidates(q, c, nprobe)
+                top, top_scores = segment_topk((self.matrix[cand] @ q)[None, :], k)
+                res[c] = list(zip(self.base.row_ids[cand[top[0]]].tolist(), top_scores[0].tolist()))
+            results.append(res)
+        return results
+
+
+def ann_index_path(embedding_path):
+    return os.path.splitext(embedding_path)[0] + '.ivf.npz'
@@ -1,26 +1,69 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import pandas as pd
-import networkx as nx
-import re
-import plotly.graph_objects as go
-import json
-import plotly.utils
 import numpy as np
 import os
 import traceback
 import gc
+import time
 
 import torch 
-from sentence_transformers import util
 import boto3
 
+from campus_index import CAMPUSES, CampusEmbeddingIndex, vectors_digest
+from catalog_index import CatalogIndex, load_catalog_csv
+from prereq_parser import normalize_course_id, parse_prerequisite_column
+from prereq_graph import build_campus_graphs, EMPTY_GRAPH, KIND_NAMES, LOGIC
+from prereq_closure import PrereqClosure
+from prereq_unlocks import UnlockIndex
+from course_planner import CoursePlanner
+from text_index import TextIndex, top_rows
+from prefix_index import PrefixIndex, query_key
+from graph_export import FORMATS, columnar_graph, dumps, pack_binary, plotly_figure
+from ann_index import IVFIndex, ann_index_path
+from embedding_store import QuantizedCampusIndex
+from neighbor_table import NeighborTable, catalog_digest
+from snapshot import file_digest, load_snapshot, save_snapshot
+from response_cache import ResponseCache
+from course_vectors import catalog_hashes, check_alignment, read_vectors, texts_digest
+from query_encoder import QueryEncoder
+
+SEARCH_MODE = os.getenv("SEARCH_MODE", "table")
+CATALOG_CSV = '/app/combined_CLEAN.csv'
+EMBEDDING_STORE = '/app/course_embeddings.q8'
+EMBEDDING_VECTORS = '/app/course_embeddings.vec'
+NEIGHBOR_TABLE = '/app/course_neighbors.knn'
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "/app/startup.snapshot")
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "2048"))
+RESPONSE_CACHE_MB = int(os.getenv("RESPONSE_CACHE_MB", "64"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+UNLOCKS_MAX_PAGE = int(os.getenv("UNLOCKS_MAX_PAGE", "500"))
+PLAN_MAX_PER_TERM = int(os.getenv("PLAN_MAX_PER_TERM", "8"))
+QUERY_MAX_RESULTS = int(os.getenv("QUERY_MAX_RESULTS", "100"))
+AUTOCOMPLETE_MAX = int(os.getenv("AUTOCOMPLETE_MAX", "50"))
+# text encoder for /api/match and fused /api/query, loaded on first use
+QUERY_ENCODER = os.getenv("QUERY_ENCODER", "1") != "0"
+QUERY_ENCODER_MODEL = os.getenv("QUERY_ENCODER_MODEL", "BAAI/bge-base-en-v1.5")
+QUERY_ENCODER_DIR = os.getenv("QUERY_ENCODER_DIR", "/app/query_encoder")
+QUERY_CACHE_ENTRIES = int(os.getenv("QUERY_CACHE_ENTRIES", "1024"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "16"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("QUERY_BATCH_WAIT_MS", "2"))
+QUERY_MAX_TOKENS = int(os.getenv("QUERY_MAX_TOKENS", "256"))
+QUERY_ENCODE_TIMEOUT = float(os.getenv("QUERY_ENCODE_TIMEOUT", "10"))
+# None: the worker's share, known only after gunicorn forks (see gunicorn.conf.py)
+QUERY_ENCODER_THREADS = int(os.getenv("TORCH_THREADS", "0")) or None
+MATCH_MAX_CHARS = int(os.getenv("MATCH_MAX_CHARS", "20000"))
+# reciprocal rank fusion: rank r in either list adds 1 / (RRF_K + r)
+RRF_K = 60
+FUSION_DEPTH = 100
+FUSION_FEEDBACK = 5
+
 def download_embeddings_from_s3():
     bucket = "uc-course-embeddings"  
     key = "course_embeddings.pt"
     local_path = "/app/course_embeddings.pt"
 
-    if not os.path.exists(local_path):
+    if not any(os.path.exists(p) for p in (local_path, EMBEDDING_STORE, EMBEDDING_VECTORS)):
         print("Downloading embeddings from S3...")
         s3 = boto3.client(
             's3',
@@ -39,353 +82,644 @@ app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 print("Initialize server...")
+# everything in the snapshot comes from the CSV; which embedding file gets used is only known once it has loaded
+snapshot_key = file_digest([CATALOG_CSV])
+snapshot = None
 try:
-    cols_to_keep = ['Campus', 'Subject_Code', 'Course_Code', 'Title', 'Prerequisite(s)', 'Course Description']
-    df = pd.read_csv('/app/combined_CLEAN.csv', usecols=lambda c: c in cols_to_keep)
-    df['Campus'] = df['Campus'].str.upper().str.strip()
-    print(f"Loading CSV success，共 {len(df)} 行")
+    snapshot = load_snapshot(SNAPSHOT_PATH, snapshot_key)
 except Exception as e:
-    print(f"Loading CSV fail: {e}")
-    df = pd.DataFrame()
+    print(f"Loading snapshot error: {e}")
+
+if snapshot is not None:
+    df, prereq_edges, graphs, closures, text_index, _ = snapshot
+    print(f"Loading snapshot success，共 {len(df)} 行")
+else:
+    try:
+        df = load_catalog_csv(CATALOG_CSV)
+        print(f"Loading CSV success，共 {len(df)} 行")
+    except Exception as e:
+        print(f"Loading CSV fail: {e}")
+        df = pd.DataFrame()
 
 embeddings = None
-try:
-    if os.path.exists('/app/course_embeddings.pt'):
-        print("Loading Tensor Embeddings...")
-        embeddings = torch.load('/app/course_embeddings.pt', map_location=torch.device('cpu'))
-        print(f"Loading Embeddings success! Shape: {embeddings.shape}")
-    elif os.path.exists('/app/course_embeddings.npy'):
-        print("Loading NumPy Embeddings...")
-        embeddings = np.load('/app/course_embeddings.npy')
-        print(f"Loading Embeddings success! Shape: {embeddings.shape}")
-    else:
-        print(" Not found embeddings file")
-except Exception as e:
-    print(f"Loading Embeddings error: {e}")
-
-def normalize_course_id(text):
-    if pd.isna(text): return ""
-    return str(text).replace(" ", "").upper()
-
-if not df.empty:
-    df['Course_ID'] = (df['Subject_Code'].fillna('') + df['Course_Code'].fillna('').astype(str)).apply(normalize_course_id)
-
-def parse_prerequisite(prereq_text):
-    if not isinstance(prereq_text, str) or not prereq_text.strip(): return []
-    text = prereq_text.upper().replace("\xa0", " ").strip()
-    text = re.sub(r"\s+[A-D][+-]?\s+OR\s+BETTER", "", text)
-    text = re.sub(r"\(", " ( ", text)
-    text = re.sub(r"\)", " ) ", text)
-    
-    def extract_courses(s):
-        return re.findall(r'\b[A-Z&]{2,5}\s*\d+[A-Z]*\b', s)
-
-    parts = [p.strip() for p in text.split(';')]
-    structure = []
-
-    for part in parts:
-        if not part: continue
-        courses_in_part = extract_courses(part)
-        if not courses_in_part: continue
-        
-        normalized_courses = [normalize_course_id(c) for c in courses_in_part]
-        has_or = ' OR ' in part or 'ONE OF' in part
- 
-        if has_or:
-            if len(normalized_courses) > 1:
-                structure.append(normalized_courses)
-            else:
-                structure.append(normalized_courses)
+emb_index = None
+embedding_path = None  # the file emb_index was loaded from
+catalog_text_hashes = catalog_hashes(df) if not df.empty else None
+if os.path.exists(EMBEDDING_STORE) and not df.empty:
+    try:
+        store = QuantizedCampusIndex(EMBEDDING_STORE)
+        if not store.matches_catalog(df['Campus'].values, texts_digest(catalog_text_hashes)):
+            print(f"{EMBEDDING_STORE} does not match the catalog, falling back to full embeddings")
+        elif (os.path.exists(EMBEDDING_VECTORS)
+              and store.source_digest != vectors_digest(read_vectors(EMBEDDING_VECTORS)[2])):
+            # build_embeddings.py rewrote the vectors after the store was built
+            print(f"{EMBEDDING_STORE} was built from other vectors than {EMBEDDING_VECTORS}, "
+                  f"rerun build_embedding_store.py; falling back")
         else:
-            for c in normalized_courses:
-                structure.append([c])
-    return structure
+            emb_index, embedding_path = store, EMBEDDING_STORE
+            print(f"Mapping quantized embeddings success! {len(store)} rows, {store.dtype}")
+    except Exception as e:
+        print(f"Mapping quantized embeddings error: {e}")
 
-if not df.empty:
-    df['Prereq_Struct'] = df['Prerequisite(s)'].apply(parse_prerequisite)
+if emb_index is None and os.path.exists(EMBEDDING_VECTORS) and not df.empty:
+    try:
+        header, vector_hashes, vectors = read_vectors(EMBEDDING_VECTORS)
+        stale = check_alignment(vector_hashes, catalog_text_hashes)
+        if len(stale) == 0:
+            embeddings, embedding_path = vectors, EMBEDDING_VECTORS
+            print(f"Loading {header['model']} embeddings success! Shape: {vectors.shape}, text hashes match the catalog")
+        else:
+            print(f"{EMBEDDING_VECTORS}: {len(stale)} rows do not match the catalog text "
+                  f"(first at row {stale[0]}), run build_embeddings.py; falling back")
+    except Exception as e:
+        print(f"Loading {EMBEDDING_VECTORS} error: {e}")
 
-gc.collect()
+if emb_index is None and embeddings is None:
+    try:
+        if os.path.exists('/app/course_embeddings.pt'):
+            print("Loading Tensor Embeddings...")
+            embeddings = torch.load('/app/course_embeddings.pt', map_location=torch.device('cpu'))
+            embedding_path = '/app/course_embeddings.pt'
+            print(f"Loading Embeddings success! Shape: {embeddings.shape}")
+        elif os.path.exists('/app/course_embeddings.npy'):
+            print("Loading NumPy Embeddings...")
+            embeddings = np.load('/app/course_embeddings.npy')
+            embedding_path = '/app/course_embeddings.npy'
+            print(f"Loading Embeddings success! Shape: {embeddings.shape}")
+        else:
+            print(" Not found embeddings file")
+    except Exception as e:
+        print(f"Loading Embeddings error: {e}")
 
+catalog = CatalogIndex(df) if not df.empty else None
+
+if embeddings is not None and not df.empty:
+    try:
+        emb_index = CampusEmbeddingIndex.build(df['Campus'].values, embeddings)
+        print(f"Embedding index ready: {len(emb_index)} rows, campuses {list(emb_index.offsets)}")
+    except Exception as e:
+        print(f"Building embedding index error: {e}")
+    embeddings = None
+if emb_index is None:
+    embedding_path = None
+
+ann_index = None
+if emb_index is not None and emb_index.matrix is not None and os.path.exists(ann_index_path(embedding_path)):
+    try:
+        ann_index = IVFIndex.load(ann_index_path(embedding_path), emb_index)
+        print(f"Loading ANN index success: {len(ann_index.centroids)} lists (default mode: {SEARCH_MODE})")
+    except Exception as e:
+        print(f"Loading ANN index error: {e}")
+
+neighbor_table = None
+if os.path.exists(NEIGHBOR_TABLE) and not df.empty:
+    try:
+        table = NeighborTable(NEIGHBOR_TABLE)
+        if table.digest != catalog_digest(df['Campus'].values, df['Course_ID'].values):
+            print(f"{NEIGHBOR_TABLE} was built for a different catalog, ignoring it")
+        elif emb_index is not None and not table.matches_embeddings(emb_index, df['Campus'].values):
+            # same course ids, but descriptions or embeddings changed since the table was computed
+            print(f"{NEIGHBOR_TABLE} was built from other embeddings, ignoring it; "
+                  f"rerun build_neighbor_table.py --refresh")
+        else:
+            neighbor_table = table
+            print(f"Mapping neighbor table success: {len(table)} rows, k={table.k}")
+    except Exception as e:
+        print(f"Loading neighbor table error: {e}")
+
+searchers = {'exact': emb_index, 'ann': ann_index, 'table': neighbor_table}
+
+if snapshot is None:
+    prereq_edges, graphs, closures, text_index = None, {}, {}, None
+    if catalog is not None:
+        prereq_edges = parse_prerequisite_column(df['Prerequisite(s)'].values)
+        print(f"Parsed prerequisites: {len(prereq_edges)} course options")
+        print("构建 campus 图...")
+        graphs = build_campus_graphs(catalog, prereq_edges)
+        closures = {c: PrereqClosure.build(g) for c, g in graphs.items()}
+        text_index = TextIndex.from_catalog(df)
+        try:
+            save_snapshot(SNAPSHOT_PATH, snapshot_key, df, prereq_edges, graphs, closures, text_index, embedding_path)
+            print(f"Saved snapshot {SNAPSHOT_PATH}")
+        except Exception as e:
+            print(f"Saving snapshot error: {e}")
+unlock_indexes = {c: UnlockIndex(g, closures[c]) for c, g in graphs.items()}
+planners = {c: CoursePlanner(g) for c, g in graphs.items()}
+for campus_name, g in graphs.items():
+    print(f"{campus_name}: {len(g)} nodes, {g.n_edges} edges, {len(closures[campus_name].indices)} ancestor pairs, "
+          f"{closures[campus_name].n_cyclic} nodes on prerequisite cycles")
+prefix_indexes = {}
+if catalog is not None:
+    prefix_indexes = {c: PrefixIndex(catalog.campus_rows(c), catalog.course_ids, catalog.campuses) for c in catalog.ranges}
+    prefix_indexes[None] = PrefixIndex(np.arange(len(catalog)), catalog.course_ids, catalog.campuses)
+if text_index is not None:
+    print(f"Text index: {len(text_index.terms)} terms, {len(text_index.docs)} postings, {text_index.nbytes() >> 10} KB")
+
+gc.collect()
+# everything built above lives for the whole process; keeping it out of the
+# collector means forked workers never write to those pages (see gunicorn.conf.py)
+gc.freeze()
+
+
+# /api/search responses depend only on the request, the CSV and the embedding
+# file actually loaded, so their hash is the version cached entries belong to; both are read
+# once here, so new files reach the cache only through a restart or reload
+DATA_VERSION = file_digest([CATALOG_CSV, embedding_path])
+response_cache = ResponseCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_MB << 20)
+query_encoder = None
+embedding_dim = emb_index.vectors(np.array([0])).shape[1] if emb_index is not None else None
+if QUERY_ENCODER and emb_index is not None:
+    query_encoder = QueryEncoder(QUERY_ENCODER_MODEL, QUERY_ENCODER_DIR, QUERY_CACHE_ENTRIES, QUERY_BATCH_MAX,
+                                 QUERY_BATCH_WAIT_MS / 1000, QUERY_MAX_TOKENS, QUERY_ENCODER_THREADS)
 
-graphs = {}
 def get_campus_graph(campus_name):
-    if campus_name in graphs: return graphs[campus_name]
-    
-    print(f"构建 {campus_name} 图...")
-    campus_df = df[df['Campus'] == campus_name]
-    if campus_df.empty: return nx.DiGraph()
-
-    G = nx.DiGraph()
-    for _, row in campus_df.iterrows():
-        tgt = row['Course_ID']
-        G.add_node(tgt, label=tgt, title=row['Title'], group='Course')
-        for group in row['Prereq_Struct']:
-            if not group: continue
-            if len(group) == 1:
-                src = group[0]
-                if src != tgt:
-                    if src not in G: G.add_node(src, label=src, group='External')
-                    G.add_edge(src, tgt)
-            else:
-                or_id = f"OR_{tgt}_{'_'.join(group)}"
-                if or_id not in G: G.add_node(or_id, label="OR", size=5, group='Logic')
-                G.add_edge(or_id, tgt)
-                for src in group:
-                    if src != tgt:
-                        if src not in G: G.add_node(src, label=src, group='External')
-                        G.add_edge(src, or_id)
-    graphs[campus_name] = G
-    return G
-
-
-def get_semantic_subgraph(full_graph, root_node, depth=1):
-
-    nodes_to_keep = {root_node}
-    current_frontier = {root_node}
-    
-    for _ in range(depth):
-        next_frontier = set()
-        for node in current_frontier:
-            if node not in full_graph: continue
-            preds = list(full_graph.predecessors(node))
-            
-            for p in preds:
-                nodes_to_keep.add(p)
-                is_or = str(p).startswith("OR_")
-                
-                if is_or:
-                    grand_preds = list(full_graph.predecessors(p))
-                    for gp in grand_preds:
-                        nodes_to_keep.add(gp)
-                        next_frontier.add(gp)
-                else:
-                    next_frontier.add(p)
-        current_frontier = next_frontier
-        if not current_frontier: break
-            
-    return full_graph.subgraph(list(nodes_to_keep))
-
-
-def get_optimized_tree_layout(graph, root_node):
-    pos = {}
+    return graphs.get(campus_name, EMPTY_GRAPH)
+
+
+def get_semantic_subgraph(campus_name, root_node, depth=1):
+    # the closure answers any depth with one slice, so large depths cost no more than small ones
+    closure = closures.get(campus_name)
+    if closure is None:
+        return get_campus_graph(campus_name).semantic_subgraph(root_node, depth=depth)
+    return closure.within(root_node, depth)
+
+
+def create_plotly_json(graph, nodes, title, highlight, valid_subjects=frozenset()):
+    if len(nodes) == 0: return None
     try:
-        rev_G = graph.reverse()
-        layers = {}
-        lengths = nx.shortest_path_length(rev_G, source=root_node)
-        
-        for node, length in lengths.items():
-            if length not in layers: layers[length] = []
-            layers[length].append(node)
-        
-        pos[root_node] = (0, 0)
-        
-        for level in sorted(layers.keys()):
-            if level == 0: continue
-            
-            current_nodes = layers[level]
-            node_scores = []
-            
-            for node in current_nodes:
-                parents = [p for p in graph.successors(node) if p in pos]
-                
-                if parents:
-                    avg_parent_x = sum(pos[p][0] for p in parents) / len(parents)
-                else:
-                    avg_parent_x = 0
-                
-       
-                is_or_node = 1 if str(node).startswith("OR_") else 0
-                
-                node_scores.append({
-                    'n': node, 
-                    'px': avg_parent_x, 
-                    'or': is_or_node, 
-                    'name': str(node)
-                })
-            
-            node_scores.sort(key=lambda x: (x['px'], x['or'], x['name']))
-            
-            sorted_nodes = [x['n'] for x in node_scores]
-            width = len(sorted_nodes)
-            x_sep = 1.2
-            
-            for i, n in enumerate(sorted_nodes):
-                x = (i - (width - 1) / 2) * x_sep
-                y = -level * 1.5 
-                pos[n] = (x, y)
-                
-        return pos
+        return plotly_figure(graph, nodes, title, highlight, valid_subjects)
     except Exception as e:
-        print(f"Layout Error: {e}")
-        return nx.spring_layout(graph, seed=42)
+        print(f"绘图错误: {e}")
+        return None
+
 
-def create_plotly_json(G, title, highlight):
-    if len(G.nodes) == 0: return None
+def create_columnar_graph(graph, nodes, title, highlight, valid_subjects=frozenset()):
+    if len(nodes) == 0: return None
     try:
-        pos = get_optimized_tree_layout(G, highlight)
-        
-        direct, indirect = set(), set()
-        if highlight in G:
-            for p in G.predecessors(highlight):
-                if G.nodes[p].get('group') == 'Logic':
-                    indirect.update(G.predecessors(p))
-                else:
-                    direct.add(p)
-
-        valid_subjects = set(df['Subject_Code'].dropna().unique())
-
-        edge_x, edge_y = [], []
-        for u, v in G.edges():
-            if u in pos and v in pos:
-                edge_x.extend([pos[u][0], pos[v][0], None])
-                edge_y.extend([pos[u][1], pos[v][1], None])
-        
-        node_x, node_y, txt, color, size, ids = [], [], [], [], [], []
-        for n in G.nodes():
-            if n not in pos: continue
-            node_x.append(pos[n][0])
-            node_y.append(pos[n][1])
-            ids.append(n)
-            
-            node_group = G.nodes[n].get('group', 'External')
-            
-            c, s = '#adb5bd', 12 
-            hover_prefix = "External"
-            
-            if n == highlight: 
-                c, s = '#FFD700', 40 
-                hover_prefix = "TARGET"
-            elif n in direct: 
-                c, s = '#FFA500', 25 
-                hover_prefix = "Direct Prereq"
-            elif n in indirect: 
-                c, s = '#FF4500', 25
-                hover_prefix = "OR-Option"
-            elif str(n).startswith("OR_"): 
-                c, s = '#ff6b6b', 8
-                hover_prefix = "Logic (OR)"
-            elif node_group == 'Course': 
-                c, s = '#4dabf7', 15 
-                hover_prefix = "Course"
-            else:
-                match = re.match(r'^([A-Z&]+)', str(n))
-                if match:
-                    subject_part = match.group(1)
-                    if subject_part in valid_subjects:
-                        c, s = '#343a40', 12
-                        hover_prefix = "Discontinued/Legacy"
-            
-            color.append(c); size.append(s)
-            
-            node_title = G.nodes[n].get('title', '')
-            if str(n).startswith("OR_"):
-                txt.append("")   
-            else:
-                if node_title:
-                    txt.append(f"<b>{hover_prefix}: {n}</b><br>{node_title}")
-                else:
-                    txt.append(f"<b>{hover_prefix}: {n}</b>")
-
-        fig = go.Figure(data=[
-            go.Scatter(x=edge_x, y=edge_y, mode='lines', line=dict(color='#ccc', width=0.8), hoverinfo='none'),
-            go.Scatter(x=node_x, y=node_y, mode='markers', marker=dict(color=color, size=size), hovertext=txt, hoverinfo='text', customdata=ids)
-        ], layout=go.Layout(
-            title={'text': title, 'x':0.5, 'font':{'size':16}}, showlegend=False, hovermode='closest',
-            margin=dict(t=40,b=20,l=5,r=5), xaxis=dict(visible=False), yaxis=dict(visible=False), clickmode='event+select'
-        ))
-        return json.loads(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+        return columnar_graph(graph, nodes, title, highlight, valid_subjects)
     except Exception as e:
         print(f"绘图错误: {e}")
         return None
 
 
+def build_graph(campus, cid, depth, fmt='plotly'):
+    current_graph = get_campus_graph(campus)
+    root = current_graph.node_id(cid)
+    if root is None:
+        return None
+    sub_nodes = get_semantic_subgraph(campus, root, depth=depth)
+    build = create_plotly_json if fmt == 'plotly' else create_columnar_graph
+    return build(current_graph, sub_nodes, f"Tree: {cid} (Depth {depth})", root, catalog.subjects.get(campus, set()))
+
+
+def get_searcher(mode):
+    return searchers.get(mode) or emb_index or neighbor_table
+
+
+def similarity_lists(hits):
+    sim_res = {}
+    for c, c_hits in hits.items():
+        sim_res[c] = [{
+            "code": catalog.course_ids[r],
+            "title": catalog.titles[r],
+            "score": round(score, 3)
+        } for r, score in c_hits]
+    return sim_res
+
+
+def cached_response(etag, body, cache_state, mimetype='application/json'):
+    resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers['X-Cache'] = cache_state
+    return resp.make_conditional(request)
+
+
 @app.route('/')
 def home():
     return "API Running"
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+def search_args(args):
+    campus = args.get('campus', 'UCD').upper()
+    cid = normalize_course_id(args.get('course_id', ''))
+    try:
+        depth = int(args.get('depth', 1))
+    except:
+        depth = 1
+    return campus, cid, depth, args.get('mode', SEARCH_MODE), args.get('format', 'plotly')
+
+
+def find_similar(target_idx, campus, mode):
+    searcher = get_searcher(mode)
+    if searcher is None:
+        return {}
+    return similarity_lists(searcher.search([target_idx], k=5, exclude=campus)[0])
+
+
+def search_body(target_idx, graph, similarity, fmt):
+    prereq_text = catalog.prereq_text[target_idx]
+    resp = {
+        "prereq_list": prereq_text if pd.notna(prereq_text) else "None",
+        "graph": graph,
+        "similarity": similarity
+    }
+    return pack_binary(resp) if fmt == 'binary' else dumps(resp)
+
+
 @app.route('/api/search', methods=['GET'])
 def search():
+    try:
+        campus, cid, depth, mode, fmt = search_args(request.args)
+        if fmt not in FORMATS:
+            return jsonify({"error": f"Unknown format {fmt}, expected one of {', '.join(FORMATS)}"}), 400
+
+        cache_key = (campus, cid, depth, mode, fmt)
+        cached = response_cache.get(cache_key, DATA_VERSION)
+        if cached is not None:
+            return cached_response(*cached, 'HIT', FORMATS[fmt])
+
+        target_idx = catalog.lookup(campus, cid) if catalog is not None else None
+        if target_idx is None:
+            return jsonify({"error": f"Course {cid} not found in {campus}"}), 404
+
+        graph = build_graph(campus, cid, depth, fmt)
+        body = search_body(target_idx, graph, find_similar(target_idx, campus, mode), fmt)
+        etag, body = response_cache.put(cache_key, DATA_VERSION, body)
+        return cached_response(etag, body, 'MISS', FORMATS[fmt])
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+def resolve_graph_node(campus, cid):
+    current_graph = get_campus_graph(campus)
+    node = current_graph.node_id(cid)
+    if node is None or campus not in closures:
+        return current_graph, None
+    return current_graph, node
+
+
+@app.route('/api/prereqs/ancestors', methods=['GET'])
+def prereq_ancestors():
     try:
         campus = request.args.get('campus', 'UCD').upper()
         cid = normalize_course_id(request.args.get('course_id', ''))
-        
+        depth = request.args.get('depth')
         try:
-            depth = int(request.args.get('depth', 1)) 
-        except:
-            depth = 1
+            depth = int(depth) if depth not in (None, '') else None
+        except ValueError:
+            return jsonify({"error": "depth must be an integer"}), 400
 
-        rows = df[(df['Campus'] == campus) & (df['Course_ID'] == cid)]
-        if rows.empty:
+        current_graph, node = resolve_graph_node(campus, cid)
+        if node is None:
             return jsonify({"error": f"Course {cid} not found in {campus}"}), 404
-        
-        target_idx = rows.index[0]
-        prereq_text = rows.iloc[0]['Prerequisite(s)']
-        
-        resp = {
-            "prereq_list": prereq_text if pd.notna(prereq_text) else "None",
-            "graph": None,
-            "similarity": {}
-        }
-        
-        current_graph = get_campus_graph(campus)
-        if cid in current_graph:
-            sub_G = get_semantic_subgraph(current_graph, cid, depth=depth)
-            resp['graph'] = create_plotly_json(sub_G, f"Tree: {cid} (Depth {depth})", cid)
-            
-        if embeddings is not None:
-            if isinstance(embeddings, torch.Tensor):
-                target_emb = embeddings[target_idx].unsqueeze(0)
-                sim_res = {}
-                for c in ['UCD', 'UCLA', 'UCSC', 'UCI']:
-                    if c == campus: 
-                        sim_res[c] = []
-                        continue
-                    mask = (df['Campus'] == c)
-                    if not mask.any(): 
-                        sim_res[c] = []
-                        continue
-                    
-                    c_embs = embeddings[mask.values] 
-                    c_idxs = df[mask].index
-                    hits = util.semantic_search(target_emb, c_embs, top_k=5)[0]
-                    sim_res[c] = []
-                    for h in hits:
-                        row = df.loc[c_idxs[h['corpus_id']]]
-                        sim_res[c].append({
-                            "code": row['Course_ID'],
-                            "title": row['Title'],
-                            "score": round(h['score'], 3)
-                        })
-                resp['similarity'] = sim_res
-            
-            elif isinstance(embeddings, np.ndarray):
-                from sklearn.metrics.pairwise import cosine_similarity
-                target_emb = embeddings[target_idx].reshape(1, -1)
-                sim_res = {}
-                for c in ['UCD', 'UCLA', 'UCSC', 'UCI']:
-                    if c == campus: 
-                        sim_res[c] = []
-                        continue
-                    mask = (df['Campus'] == c)
-                    if not mask.any(): 
-                        sim_res[c] = []
-                        continue
-                    c_embs = embeddings[mask.values]
-                    c_idxs = df[mask].index
-                    scores = cosine_similarity(target_emb, c_embs)[0]
-                    top_indices = scores.argsort()[::-1][:5]
-                    sim_res[c] = []
-                    for idx in top_indices:
-                        score = scores[idx]
-                        row = df.loc[c_idxs[idx]]
-                        sim_res[c].append({
-                            "code": row['Course_ID'],
-                            "title": row['Title'],
-                            "score": round(float(score), 3)
-                        })
-                resp['similarity'] = sim_res
-            
-        return jsonify(resp)
+        closure = closures[campus]
+        nodes, dist = closure.ancestors(node, depth)
+        kinds = current_graph.kinds[nodes]
+        keep = kinds != LOGIC
+        ancestors = sorted(
+            ({"code": current_graph.labels[n], "kind": KIND_NAMES[k], "distance": d}
+             for n, k, d in zip(nodes[keep].tolist(), kinds[keep].tolist(), dist[keep].tolist())),
+            key=lambda a: (a["distance"], a["code"]))
+        return Response(dumps({
+            "campus": campus, "course_id": cid, "depth": depth, "in_cycle": bool(closure.cyclic[node]),
+            "count": len(ancestors), "ancestors": ancestors,
+        }), mimetype='application/json')
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+@app.route('/api/prereqs/check', methods=['GET'])
+def prereq_check():
+    try:
+        campus = request.args.get('campus', 'UCD').upper()
+        prereq = normalize_course_id(request.args.get('prereq', ''))
+        cid = normalize_course_id(request.args.get('course_id', ''))
+        _, a = resolve_graph_node(campus, prereq)
+        _, b = resolve_graph_node(campus, cid)
+        if a is None or b is None:
+            missing = prereq if a is None else cid
+            return jsonify({"error": f"Course {missing} not found in {campus}"}), 404
+        distance = closures[campus].distance(a, b)
+        return jsonify({
+            "campus": campus, "prereq": prereq, "course_id": cid,
+            "is_prerequisite": distance is not None, "distance": distance,
+        })
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+@app.route('/api/prereqs/unlocks', methods=['GET'])
+def prereq_unlocks():
+    try:
+        campus = request.args.get('campus', 'UCD').upper()
+        cid = normalize_course_id(request.args.get('course_id', ''))
+        scope = request.args.get('scope', 'direct')
+        if scope not in ('direct', 'all'):
+            return jsonify({"error": "scope must be direct or all"}), 400
+        try:
+            page = max(int(request.args.get('page', 1)), 1)
+            page_size = min(max(int(request.args.get('page_size', 50)), 1), UNLOCKS_MAX_PAGE)
+        except ValueError:
+            return jsonify({"error": "page and page_size must be integers"}), 400
+        ready_only = request.args.get('ready', '0').lower() in ('1', 'true', 'yes')
+
+        current_graph, node = resolve_graph_node(campus, cid)
+        if node is None:
+            return jsonify({"error": f"Course {cid} not found in {campus}"}), 404
+        completed = [normalize_course_id(c) for c in request.args.get('completed', '').split(',') if c.strip()]
+        have = [n for n in map(current_graph.node_id, completed) if n is not None]
+
+        found = unlock_indexes[campus].unlocks(node, have, max_dist=1 if scope == 'direct' else None)
+        labels = current_graph.labels
+        # open courses first, then nearest, then by code, so pages are stable
+        found.sort(key=lambda f: (f[2] > 0, f[1], labels[f[0]]))
+        n_ready = sum(1 for f in found if f[2] == 0)
+        if ready_only:
+            found = found[:n_ready]
+        start = (page - 1) * page_size
+        results = [{"code": labels[n], "title": current_graph.titles[n] if isinstance(current_graph.titles[n], str) else None,
+                    "distance": d, "ready": m == 0, "missing": m}
+                   for n, d, m in found[start:start + page_size]]
+        return Response(dumps({
+            "campus": campus, "course_id": cid, "scope": scope, "completed": completed,
+            "total": len(found), "ready": n_ready, "page": page, "page_size": page_size,
+            "results": results,
+        }), mimetype='application/json')
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+@app.route('/api/prereqs/plan', methods=['GET'])
+def prereq_plan():
+    try:
+        campus = request.args.get('campus', 'UCD').upper()
+        cid = normalize_course_id(request.args.get('course_id', ''))
+        try:
+            per_term = min(max(int(request.args.get('per_term', 3)), 1), PLAN_MAX_PER_TERM)
+        except ValueError:
+            return jsonify({"error": "per_term must be an integer"}), 400
+
+        current_graph, node = resolve_graph_node(campus, cid)
+        if node is None:
+            return jsonify({"error": f"Course {cid} not found in {campus}"}), 404
+        completed = [normalize_course_id(c) for c in request.args.get('completed', '').split(',') if c.strip()]
+        have = [n for n in map(current_graph.node_id, completed) if n is not None]
+
+        plan = planners[campus].plan(node, have, per_term)
+        labels, kinds, titles = current_graph.labels, current_graph.kinds, current_graph.titles
+        term_of = {c: t for t, term in enumerate(plan['terms'], 1) for c in term}
+        courses = [{"code": labels[c], "title": titles[c] if isinstance(titles[c], str) else None,
+                    "kind": KIND_NAMES[kinds[c]], "term": term_of[c]}
+                   for c in sorted(plan['needed'], key=lambda c: (term_of[c], labels[c]))]
+        return Response(dumps({
+            "campus": campus, "course_id": cid, "completed": completed, "per_term": per_term,
+            "needed": len(courses), "n_terms": len(plan['terms']), "courses": courses,
+            "terms": [[labels[c] for c in term] for term in plan['terms']],
+            "choices": [{"options": [labels[o] for o in current_graph.predecessors(g).tolist()], "chosen": labels[o]}
+                        for g, o in plan['choices'].items()],
+            "cycles_skipped": [[labels[v], labels[p]] for v, p in plan['cycles']],
+            "unsatisfied": [{"options": [labels[o] for o in current_graph.predecessors(g).tolist()]}
+                            for g in plan['unsatisfied']],
+        }), mimetype='application/json')
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+@app.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    try:
+        text = request.args.get('q', '')
+        campus = request.args.get('campus', '').strip().upper() or None
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), AUTOCOMPLETE_MAX)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        key = query_key(text)
+        if not key:
+            return jsonify({"error": "q is required"}), 400
+        index = prefix_indexes.get(campus)
+        if index is None:
+            return jsonify({"query": text, "key": key, "campus": campus, "total": 0, "results": []})
+
+        rows, total = index.complete(text, limit)
+        results = [{"campus": catalog.campuses[r], "code": catalog.course_ids[r],
+                    "title": catalog.titles[r] if isinstance(catalog.titles[r], str) else None}
+                   for r in rows.tolist()]
+        return Response(dumps({"query": text, "key": key, "campus": campus, "total": total, "results": results}),
+                        mimetype='application/json')
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+def encode_query(text):
+    """(normalized query vector, whether it was cached); RuntimeError when the encoder cannot run."""
+    if query_encoder is None:
+        raise RuntimeError("Query encoder disabled")
+    q, cached = query_encoder.encode(text, timeout=QUERY_ENCODE_TIMEOUT)
+    if len(q) != embedding_dim:
+        raise RuntimeError(f"{QUERY_ENCODER_MODEL} gives {len(q)} dims but the catalog embeddings have {embedding_dim}")
+    return q, cached
+
+
+def query_vector(text, rows):
+    if query_encoder is not None and query_encoder.error is None:
+        # fused /api/query must stay fast: it never waits for the model, only starts loading it
+        if query_encoder.backend is None:
+            query_encoder.start_loading()
+        else:
+            try:
+                return encode_query(text)[0], 'encoder'
+            except RuntimeError:
+                pass
+    # without the text encoder, the query vector is the centroid of the best text matches
+    if emb_index is None or len(rows) == 0:
+        return None, None
+    q = np.asarray(emb_index.vectors(emb_index.positions[rows]), dtype=np.float32).mean(axis=0)
+    return q / max(float(np.linalg.norm(q)), 1e-12), 'feedback'
+
+
+def fuse_rankings(rankings, k):
+    fused = {}
+    for rows in rankings:
+        for rank, r in enumerate(rows.tolist(), 1):
+            fused[r] = fused.get(r, 0.0) + 1.0 / (RRF_K + rank)
+    best = sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:k]
+    return [r for r, _ in best], [s for _, s in best]
+
+
+@app.route('/api/query', methods=['GET'])
+def query():
+    try:
+        text = request.args.get('q', '').strip()
+        if not text:
+            return jsonify({"error": "q is required"}), 400
+        try:
+            k = min(max(int(request.args.get('k', 20)), 1), QUERY_MAX_RESULTS)
+        except ValueError:
+            return jsonify({"error": "k must be an integer"}), 400
+        campuses = [c.strip().upper() for c in request.args.get('campus', '').split(',') if c.strip()]
+        subjects = [s.strip() for s in request.args.get('subject', '').split(',') if s.strip()]
+        fuse = request.args.get('fuse', '0').lower() in ('1', 'true', 'yes')
+        if text_index is None:
+            return jsonify({"error": "Text index not available"}), 503
+
+        mask = catalog.row_mask(campuses, subjects)
+        bm25, found = text_index.scores(text)
+        if mask is not None:
+            bm25 = np.where(mask, bm25, 0)
+        text_rows, _ = top_rows(bm25, FUSION_DEPTH if fuse else k)
+
+        semantic = None
+        q, source = query_vector(text, text_rows[:FUSION_FEEDBACK]) if fuse else (None, None)
+        if q is not None:
+            semantic = emb_index.query_scores(q)
+            if mask is not None:
+                semantic = np.where(mask, semantic, -np.inf)
+            dense_rows = np.argpartition(-semantic, min(FUSION_DEPTH, len(semantic) - 1))[:FUSION_DEPTH]
+            dense_rows = dense_rows[np.isfinite(semantic[dense_rows])]
+            dense_rows = dense_rows[np.lexsort((dense_rows, -semantic[dense_rows]))]
+            rows, scores = fuse_rankings([text_rows, dense_rows], k)
+        else:
+            rows, scores = text_rows[:k].tolist(), bm25[text_rows[:k]].tolist()
+
+        results = []
+        for r, score in zip(rows, scores):
+            hit = {"campus": catalog.campuses[r], "code": catalog.course_ids[r], "title": catalog.titles[r],
+                   "score": round(float(score), 4), "bm25": round(float(bm25[r]), 3)}
+            if semantic is not None:
+                hit["semantic"] = round(float(semantic[r]), 3)
+            results.append(hit)
+        return Response(dumps({
+            "query": text, "terms": [text_index.terms[t] for t in found], "campus": campuses, "subject": subjects,
+            "fused": semantic is not None, "query_vector": source, "count": len(results), "results": results,
+        }), mimetype='application/json')
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+def rank_by_campus(scores, campuses, k):
+    hits = {}
+    for c in campuses:
+        rows = catalog.campus_rows(c)
+        if len(rows) > k:
+            rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        rows = rows[np.lexsort((rows, -scores[rows]))]
+        hits[c] = list(zip(rows.tolist(), scores[rows].tolist()))
+    return hits
+
+
+@app.route('/api/match', methods=['GET', 'POST'])
+def match():
+    try:
+        body = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        text = str(body.get('text') or body.get('q') or '').strip()
+        if not text:
+            return jsonify({"error": "text is required"}), 400
+        if len(text) > MATCH_MAX_CHARS:
+            return jsonify({"error": f"text is longer than {MATCH_MAX_CHARS} characters"}), 400
+        try:
+            k = min(max(int(body.get('k', 5)), 1), QUERY_MAX_RESULTS)
+        except (TypeError, ValueError):
+            return jsonify({"error": "k must be an integer"}), 400
+        campuses = body.get('campus') or CAMPUSES
+        if isinstance(campuses, str):
+            campuses = campuses.split(',')
+        campuses = [str(c).strip().upper() for c in campuses if str(c).strip()]
+        if emb_index is None:
+            return jsonify({"error": "Embeddings not available"}), 503
+
+        t0 = time.perf_counter()
+        try:
+            q, cached = encode_query(text)
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 503
+        encode_ms = (time.perf_counter() - t0) * 1000
+        hits = rank_by_campus(emb_index.query_scores(q), campuses, k)
+        return Response(dumps({
+            "model": QUERY_ENCODER_MODEL, "backend": query_encoder.backend.name, "cached": cached,
+            "encode_ms": round(encode_ms, 2), "similarity": similarity_lists(hits),
+        }), mimetype='application/json')
+
+    except Exception as e:
+        print(traceback.format_exc())
+        return jsonify({"error": f"Internal Server Error: {str(e)}"}), 500
+
+
+@app.route('/api/match/stats', methods=['GET'])
+def match_stats():
+    return jsonify(query_encoder.stats() if query_encoder is not None else {"error": "Query encoder disabled"})
+
+
+@app.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    try:
+        body = request.get_json(silent=True) or {}
+        items = body.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Expected a JSON body with a non-empty 'items' list"}), 400
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400
+        try:
+            depth = int(body.get('depth', 1))
+        except (TypeError, ValueError):
+            depth = 1
+        fmt = body.get('format', 'plotly')
+        if body.get('graphs') and fmt not in ('plotly', 'columnar'):
+            return jsonify({"error": "Batch graphs support format plotly or columnar"}), 400
+
+        # resolve everything first, then run one similarity pass over the found rows
+        results, found = [], []
+        for item in items:
+            if isinstance(item, dict):
+                campus, raw_cid = item.get('campus', ''), item.get('course_id', '')
+            elif isinstance(item, (list, tuple)) and len(item) == 2:
+                campus, raw_cid = item
+            else:
+                results.append({"error": "Expected {campus, course_id} or [campus, course_id]"})
+                continue
+            campus, cid = str(campus).upper(), normalize_course_id(str(raw_cid))
+            res = {"campus": campus, "course_id": cid}
+            target_idx = catalog.lookup(campus, cid) if catalog is not None else None
+            if target_idx is None:
+                res["error"] = f"Course {cid} not found in {campus}"
+            else:
+                prereq_text = catalog.prereq_text[target_idx]
+                res["prereq_list"] = prereq_text if pd.notna(prereq_text) else "None"
+                res["similarity"] = {}
+                found.append((res, target_idx))
+            results.append(res)
+
+        searcher = get_searcher(body.get('mode', SEARCH_MODE))
+        if searcher is not None and found:
+            try:
+                hits = searcher.search([t for _, t in found], k=5, exclude=None)
+                for (res, _), item_hits in zip(found, hits):
+                    item_hits[res["campus"]] = []
+                    res["similarity"] = similarity_lists(item_hits)
+            except Exception as e:
+                print(traceback.format_exc())
+                for res, _ in found:
+                    res["error"] = f"Similarity failed: {e}"
+
+        if body.get('graphs'):
+            for res, _ in found:
+                try:
+                    res["graph"] = build_graph(res["campus"], res["course_id"], depth, fmt)
+                except Exception as e:
+                    res["error"] = f"Graph failed: {e}"
+
+        errors = sum(1 for res in results if "error" in res)
+        return Response(dumps({"results": results, "count": len(results), "errors": errors}), mimetype='application/json')
 
     except Exception as e:
         print(traceback.format_exc())
@@ -0,0 +1,221 @@
+"""Async serving mode: the same routes as app.py behind an asyncio event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 7860
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+/api/search is handled here: the graph build and the similarity lookup run
+concurrently on the search pool and are awaited with a deadline. Every other
+route is the Flask app itself, called as WSGI on a separate small pool, so
+cheap lookups do not queue behind deep trees. POST /api/search/batch is
+search work and goes to the search pool.
+
+Each pool admits a bounded number of requests (running plus queued); past
+that a request gets 503 with Retry-After instead of waiting. A request that
+misses its deadline gets 504; its stages finish in the background and still
+count against the pool until they do.
+
+    ASYNC_THREADS        search pool threads (default 4)
+    ASYNC_LIGHT_THREADS  threads for the other routes (default 2)
+    ASYNC_MAX_INFLIGHT   search requests admitted at once (default 32)
+    REQUEST_TIMEOUT      seconds before a request gets 504 (default 10)
+"""
+import asyncio
+import io
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as core
+from graph_export import FORMATS, dumps
+
+ASYNC_THREADS = int(os.getenv("ASYNC_THREADS", "4"))
+ASYNC_LIGHT_THREADS = int(os.getenv("ASYNC_LIGHT_THREADS", "2"))
+ASYNC_MAX_INFLIGHT = int(os.getenv("ASYNC_MAX_INFLIGHT", "32"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "10"))
+SEARCH_POOL_PATHS = {'/api/search/batch', '/api/match'}
+
+
+class Overloaded(Exception):
+    pass
+
+
+class BoundedPool:
+    """Thread pool that admits at most `max_inflight` requests and awaits them with a deadline."""
+
+    def __init__(self, name, threads, max_inflight):
+        self.name = name
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix=name)
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.rejected = self.timeouts = 0
+
+    def _finished(self, stages):
+        # runs on the event loop, also for stages that outlived their request
+        self.inflight -= 1
+        if not stages.cancelled():
+            stages.exception()
+
+    async def run(self, *calls, timeout=REQUEST_TIMEOUT):
+        """Results of `calls` ((fn, *args) tuples), run concurrently."""
+        if self.inflight >= self.max_inflight:
+            self.rejected += 1
+            raise Overloaded(self.name)
+        loop = asyncio.get_running_loop()
+        self.inflight += 1
+        stages = asyncio.gather(*(loop.run_in_executor(self.executor, fn, *args) for fn, *args in calls))
+        stages.add_done_callback(self._finished)
+        try:
+            # shield: a timed-out request leaves its threads running, so they stay counted
+            return await asyncio.wait_for(asyncio.shield(stages), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def stats(self):
+        return {"inflight": self.inflight, "max_inflight": self.max_inflight,
+                "rejected": self.rejected, "timeouts": self.timeouts}
+
+
+search_pool = BoundedPool('search', ASYNC_THREADS, ASYNC_MAX_INFLIGHT)
+light_pool = BoundedPool('wsgi', ASYNC_LIGHT_THREADS, ASYNC_LIGHT_THREADS * 16)
+
+
+def json_response(status, obj, headers=()):
+    return status, [(b'content-type', b'application/json'), *headers], dumps(obj)
+
+
+def not_modified(headers, etag):
+    tokens = [t.strip().removeprefix('W/') for t in headers.get(b'if-none-match', b'').decode('latin-1').split(',')]
+    return '*' in tokens or f'"{etag}"' in tokens
+
+
+def cached_response(request_headers, etag, body, cache_state, mimetype):
+    headers = [(b'etag', f'"{etag}"'.encode()), (b'x-cache', cache_state.encode())]
+    if not_modified(request_headers, etag):
+        return 304, headers, b''
+    return 200, [(b'content-type', mimetype.encode()), *headers], body
+
+
+async def search(query, request_headers):
+    args = {k: v[0] for k, v in parse_qs(query, keep_blank_values=True).items()}
+    campus, cid, depth, mode, fmt = core.search_args(args)
+    if fmt not in FORMATS:
+        return json_response(400, {"error": f"Unknown format {fmt}, expected one of {', '.join(FORMATS)}"})
+
+    cache_key = (campus, cid, depth, mode, fmt)
+    cached = core.response_cache.get(cache_key, core.DATA_VERSION)
+    if cached is not None:
+        return cached_response(request_headers, *cached, 'HIT', FORMATS[fmt])
+
+    target_idx = core.catalog.lookup(campus, cid) if core.catalog is not None else None
+    if target_idx is None:
+        return json_response(404, {"error": f"Course {cid} not found in {campus}"})
+
+    graph, similarity = await search_pool.run(
+        (core.build_graph, campus, cid, depth, fmt), (core.find_similar, target_idx, campus, mode))
+    body = core.search_body(target_idx, graph, similarity, fmt)
+    etag, body = core.response_cache.put(cache_key, core.DATA_VERSION, body)
+    return cached_response(request_headers, etag, body, 'MISS', FORMATS[fmt])
+
+
+def call_wsgi(scope, body):
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': (scope.get('server') or ('localhost', 80))[0],
+        'SERVER_PORT': str((scope.get('server') or ('localhost', 80))[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = 'HTTP_' + key
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    started = []
+    def start_response(status, headers, exc_info=None):
+        started[:] = [status, headers]
+
+    chunks = core.app(environ, start_response)
+    try:
+        data = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    status, headers = started
+    return int(status.split()[0]), [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers], data
+
+
+async def handle(scope, body):
+    headers = dict(scope['headers'])
+    try:
+        if scope['path'] == '/api/search' and scope['method'] in ('GET', 'HEAD'):
+            status, out, data = await search(scope['query_string'].decode('latin-1'), headers)
+            # what flask-cors adds on the WSGI routes
+            out.append((b'access-control-allow-origin', b'*'))
+        else:
+            pool = search_pool if scope['path'] in SEARCH_POOL_PATHS else light_pool
+            (status, out, data), = await pool.run((call_wsgi, scope, body))
+        return status, out, data
+    except Overloaded as e:
+        return json_response(503, {"error": f"Server busy ({e} pool full), retry shortly"}, [(b'retry-after', b'1')])
+    except asyncio.TimeoutError:
+        print(f"Request timed out after {REQUEST_TIMEOUT}s: {scope['path']}?{scope['query_string'].decode('latin-1')}")
+        return json_response(504, {"error": f"Request took longer than {REQUEST_TIMEOUT:g}s"})
+    except Exception as e:
+        print(traceback.format_exc())
+        return json_response(500, {"error": f"Internal Server Error: {str(e)}"})
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in (search_pool, light_pool):
+                    pool.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+
+    status, headers, data = await handle(scope, body)
+    if not any(k == b'content-length' for k, _ in headers):
+        headers = [*headers, (b'content-length', str(len(data)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else data})
+
+
+@core.app.route('/api/async/stats', methods=['GET'])
+def async_stats():
+    return core.jsonify({"search": search_pool.stats(), "other": light_pool.stats()})
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv('PORT', '7860')))
@@ -0,0 +1,130 @@
+"""Latency of cheap lookups next to expensive deep-tree searches, sync (gunicorn threads) vs. async (asgi.py).
+
+    python backend/benchmarks/bench_async.py [--cheap 6] [--heavy 2] [--seconds 10] [--workers 1]
+
+Both modes run as one gunicorn worker by default: `app:app` with WEB_THREADS threads and
+`asgi:app` under uvicorn's worker class. The response cache is off, so every heavy request is
+a depth-10 tree plus an exact similarity pass on one of the largest prerequisite trees;
+cheap requests are /api/prereqs lookups. Each client loops on its own class of request,
+and p50/p99 are reported per class with the number of 503 (backpressure) and 504 (timeout)
+answers. Needs uvicorn and the same /app files and packages as the server.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from bench_workers import free_port, wait_ready
+from common import BACKEND_DIR, load_catalog
+from catalog_index import CatalogIndex
+from prereq_graph import COURSE, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+
+MODES = {
+    'sync': ['app:app'],
+    'async': ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app'],
+}
+
+
+def client(base, queries, seconds, seed, out):
+    rng = np.random.default_rng(seed)
+    latencies, codes = [], {}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        q = queries[rng.integers(len(queries))]
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base + q, timeout=120) as r:
+                r.read()
+                code = r.status
+        except urllib.error.HTTPError as e:
+            code = e.code
+        except OSError:
+            code = 0
+        latencies.append(time.perf_counter() - t0)
+        codes[code] = codes.get(code, 0) + 1
+    out.put((latencies, codes))
+
+
+def workload():
+    df = load_catalog()
+    graphs = build_campus_graphs(CatalogIndex(df), parse_prerequisite_column(df['Prerequisite(s)'].values))
+    rng = np.random.default_rng(0)
+    heavy, cheap = [], []
+    for campus, g in graphs.items():
+        courses = np.flatnonzero(g.kinds == COURSE)
+        sizes = np.array([len(g.semantic_subgraph(r, 10)) for r in courses])
+        for r in courses[np.argsort(sizes)[-20:]].tolist():
+            heavy.append(f"/api/search?campus={campus}&course_id={g.labels[r]}&depth=10&mode=exact")
+        for r in rng.choice(courses, 100).tolist():
+            label = g.labels[r]
+            cheap.append(f"/api/prereqs/ancestors?campus={campus}&course_id={label}&depth=2")
+            cheap.append(f"/api/prereqs/unlocks?campus={campus}&course_id={label}&page_size=20")
+    return heavy, cheap
+
+
+def run(mode, args, heavy, cheap):
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), WEB_THREADS=str(args.threads), PORT=str(port),
+               RESPONSE_CACHE_ENTRIES='0')
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', *MODES[mode]],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(base + cheap[0], proc)
+        for q in heavy[:3] + cheap[:3]:
+            try: urllib.request.urlopen(base + q, timeout=120).read()
+            except urllib.error.HTTPError: pass
+
+        out = {'cheap': multiprocessing.Queue(), 'heavy': multiprocessing.Queue()}
+        clients = [multiprocessing.Process(target=client, args=(base, cheap, args.seconds, i, out['cheap']))
+                   for i in range(args.cheap)]
+        clients += [multiprocessing.Process(target=client, args=(base, heavy, args.seconds, 100 + i, out['heavy']))
+                    for i in range(args.heavy)]
+        for c in clients: c.start()
+        results = {'cheap': [out['cheap'].get() for _ in range(args.cheap)],
+                   'heavy': [out['heavy'].get() for _ in range(args.heavy)]}
+        for c in clients: c.join()
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    rows = {}
+    for name, res in results.items():
+        if not res: continue
+        latencies = np.concatenate([r[0] for r in res]) * 1000
+        codes = {}
+        for _, c in res:
+            for k, v in c.items(): codes[k] = codes.get(k, 0) + v
+        rows[name] = (len(latencies) / args.seconds, np.percentile(latencies, 50), np.percentile(latencies, 99),
+                      codes.get(503, 0), codes.get(504, 0), sum(v for k, v in codes.items() if k not in (200, 404, 503, 504)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cheap', type=int, default=6, help='clients sending cheap lookups')
+    parser.add_argument('--heavy', type=int, default=2, help='clients sending deep-tree searches')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=2, help='WEB_THREADS for the sync mode')
+    parser.add_argument('--modes', nargs='+', default=list(MODES))
+    args = parser.parse_args()
+
+    heavy, cheap = workload()
+    print(f"{os.cpu_count()} CPUs, {args.workers} worker(s), {args.cheap} cheap + {args.heavy} heavy clients, {args.seconds:.0f} s per run")
+    print(f"{'mode':<7}{'class':<7}{'req/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'503':>6}{'504':>6}{'errors':>8}")
+    for mode in args.modes:
+        for name, (rps, p50, p99, busy, late, errors) in run(mode, args, heavy, cheap).items():
+            print(f"{mode:<7}{name:<7}{rps:>8.1f}{p50:>9.1f}{p99:>9.1f}{busy:>6}{late:>6}{errors:>8}")
+
+
+if __name__ == '__main__':
+    main()
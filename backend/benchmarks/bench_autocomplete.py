@@ -0,0 +1,45 @@
+"""Course-id autocomplete: per-campus prefix index vs. df['Course_ID'].str.startswith per keystroke.
+
+    python backend/benchmarks/bench_autocomplete.py [--ids 300]
+
+Every prefix of `--ids` random course ids (as typed, one keystroke at a time, lowercase with
+a space before the number) is looked up on its campus; both paths return the first 10 matches.
+"""
+import argparse
+import re
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+from catalog_index import CatalogIndex
+from prefix_index import PrefixIndex, query_key
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ids', type=int, default=300)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    catalog = CatalogIndex(df)
+    indexes = {c: PrefixIndex(catalog.campus_rows(c), catalog.course_ids, catalog.campuses) for c in catalog.ranges}
+    print(f"{len(df)} rows, {sum(len(i) for i in indexes.values())} distinct ids in {len(indexes)} campus indexes")
+
+    rng = np.random.default_rng(0)
+    typed = []
+    for r in rng.choice(len(df), args.ids, replace=False):
+        campus, cid = df['Campus'].iat[r], df['Course_ID'].iat[r]
+        loose = re.sub(r'^([A-Z&/]+)', r'\1 ', cid).lower()
+        typed += [(campus, loose[:i]) for i in range(1, len(loose) + 1) if loose[:i].strip()]
+
+    def scan(campus, text):
+        ids = df['Course_ID'][df['Campus'] == campus]
+        return ids[ids.str.startswith(query_key(text))].head(10)
+
+    print(f"{len(typed)} keystrokes")
+    print(summarize('str.startswith scan', time_calls(scan, typed[:300])))
+    print(summarize('PrefixIndex.complete', time_calls(lambda c, t: indexes[c].complete(t, 10), typed)))
+
+
+if __name__ == '__main__':
+    main()
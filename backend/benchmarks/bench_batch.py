@@ -0,0 +1,65 @@
+"""Throughput of POST /api/search/batch vs. one GET /api/search per course.
+
+    python backend/benchmarks/bench_batch.py [--sizes 10 50 200] [--modes exact table] [--rounds 5]
+
+Runs against the Flask app in-process with the response cache disabled, so it needs the
+same /app files and packages as the server. Single-item calls always build a graph; the
+batch is timed with and without graphs.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ['RESPONSE_CACHE_ENTRIES'] = '0'
+from common import load_catalog  # noqa: E402
+
+
+def timed(fn, rounds):
+    fn()
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--modes', nargs='+', default=['exact', 'table'])
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    import app
+    client = app.app.test_client()
+    df = load_catalog()
+    rng = np.random.default_rng(0)
+
+    print(f"{'mode':<7}{'items':>6}{'single items/s':>16}{'batch items/s':>15}{'+graphs items/s':>17}{'speedup':>9}")
+    for mode in args.modes:
+        if app.searchers.get(mode) is None:
+            print(f"{mode:<7} not available in this deployment")
+            continue
+        for n in args.sizes:
+            rows = rng.choice(len(df), n, replace=False)
+            items = [[df['Campus'].iat[r], df['Course_ID'].iat[r]] for r in rows]
+
+            def singles():
+                for campus, cid in items:
+                    client.get(f'/api/search?campus={campus}&course_id={cid}&depth=1&mode={mode}')
+
+            def batch(graphs):
+                r = client.post('/api/search/batch', json={'items': items, 'mode': mode, 'graphs': graphs, 'depth': 1})
+                assert r.status_code == 200 and r.get_json()['errors'] == 0
+
+            t_single = timed(singles, args.rounds)
+            t_batch = timed(lambda: batch(False), args.rounds)
+            t_graphs = timed(lambda: batch(True), args.rounds)
+            print(f"{mode:<7}{n:>6}{n / t_single:>16.0f}{n / t_batch:>15.0f}{n / t_graphs:>17.0f}{t_single / t_graphs:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
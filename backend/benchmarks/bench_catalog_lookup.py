@@ -0,0 +1,61 @@
+"""Micro-benchmarks: DataFrame masks vs. CatalogIndex for the lookups on the /api/search hot path.
+
+    python backend/benchmarks/bench_catalog_lookup.py [--queries 2000]
+"""
+import argparse
+
+import numpy as np
+
+from common import load_catalog, time_calls, summarize
+from catalog_index import CatalogIndex
+
+
+def mask_lookup(df, campus, cid):
+    rows = df[(df['Campus'] == campus) & (df['Course_ID'] == cid)]
+    return None if rows.empty else rows.index[0]
+
+
+def index_lookup(catalog, campus, cid):
+    return catalog.lookup(campus, cid)
+
+
+def mask_subjects(df, campus):
+    return set(df['Subject_Code'].dropna().unique())
+
+
+def index_subjects(catalog, campus):
+    return catalog.subjects.get(campus, set())
+
+
+def mask_campus_rows(df, campus):
+    return df[df['Campus'] == campus]
+
+
+def index_campus_rows(df, catalog, campus):
+    return df.iloc[catalog.campus_rows(campus)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    catalog = CatalogIndex(df)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(df), args.queries)
+    keys = [(df['Campus'].iat[p], df['Course_ID'].iat[p]) for p in picks]
+    campuses = [k[0] for k in keys]
+
+    assert all(mask_lookup(df, c, i) == index_lookup(catalog, c, i) for c, i in keys[:200])
+
+    print(summarize('course lookup: masks', time_calls(mask_lookup, [(df, c, i) for c, i in keys])))
+    print(summarize('course lookup: index', time_calls(index_lookup, [(catalog, c, i) for c, i in keys])))
+    print(summarize('subject set: recompute', time_calls(mask_subjects, [(df, c) for c in campuses[:200]])))
+    print(summarize('subject set: index', time_calls(index_subjects, [(catalog, c) for c in campuses])))
+    print(summarize('campus rows: mask', time_calls(mask_campus_rows, [(df, c) for c in campuses[:200]])))
+    print(summarize('campus rows: range', time_calls(index_campus_rows, [(df, catalog, c) for c in campuses[:200]])))
+
+
+if __name__ == '__main__':
+    main()
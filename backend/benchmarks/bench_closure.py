@@ -0,0 +1,51 @@
+"""Build time and memory of the prerequisite closure, and k-hop subgraph queries through it vs. semantic_subgraph().
+
+    python backend/benchmarks/bench_closure.py [--queries 500] [--depths 1 3 10 1000]
+
+Also checks that both return the same node set for every sampled root.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+from catalog_index import CatalogIndex
+from prereq_closure import PrereqClosure
+from prereq_graph import COURSE, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 3, 10, 1000])
+    args = parser.parse_args()
+
+    df = load_catalog()
+    graphs = build_campus_graphs(CatalogIndex(df), parse_prerequisite_column(df['Prerequisite(s)'].values))
+
+    closures = {}
+    for campus, g in graphs.items():
+        t0 = time.perf_counter()
+        closures[campus] = c = PrereqClosure.build(g)
+        print(f"{campus}: built in {(time.perf_counter() - t0) * 1000:.0f} ms, {len(c.indices)} ancestor pairs, "
+              f"{c.nbytes() / 1024:.0f} KB, {c.n_cyclic} nodes on cycles")
+
+    rng = np.random.default_rng(0)
+    roots = []
+    for campus, g in graphs.items():
+        courses = np.flatnonzero(g.kinds == COURSE)
+        roots += [(campus, int(r)) for r in rng.choice(courses, args.queries // len(graphs))]
+
+    for depth in args.depths:
+        bfs = time_calls(lambda c, r: graphs[c].semantic_subgraph(r, depth), roots)
+        closure = time_calls(lambda c, r: closures[c].within(r, depth), roots)
+        same = all(np.array_equal(graphs[c].semantic_subgraph(r, depth), closures[c].within(r, depth)) for c, r in roots)
+        print(f"depth {depth}:")
+        print(f"  {summarize('semantic_subgraph', bfs)}")
+        print(f"  {summarize('closure.within', closure)}   identical: {same}")
+
+
+if __name__ == '__main__':
+    main()
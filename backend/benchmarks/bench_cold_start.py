@@ -0,0 +1,107 @@
+"""Cold-start cost of the prerequisite structures: row-by-row parse + graph walk vs. the deduplicated, vectorized build.
+
+    python backend/benchmarks/bench_cold_start.py [--repeat 3]
+"""
+import argparse
+import re
+import sys
+import time
+
+import numpy as np
+
+from common import load_catalog
+from catalog_index import CatalogIndex
+from prereq_graph import CampusGraph, COURSE, EXTERNAL, LOGIC
+from prereq_parser import normalize_course_id, parse_prerequisite_column, edges_for_rows
+
+
+def legacy_parse(prereq_text):
+    # the original parse_prerequisite: several re passes per row, compiled on the fly
+    if not isinstance(prereq_text, str) or not prereq_text.strip(): return []
+    text = prereq_text.upper().replace("\xa0", " ").strip()
+    text = re.sub(r"\s+[A-D][+-]?\s+OR\s+BETTER", "", text)
+    text = re.sub(r"\(", " ( ", text)
+    text = re.sub(r"\)", " ) ", text)
+    structure = []
+    for part in [p.strip() for p in text.split(';')]:
+        if not part: continue
+        courses = re.findall(r'\b[A-Z&]{2,5}\s*\d+[A-Z]*\b', part)
+        if not courses: continue
+        normalized = [normalize_course_id(c) for c in courses]
+        if ' OR ' in part or 'ONE OF' in part:
+            structure.append(normalized)
+        else:
+            structure.extend([c] for c in normalized)
+    return structure
+
+
+def legacy_graph(campus_df):
+    # row-by-row walk over the campus rows, as get_campus_graph did with iterrows()
+    labels, kinds, titles, ids, edges = [], [], [], {}, set()
+
+    def node(label, kind):
+        if label not in ids:
+            ids[label] = len(labels)
+            labels.append(sys.intern(label)); kinds.append(kind); titles.append(None)
+        return ids[label]
+
+    for _, row in campus_df.iterrows():
+        tgt = row['Course_ID']
+        t = node(tgt, COURSE)
+        kinds[t], titles[t] = COURSE, row['Title']
+        for group in row['Prereq_Struct']:
+            if len(group) == 1:
+                if group[0] != tgt: edges.add((node(group[0], EXTERNAL), t))
+            else:
+                o = node(f"OR_{tgt}_{'_'.join(group)}", LOGIC)
+                edges.add((o, t))
+                for src in group:
+                    if src != tgt: edges.add((node(src, EXTERNAL), o))
+    pairs = np.array(sorted(edges), dtype=np.int32).reshape(-1, 2)
+    return CampusGraph(labels, kinds, np.array(titles, dtype=object), pairs[:, 0], pairs[:, 1])
+
+
+def legacy_build(df, catalog):
+    df = df.assign(Prereq_Struct=df['Prerequisite(s)'].apply(legacy_parse))
+    return {c: legacy_graph(df[df['Campus'] == c]) for c in catalog.ranges}
+
+
+def vectorized_build(df, catalog):
+    edges = parse_prerequisite_column(df['Prerequisite(s)'].values)
+    graphs = {}
+    for c in catalog.ranges:
+        rows = catalog.campus_rows(c)
+        graphs[c] = CampusGraph.build(catalog.course_ids[rows], catalog.titles[rows], edges_for_rows(edges, rows, len(catalog)))
+    return graphs
+
+
+def edge_labels(g):
+    return {(g.labels[s], g.labels[d]) for s in range(len(g)) for d in g.successors(s).tolist()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    catalog = CatalogIndex(df)
+    texts = df['Prerequisite(s)']
+    print(f"{texts.notna().sum()} prerequisite strings, {texts.nunique()} distinct")
+
+    results = {}
+    for name, build in (('row-by-row', legacy_build), ('vectorized', vectorized_build)):
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            graphs = build(df, catalog)
+            times.append(time.perf_counter() - t0)
+        results[name] = graphs
+        print(f"{name:<12} best {min(times) * 1000:8.1f} ms   mean {np.mean(times) * 1000:8.1f} ms")
+
+    same = all(edge_labels(results['row-by-row'][c]) == edge_labels(results['vectorized'][c]) for c in catalog.ranges)
+    print(f"identical graphs: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Embedding build: full re-encode vs. the incremental build after 1% of descriptions change.
+
+    python backend/benchmarks/bench_embedding_build.py [--model BAAI/bge-base-en-v1.5] [--processes 2]
+                                                       [--changed 0.01] [--limit 0]
+
+Works on a copy of the catalog in a temp dir: a full build, then `--changed` of the rows get an
+edited description and the build runs again against the first output. Needs sentence-transformers.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from common import load_catalog
+from build_embeddings import build
+from course_vectors import read_vectors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='BAAI/bge-base-en-v1.5')
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--changed', type=float, default=0.01)
+    parser.add_argument('--limit', type=int, default=0, help="only the first N catalog rows (0 = all)")
+    args = parser.parse_args()
+
+    df = load_catalog()
+    if args.limit:
+        df = df.head(args.limit)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv, out = os.path.join(tmp, 'catalog.csv'), os.path.join(tmp, 'course_embeddings.vec')
+        df.to_csv(csv, index=False)
+        rows, encoded, full = build(csv, out, args.model, processes=args.processes, full=True)
+        print(f"full build:        {rows} rows, {encoded} encoded, {full:.1f} s")
+        _, _, before = read_vectors(out)
+        before = np.array(before)
+
+        rng = np.random.default_rng(0)
+        changed = rng.choice(len(df), max(1, int(len(df) * args.changed)), replace=False)
+        df = df.copy()
+        df.loc[df.index[changed], 'Course Description'] = df['Course Description'].iloc[changed].fillna('').astype(str) + ' (Revised.)'
+        df.to_csv(csv, index=False)
+        rows, encoded, incremental = build(csv, out, args.model, processes=args.processes)
+        print(f"incremental build: {rows} rows, {encoded} encoded, {incremental:.1f} s "
+              f"({len(changed)} rows changed, {full / incremental:.1f}x faster)")
+
+        _, _, after = read_vectors(out)
+        kept = np.setdiff1d(np.arange(rows), changed)
+        print(f"unchanged rows identical: {bool(np.array_equal(before[kept], after[kept]))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Memory and k-hop query time: per-campus networkx DiGraphs vs. the CSR CampusGraph.
+
+    pip install -r backend/benchmarks/requirements.txt   # networkx, for the reference implementation
+    python backend/benchmarks/bench_graph.py [--queries 500]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+from common import load_catalog, time_calls, summarize
+from catalog_index import CatalogIndex
+from prereq_graph import CampusGraph
+from prereq_parser import parse_prerequisite, parse_prerequisite_column, edges_for_rows
+
+
+def build_networkx(campus_df):
+    # the pre-CSR get_campus_graph
+    G = nx.DiGraph()
+    for _, row in campus_df.iterrows():
+        tgt = row['Course_ID']
+        G.add_node(tgt, label=tgt, title=row['Title'], group='Course')
+        for group in row['Prereq_Struct']:
+            if not group: continue
+            if len(group) == 1:
+                src = group[0]
+                if src != tgt:
+                    if src not in G: G.add_node(src, label=src, group='External')
+                    G.add_edge(src, tgt)
+            else:
+                or_id = f"OR_{tgt}_{'_'.join(group)}"
+                if or_id not in G: G.add_node(or_id, label="OR", size=5, group='Logic')
+                G.add_edge(or_id, tgt)
+                for src in group:
+                    if src != tgt:
+                        if src not in G: G.add_node(src, label=src, group='External')
+                        G.add_edge(src, or_id)
+    return G
+
+
+def networkx_subgraph(full_graph, root_node, depth):
+    # the pre-CSR get_semantic_subgraph
+    nodes_to_keep = {root_node}
+    current_frontier = {root_node}
+    for _ in range(depth):
+        next_frontier = set()
+        for node in current_frontier:
+            if node not in full_graph: continue
+            for p in full_graph.predecessors(node):
+                nodes_to_keep.add(p)
+                if str(p).startswith("OR_"):
+                    for gp in full_graph.predecessors(p):
+                        nodes_to_keep.add(gp)
+                        next_frontier.add(gp)
+                else:
+                    next_frontier.add(p)
+        current_frontier = next_frontier
+        if not current_frontier: break
+    return full_graph.subgraph(list(nodes_to_keep))
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    df['Prereq_Struct'] = df['Prerequisite(s)'].apply(parse_prerequisite)
+    catalog = CatalogIndex(df)
+    edges = parse_prerequisite_column(df['Prerequisite(s)'].values)
+    rng = np.random.default_rng(1)
+
+    for campus in sorted(catalog.ranges):
+        rows = catalog.campus_rows(campus)
+        campus_df = df.iloc[rows]
+        G, nx_bytes, nx_s = measure(lambda: build_networkx(campus_df))
+        campus_edges = edges_for_rows(edges, rows, len(catalog))
+        csr, csr_bytes, csr_s = measure(lambda: CampusGraph.build(
+            catalog.course_ids[rows], catalog.titles[rows], campus_edges))
+        print(f"\n{campus}: {len(csr)} nodes, {csr.n_edges} edges")
+        print(f"  build   networkx {nx_s * 1000:8.1f} ms {nx_bytes / 2**20:7.2f} MiB   "
+              f"CSR {csr_s * 1000:8.1f} ms {csr_bytes / 2**20:7.2f} MiB (edge arrays {csr.nbytes() / 2**20:.2f} MiB)")
+
+        roots = [catalog.course_ids[r] for r in rng.choice(rows, args.queries)]
+        for depth in (1, 3, 5, 10):
+            nx_ms = time_calls(lambda r: networkx_subgraph(G, r, depth), [(r,) for r in roots])
+            csr_ms = time_calls(lambda r: csr.semantic_subgraph(csr.node_id(r), depth), [(r,) for r in roots])
+            print(f"  {summarize(f'depth {depth} networkx', nx_ms)}")
+            print(f"  {summarize(f'depth {depth} CSR', csr_ms)}")
+
+
+if __name__ == '__main__':
+    main()
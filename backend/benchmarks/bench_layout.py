@@ -0,0 +1,98 @@
+"""Layout cost and quality: single-pass parent-average ordering vs. the layered barycenter layout.
+
+    python backend/benchmarks/bench_layout.py [--queries 200] [--depths 1 3 5 10]
+
+Reports per-depth mean/p99 layout time, edge crossings between adjacent layers and the
+widest layer (x extent), over random courses plus the largest subgraph of each campus.
+"""
+import argparse
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+from catalog_index import CatalogIndex
+from graph_layout import X_SEP, Y_SEP, layered_layout
+from prereq_graph import COURSE, LOGIC, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+
+
+def legacy_layout(graph, nodes, root):
+    # the previous get_optimized_tree_layout: BFS levels, one sort per layer, layers centered on 0
+    inside = set(nodes.tolist())
+    seen = {root}
+    layers = [[root]]
+    while True:
+        next_layer = []
+        for n in layers[-1]:
+            for p in graph.predecessors(n).tolist():
+                if p in inside and p not in seen:
+                    seen.add(p)
+                    next_layer.append(p)
+        if not next_layer: break
+        layers.append(next_layer)
+    pos = {root: (0, 0)}
+    for level, current in enumerate(layers[1:], start=1):
+        scores = []
+        for n in current:
+            parents = [p for p in graph.successors(n).tolist() if p in pos]
+            avg = sum(pos[p][0] for p in parents) / len(parents) if parents else 0
+            scores.append((avg, int(graph.kinds[n] == LOGIC), graph.labels[n], n))
+        scores.sort()
+        for i, (_, _, _, n) in enumerate(scores):
+            pos[n] = ((i - (len(scores) - 1) / 2) * X_SEP, -level * Y_SEP)
+    x = np.array([pos[n][0] if n in pos else np.nan for n in nodes.tolist()])
+    y = np.array([pos[n][1] if n in pos else np.nan for n in nodes.tolist()])
+    return x, y
+
+
+def quality(graph, nodes, x, y):
+    src, dst = graph.induced_edges(nodes)
+    s, d = np.searchsorted(nodes, src), np.searchsorted(nodes, dst)
+    level = np.rint(-y / Y_SEP)
+    adjacent = np.abs(level[s] - level[d]) == 1
+    s, d = s[adjacent], d[adjacent]
+    upper = np.where(level[s] < level[d], s, d)
+    lower = np.where(level[s] < level[d], d, s)
+    crossings = 0
+    for l in np.unique(level[upper]):
+        m = level[upper] == l
+        a, b = x[upper[m]], x[lower[m]]
+        crossings += int(((a[:, None] < a) & (b[:, None] > b)).sum())
+    widths = [np.ptp(x[level == l]) for l in np.unique(level[~np.isnan(level)])]
+    return crossings, max(widths)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 3, 5, 10])
+    args = parser.parse_args()
+
+    df = load_catalog()
+    catalog = CatalogIndex(df)
+    graphs = build_campus_graphs(catalog, parse_prerequisite_column(df['Prerequisite(s)'].values))
+
+    rng = np.random.default_rng(0)
+    roots = []
+    for campus, g in graphs.items():
+        courses = np.flatnonzero(g.kinds == COURSE)
+        roots += [(g, int(r)) for r in rng.choice(courses, args.queries // len(graphs))]
+        largest = max(courses.tolist(), key=lambda r: len(g.semantic_subgraph(r, 10)))
+        roots.append((g, largest))
+
+    for depth in args.depths:
+        cases = [(g, g.semantic_subgraph(r, depth), r) for g, r in roots]
+        sizes = np.array([len(nodes) for _, nodes, _ in cases])
+        print(f"depth {depth}: {sizes.mean():.1f} nodes on average, {sizes.max()} at most")
+        for name, layout in (('single pass', legacy_layout), ('layered', layered_layout)):
+            times = time_calls(layout, cases)
+            stats = np.array([quality(g, nodes, *layout(g, nodes, r)) for g, nodes, r in cases])
+            print(f"  {summarize(name, times)}   crossings {stats[:, 0].sum():6.0f}   "
+                  f"mean width {stats[:, 1].mean():6.1f}   max width {stats[:, 1].max():6.1f}")
+        big = int(sizes.argmax())
+        times = time_calls(layered_layout, [cases[big]] * 20)
+        print(f"  largest subgraph ({sizes[big]} nodes): layered {times.mean():.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
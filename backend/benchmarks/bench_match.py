@@ -0,0 +1,67 @@
+"""/api/match latency: lazy model load, uncached and cached queries, and concurrent queries with and without micro-batching.
+
+    python backend/benchmarks/bench_match.py [--queries 200] [--clients 8]
+
+Queries are course descriptions of random catalog rows (the length of pasted syllabus text),
+lightly edited so none is an exact catalog text. Runs the app in-process with its /app files;
+the encoder is the ONNX export in QUERY_ENCODER_DIR if there is one, else the torch model with
+dynamic int8 quantization (needs sentence-transformers).
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=8)
+    args = parser.parse_args()
+
+    import app
+    client = app.app.test_client()
+    df = load_catalog()
+    texts = df['Course Description'].dropna().astype(str).sample(args.queries * 3, random_state=0).tolist()
+    texts = [f"Syllabus: {t}" for t in texts]
+
+    def post(text):
+        r = client.post('/api/match', json={'text': text, 'k': 5})
+        assert r.status_code == 200, r.get_json()
+
+    t0 = time.perf_counter()
+    post(texts[0])
+    print(f"first request (loads the model): {(time.perf_counter() - t0) * 1000:.0f} ms, "
+          f"backend {app.query_encoder.backend.name}")
+
+    uncached = time_calls(post, [(t,) for t in texts[1:args.queries + 1]])
+    print(summarize('uncached', uncached) + f"   p95 {np.percentile(uncached, 95):8.3f} ms")
+    cached = time_calls(post, [(t,) for t in texts[1:args.queries + 1]])
+    print(summarize('cached', cached) + f"   p95 {np.percentile(cached, 95):8.3f} ms")
+
+    fresh = iter(texts[args.queries + 1:])
+    for max_batch in (1, app.QUERY_BATCH_MAX):
+        app.query_encoder.max_batch = max_batch
+        batch = [next(fresh) for _ in range(args.queries // 2)]
+        times = []
+
+        def timed(text):
+            t = time.perf_counter()
+            post(text)
+            times.append((time.perf_counter() - t) * 1000)
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as pool:
+            list(pool.map(timed, batch))
+        elapsed = time.perf_counter() - t0
+        times = np.array(times)
+        print(f"{args.clients} clients, max_batch {max_batch:<3} {len(batch) / elapsed:7.1f} req/s   "
+              f"p50 {np.percentile(times, 50):8.3f} ms   p95 {np.percentile(times, 95):8.3f} ms")
+    print(app.query_encoder.stats())
+
+
+if __name__ == '__main__':
+    main()
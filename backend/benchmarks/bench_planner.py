@@ -0,0 +1,94 @@
+"""Planner latency on the deepest prerequisite chains of each campus.
+
+    python backend/benchmarks/bench_planner.py [--top 20] [--per-term 2 3 4] [--completed 5]
+
+Targets are the courses with the longest ancestor chains in the closure. Each is planned
+from scratch and with `--completed` random courses of its campus marked as done.
+
+Before timing, every catalog course is planned once to check that no OR group
+took a new course while another of its options was already in the plan
+(UCD ECE213 needs ECE30 and ECE141A, and ECE141A one of ECE17/CSE30/ECE30:
+the plan is ECE213, ECE141A, ECE30 and ECE15). Plans with an OR group left
+unsatisfied by a prerequisite cycle are counted too.
+"""
+import argparse
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+from catalog_index import CatalogIndex
+from course_planner import CoursePlanner
+from prereq_closure import PrereqClosure
+from prereq_graph import COURSE, LOGIC, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+
+
+def avoidable_choices(g, plan):
+    """OR groups that took an option nothing else in the plan needs while another option was in the plan."""
+    preds = lambda v: g.pred_indices[g.pred_indptr[v]:g.pred_indptr[v + 1]].tolist()
+    needed, choices, cycles = set(plan['needed']), plan['choices'], set(plan['cycles'])
+    holders = {}
+    for c in needed:
+        for p in preds(c):
+            if (c, p) in cycles:
+                continue
+            if g.kinds[p] == LOGIC:
+                if choices.get(p) is not None:
+                    holders.setdefault(choices[p], set()).add(p)
+            else:
+                holders.setdefault(p, set()).add(c)
+    return [grp for grp, o in choices.items() if holders.get(o, set()) <= {grp}
+            and any(x != o and x in needed and (grp, x) not in cycles for x in preds(grp))]
+
+
+def check_shared_options(graphs):
+    if 'UCD' in graphs and graphs['UCD'].node_id('ECE213') is not None:
+        g = graphs['UCD']
+        plan = sorted(g.labels[c] for c in CoursePlanner(g).plan(g.node_id('ECE213'))['needed'])
+        assert plan == ['ECE141A', 'ECE15', 'ECE213', 'ECE30'], plan
+        print(f"UCD ECE213 plan: {', '.join(plan)}")
+    bad = total = unmet = 0
+    for campus, g in graphs.items():
+        planner = CoursePlanner(g)
+        for v in np.flatnonzero(g.kinds == COURSE).tolist():
+            plan = planner.plan(v)
+            total += 1
+            bad += bool(avoidable_choices(g, plan))
+            unmet += bool(plan['unsatisfied'])
+    print(f"{bad} of {total} catalog plans with an OR group that added a course it could have shared")
+    print(f"{unmet} of {total} catalog plans with an OR group no option could be planned for (reported as unsatisfied)")
+    assert bad == 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--per-term', type=int, nargs='+', default=[2, 3, 4])
+    parser.add_argument('--completed', type=int, default=5)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    graphs = build_campus_graphs(CatalogIndex(df), parse_prerequisite_column(df['Prerequisite(s)'].values))
+    check_shared_options(graphs)
+
+    rng = np.random.default_rng(0)
+    for campus, g in graphs.items():
+        closure = PrereqClosure.build(g)
+        planner = CoursePlanner(g)
+        courses = np.flatnonzero(g.kinds == COURSE)
+        deepest = courses[np.argsort(closure.height[courses], kind='stable')[::-1][:args.top]].tolist()
+        print(f"{campus}: deepest chains {closure.height[deepest[0]]}-{closure.height[deepest[-1]]} levels, "
+              f"up to {max(len(closure.ancestors(v)[0]) for v in deepest)} ancestors")
+        scratch = [(v, ()) for v in deepest]
+        partial = [(v, rng.choice(courses, args.completed).tolist()) for v in deepest]
+        for per_term in args.per_term:
+            for name, cases in (('from scratch', scratch), (f'{args.completed} completed', partial)):
+                times = time_calls(lambda v, done: planner.plan(v, done, per_term), cases)
+                plans = [planner.plan(v, done, per_term) for v, done in cases]
+                needed = np.mean([len(p['needed']) for p in plans])
+                terms = np.mean([len(p['terms']) for p in plans])
+                print(f"  {summarize(f'{per_term}/term, {name}', times)}   needed {needed:5.1f}   terms {terms:5.1f}   max {times.max():.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
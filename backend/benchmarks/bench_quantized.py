@@ -0,0 +1,86 @@
+"""RSS and top-5 agreement: float32 embeddings on the heap vs. the mmap'd quantized store.
+
+    python backend/benchmarks/bench_quantized.py [--queries 200]
+
+Each variant is measured in a fresh interpreter so RSS is not polluted by the other.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import load_catalog, load_embeddings
+
+
+def rss_kb():
+    fields = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS', 'RssAnon', 'RssFile')):
+                name, value = line.split(':')
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def child(variant, workdir, queries):
+    from campus_index import CampusEmbeddingIndex
+    from embedding_store import QuantizedCampusIndex
+    campuses = np.load(os.path.join(workdir, 'campuses.npy'), allow_pickle=True)
+    before = rss_kb()
+    if variant == 'float32':
+        index = CampusEmbeddingIndex.build(campuses, np.load(os.path.join(workdir, 'emb.npy')))
+    else:
+        index = QuantizedCampusIndex(os.path.join(workdir, f'emb.{variant}'))
+    loaded = rss_kb()
+    targets = np.random.default_rng(1).integers(0, len(campuses), queries)
+    t0 = time.perf_counter()
+    hits = [index.search([int(t)], k=5, exclude=campuses[t])[0] for t in targets]
+    ms = (time.perf_counter() - t0) * 1000 / queries
+    after = rss_kb()
+    top5 = [{c: [r for r, _ in h] for c, h in res.items()} for res in hits]
+    print(json.dumps({'before': before, 'loaded': loaded, 'after': after, 'ms': ms, 'top5': top5}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'WORKDIR'))
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child[0], args.child[1], args.queries)
+
+    from embedding_store import write_store
+    df = load_catalog()
+    embeddings = load_embeddings(len(df))
+    with tempfile.TemporaryDirectory() as workdir:
+        np.save(os.path.join(workdir, 'campuses.npy'), df['Campus'].values.astype(object), allow_pickle=True)
+        np.save(os.path.join(workdir, 'emb.npy'), embeddings)
+        write_store(os.path.join(workdir, 'emb.int8'), df['Campus'].values, embeddings, dtype='int8')
+        write_store(os.path.join(workdir, 'emb.int8-nofull'), df['Campus'].values, embeddings, dtype='int8', keep_full=False)
+        write_store(os.path.join(workdir, 'emb.float16'), df['Campus'].values, embeddings, dtype='float16', keep_full=False)
+        del embeddings
+
+        results = {}
+        for variant in ('float32', 'int8', 'int8-nofull', 'float16'):
+            out = subprocess.run([sys.executable, __file__, '--queries', str(args.queries), '--child', variant, workdir],
+                                 capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__))
+            results[variant] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    ref = results['float32']['top5']
+    # RssAnon is private to the process; RssFile is page cache shared by every worker mapping the store
+    print(f"{'variant':<13}{'load RSS':>11}{'RssAnon':>11}{'RssFile':>11}{'ms/query':>10}{'top5 agree':>12}")
+    for variant, r in results.items():
+        agree = np.mean([res[c] == ref_res[c] for res, ref_res in zip(r['top5'], ref) for c in res])
+        load_mb = (r['loaded']['VmRSS'] - r['before']['VmRSS']) / 1024
+        anon_mb = (r['after']['RssAnon'] - r['before']['RssAnon']) / 1024
+        file_mb = (r['after']['RssFile'] - r['before']['RssFile']) / 1024
+        print(f"{variant:<13}{load_mb:>9.1f}MB{anon_mb:>9.1f}MB{file_mb:>9.1f}MB{r['ms']:>10.2f}{agree:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
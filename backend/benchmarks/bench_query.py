@@ -0,0 +1,60 @@
+"""Latency of free-text /api/query: BM25 alone, with campus/subject filters, and fused with embeddings.
+
+    python backend/benchmarks/bench_query.py [--queries 300]
+
+Queries are words drawn from random course titles (1-4 per query). The baseline is a
+case-insensitive substring scan of Title + Course Description per query word, which is
+roughly what a DataFrame filter would do. Runs the app in-process with its /app files.
+"""
+import argparse
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+from text_index import tokenize
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    import app
+    client = app.app.test_client()
+    df = load_catalog()
+    rng = np.random.default_rng(0)
+    queries = []
+    for title in df['Title'].dropna().sample(args.queries * 2, random_state=0):
+        words = [w for w in str(title).split() if tokenize(w)]
+        if words:
+            queries.append(' '.join(words[:rng.integers(1, 5)]))
+    queries = queries[:args.queries]
+    campuses = sorted(df['Campus'].unique())
+    print(f"{len(df)} rows, {len(queries)} queries, index {app.text_index.nbytes() >> 10} KB")
+
+    text = (df['Title'].fillna('') + ' ' + df['Course Description'].fillna('')).str.lower()
+
+    def scan(q):
+        hit = np.zeros(len(text), dtype=int)
+        for w in q.lower().split():
+            hit += text.str.contains(w, regex=False).to_numpy()
+        return np.argsort(-hit)[:20]
+
+    def get(params):
+        r = client.get('/api/query', query_string=params)
+        assert r.status_code == 200, r.get_json()
+
+    cases = [(q,) for q in queries]
+    print(summarize('substring scan', time_calls(scan, cases[:30])))
+    print(summarize('TextIndex.search', time_calls(lambda q: app.text_index.search(q, 20), cases)))
+    print(summarize('/api/query', time_calls(lambda q: get({'q': q}), cases)))
+    print(summarize('/api/query campus+subject', time_calls(
+        lambda q: get({'q': q, 'campus': campuses[len(q) % len(campuses)], 'subject': 'MATH,CHEM,PHYS'}), cases)))
+    if app.emb_index is not None:
+        print(summarize('/api/query fuse=1', time_calls(lambda q: get({'q': q, 'fuse': 1}), cases)))
+        print(summarize('/api/query fuse=1 campus', time_calls(
+            lambda q: get({'q': q, 'fuse': 1, 'campus': campuses[len(q) % len(campuses)]}), cases)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Graph response build time and payload size: go.Figure + json round trip vs. the direct dict + orjson path.
+
+    python backend/benchmarks/bench_serialize.py [--queries 200] [--depths 1 3 5]
+
+Both paths include the layout and produce the body /api/search sends; the script also
+checks that they decode to the same figure.
+"""
+import argparse
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.utils
+
+from common import load_catalog, summarize, time_calls
+from catalog_index import CatalogIndex
+from graph_export import STYLE, dumps, node_roles, plotly_figure
+from graph_layout import layered_layout
+from prereq_graph import COURSE, LOGIC, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+
+
+def figure_json(graph, nodes, title, highlight, valid_subjects):
+    # the previous create_plotly_json: lists, go.Figure validation, dumps + loads, then jsonify
+    x, y = layered_layout(graph, nodes, highlight)
+    pos = {n: (px, py) for n, px, py in zip(nodes.tolist(), x.tolist(), y.tolist()) if px == px}
+    placed = np.array([n in pos for n in nodes.tolist()])
+    edge_x, edge_y = [], []
+    for u, v in zip(*graph.induced_edges(nodes)):
+        if u in pos and v in pos:
+            edge_x.extend([pos[u][0], pos[v][0], None])
+            edge_y.extend([pos[u][1], pos[v][1], None])
+    node_x, node_y, txt, color, size, ids = [], [], [], [], [], []
+    roles = node_roles(graph, nodes[placed], dict.fromkeys(pos, True), highlight, valid_subjects)
+    for n, role in zip(nodes[placed].tolist(), roles):
+        label, kind = graph.labels[n], graph.kinds[n]
+        c, s, prefix = STYLE[role]
+        node_x.append(pos[n][0]); node_y.append(pos[n][1]); ids.append(label); color.append(c); size.append(s)
+        node_title = graph.titles[n] if kind == COURSE else ''
+        if kind == LOGIC: txt.append("")
+        elif node_title: txt.append(f"<b>{prefix}: {label}</b><br>{node_title}")
+        else: txt.append(f"<b>{prefix}: {label}</b>")
+    fig = go.Figure(data=[
+        go.Scatter(x=edge_x, y=edge_y, mode='lines', line=dict(color='#ccc', width=0.8), hoverinfo='none'),
+        go.Scatter(x=node_x, y=node_y, mode='markers', marker=dict(color=color, size=size), hovertext=txt, hoverinfo='text', customdata=ids)
+    ], layout=go.Layout(
+        title={'text': title, 'x': 0.5, 'font': {'size': 16}}, showlegend=False, hovermode='closest',
+        margin=dict(t=40, b=20, l=5, r=5), xaxis=dict(visible=False), yaxis=dict(visible=False), clickmode='event+select'
+    ))
+    graph_dict = json.loads(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+    return json.dumps({'graph': graph_dict, 'prereq_list': 'None', 'similarity': {}}, sort_keys=True).encode()
+
+
+def direct_json(graph, nodes, title, highlight, valid_subjects):
+    return dumps({'prereq_list': 'None', 'graph': plotly_figure(graph, nodes, title, highlight, valid_subjects), 'similarity': {}})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 3, 5])
+    args = parser.parse_args()
+
+    df = load_catalog()
+    catalog = CatalogIndex(df)
+    graphs = build_campus_graphs(catalog, parse_prerequisite_column(df['Prerequisite(s)'].values))
+
+    rng = np.random.default_rng(0)
+    roots = []
+    for campus, g in graphs.items():
+        # courses with at least one prerequisite, where the graph is the bulk of the response
+        courses = [n for n in np.flatnonzero(g.kinds == COURSE).tolist() if len(g.predecessors(n))]
+        roots += [(campus, g, int(r)) for r in rng.choice(courses, args.queries // len(graphs))]
+
+    for depth in args.depths:
+        cases = [(g, g.semantic_subgraph(r, depth), f"Tree: {g.labels[r]} (Depth {depth})", r, catalog.subjects.get(c, set()))
+                 for c, g, r in roots]
+        sizes = np.array([len(case[1]) for case in cases])
+        print(f"depth {depth}: {sizes.mean():.1f} nodes on average, {sizes.max()} at most")
+        same = True
+        for name, build in (('go.Figure + json', figure_json), ('direct + orjson', direct_json)):
+            times = time_calls(build, cases)
+            bodies = [build(*case) for case in cases]
+            kb = np.array([len(b) for b in bodies]) / 1024
+            print(f"  {summarize(name, times)}   payload mean {kb.mean():6.1f} KB   max {kb.max():6.1f} KB")
+            if name == 'go.Figure + json':
+                reference = [json.loads(b) for b in bodies]
+            else:
+                same = all(json.loads(b) == ref for b, ref in zip(bodies, reference))
+        print(f"  identical figures: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Per-request similarity cost: per-campus masks vs. the campus-partitioned index.
+
+    python backend/benchmarks/bench_similarity.py [--queries 300]
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from common import load_catalog, load_embeddings, time_calls, summarize
+from campus_index import CampusEmbeddingIndex
+
+
+def legacy_similarity(df, embeddings, campuses, target_idx, campus):
+    # the pre-index implementation of the NumPy branch in search()
+    from sklearn.metrics.pairwise import cosine_similarity
+    target_emb = embeddings[target_idx].reshape(1, -1)
+    sim_res = {}
+    for c in campuses:
+        if c == campus:
+            sim_res[c] = []
+            continue
+        mask = (df['Campus'] == c)
+        if not mask.any():
+            sim_res[c] = []
+            continue
+        c_embs = embeddings[mask.values]
+        c_idxs = df[mask].index
+        scores = cosine_similarity(target_emb, c_embs)[0]
+        top_indices = scores.argsort()[::-1][:5]
+        sim_res[c] = [(int(c_idxs[i]), float(scores[i])) for i in top_indices]
+    return sim_res
+
+
+def indexed_similarity(index, campuses, target_idx, campus):
+    return index.search([target_idx], k=5, campuses=campuses, exclude=campus)[0]
+
+
+def peak_alloc_kb(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=300)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    embeddings = load_embeddings(len(df))
+    campuses = sorted(df['Campus'].unique())
+    index = CampusEmbeddingIndex.build(df['Campus'].values, embeddings)
+
+    rng = np.random.default_rng(1)
+    targets = rng.integers(0, len(df), args.queries)
+    legacy_args = [(df, embeddings, campuses, int(t), df['Campus'].iat[t]) for t in targets]
+    index_args = [(index, campuses, int(t), df['Campus'].iat[t]) for t in targets]
+
+    agree = np.mean([
+        [r for r, _ in legacy_similarity(*la)[c]] == [r for r, _ in indexed_similarity(*ia)[c]]
+        for la, ia in zip(legacy_args[:50], index_args[:50]) for c in campuses
+    ])
+    print(f"top-5 agreement with legacy path: {agree:.3f}")
+
+    legacy_ms = time_calls(legacy_similarity, legacy_args)
+    index_ms = time_calls(indexed_similarity, index_args)
+    print(summarize('legacy masks + 4 searches', legacy_ms))
+    print(summarize('partitioned index', index_ms))
+    print(f"speedup (mean): {legacy_ms.mean() / index_ms.mean():.1f}x")
+    print(f"peak allocation per request: legacy {peak_alloc_kb(legacy_similarity, *legacy_args[0]):,.0f} KiB, "
+          f"index {peak_alloc_kb(indexed_similarity, *index_args[0]):,.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Cold vs. warm startup: deriving catalog, prerequisite edges and campus graphs from the CSV vs. mapping the snapshot.
+
+    python backend/benchmarks/bench_startup.py [--repeat 3]
+
+Each start runs in a fresh interpreter (imports excluded from the timing), the way a
+restarted worker would see it.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import load_catalog
+
+
+def child(variant, workdir):
+    from catalog_index import CatalogIndex, load_catalog_csv
+    from prereq_graph import build_campus_graphs
+    from prereq_parser import parse_prerequisite_column
+    from snapshot import file_digest, load_snapshot, save_snapshot
+
+    csv_path = os.path.join(workdir, 'catalog.csv')
+    snapshot_path = os.path.join(workdir, 'startup.snapshot')
+    t0 = time.perf_counter()
+    key = file_digest([csv_path])
+    snapshot = load_snapshot(snapshot_path, key) if variant == 'warm' else None
+    if snapshot is not None:
+        df, edges, graphs, _ = snapshot
+        catalog = CatalogIndex(df)
+    else:
+        df = load_catalog_csv(csv_path)
+        catalog = CatalogIndex(df)
+        edges = parse_prerequisite_column(df['Prerequisite(s)'].values)
+        graphs = build_campus_graphs(catalog, edges)
+    ms = (time.perf_counter() - t0) * 1000
+    if variant == 'save':
+        save_snapshot(snapshot_path, key, df, edges, graphs, None)
+    sizes = {c: [len(g), g.n_edges] for c, g in graphs.items()}
+    print(json.dumps({'ms': ms, 'hit': snapshot is not None, 'edges': len(edges), 'graphs': sizes}))
+
+
+def run(variant, workdir):
+    out = subprocess.run([sys.executable, __file__, '--child', variant, workdir],
+                         capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'WORKDIR'))
+    args = parser.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    df = load_catalog()
+    with tempfile.TemporaryDirectory() as workdir:
+        df.drop(columns='Course_ID').to_csv(os.path.join(workdir, 'catalog.csv'), index=False)
+        saved = run('save', workdir)
+        size_mb = os.path.getsize(os.path.join(workdir, 'startup.snapshot')) / 2 ** 20
+        print(f"snapshot: {size_mb:.1f} MB")
+
+        results = {}
+        for variant in ('cold', 'warm'):
+            runs = [run(variant, workdir) for _ in range(args.repeat)]
+            assert all(r['hit'] == (variant == 'warm') for r in runs)
+            results[variant] = runs
+            times = np.array([r['ms'] for r in runs])
+            print(f"{variant:<6} best {times.min():8.1f} ms   mean {times.mean():8.1f} ms")
+
+    same = all(r['graphs'] == saved['graphs'] and r['edges'] == saved['edges'] for runs in results.values() for r in runs)
+    print(f"identical structures: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Latency of the "what does this course unlock" query: successor index vs. a breadth-first walk over successors.
+
+    python backend/benchmarks/bench_unlocks.py [--queries 300] [--completed 10]
+
+Roots are random courses plus the ten with the most descendants on each campus; each
+query also gets `--completed` random courses from the same campus as already done.
+"""
+import argparse
+
+import numpy as np
+
+from common import load_catalog, summarize, time_calls
+from catalog_index import CatalogIndex
+from prereq_closure import PrereqClosure
+from prereq_graph import COURSE, LOGIC, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+from prereq_unlocks import UnlockIndex
+
+
+def walk_unlocks(graph, v, completed):
+    # every course reachable over successor edges, with the requirement check done per course
+    have = set(completed) | {v}
+    seen, frontier, out = {v}, [v], []
+    while frontier:
+        nxt = []
+        for n in frontier:
+            for s in graph.successors(n).tolist():
+                if s in seen: continue
+                seen.add(s)
+                nxt.append(s)
+                if graph.kinds[s] == COURSE and s not in have:
+                    missing = sum(
+                        (not any(q in have for q in graph.predecessors(p).tolist())) if graph.kinds[p] == LOGIC else p not in have
+                        for p in graph.predecessors(s).tolist())
+                    out.append((s, missing))
+        frontier = nxt
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--completed', type=int, default=10)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    graphs = build_campus_graphs(CatalogIndex(df), parse_prerequisite_column(df['Prerequisite(s)'].values))
+    indexes = {c: UnlockIndex(g, PrereqClosure.build(g)) for c, g in graphs.items()}
+
+    rng = np.random.default_rng(0)
+    random_cases, gateway_cases = [], []
+    for campus, g in graphs.items():
+        u = indexes[campus]
+        courses = np.flatnonzero(g.kinds == COURSE)
+        done = lambda: rng.choice(courses, args.completed).tolist()
+        random_cases += [(campus, int(r), done()) for r in rng.choice(courses, args.queries // len(graphs))]
+        sizes = np.diff(u.indptr)[courses]
+        gateway_cases += [(campus, int(r), done()) for r in courses[np.argsort(sizes)[-10:]]]
+        print(f"{campus}: most descendants {sizes.max()}, index {u.nbytes() / 1024:.0f} KB")
+
+    for name, cases in (('random courses', random_cases), ('gateway courses', gateway_cases)):
+        print(name)
+        walk = time_calls(lambda c, v, done: walk_unlocks(graphs[c], v, done), cases)
+        direct = time_calls(lambda c, v, done: indexes[c].unlocks(v, done, max_dist=1), cases)
+        full = time_calls(lambda c, v, done: indexes[c].unlocks(v, done, max_dist=None), cases)
+        same = all(sorted((n, m) for n, _, m in indexes[c].unlocks(v, done, None)) == sorted(walk_unlocks(graphs[c], v, done))
+                   for c, v, done in cases)
+        print(f"  {summarize('successor walk, all', walk)}")
+        print(f"  {summarize('index, direct', direct)}")
+        print(f"  {summarize('index, all', full)}   same as walk: {same}")
+
+
+if __name__ == '__main__':
+    main()
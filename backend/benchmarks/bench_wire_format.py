@@ -0,0 +1,78 @@
+"""Payload size and latency of the /api/search graph formats: plotly figure JSON vs. columnar JSON vs. binary columns.
+
+    python backend/benchmarks/bench_wire_format.py [--queries 200] [--depths 1 3 5 10]
+
+Latency is server build + encode plus client decode (json.loads / unpack_sections), the
+part of a round trip that depends on the format; gzip size is what a compressing proxy sends.
+"""
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+
+from common import load_catalog
+from catalog_index import CatalogIndex
+from embedding_store import unpack_sections
+from graph_export import GRAPH_MAGIC, columnar_graph, dumps, pack_binary, plotly_figure
+from prereq_graph import COURSE, build_campus_graphs
+from prereq_parser import parse_prerequisite_column
+
+
+def response(build, case):
+    return {'prereq_list': 'None', 'graph': build(*case), 'similarity': {}}
+
+
+FORMATS = {
+    'plotly': (lambda case: dumps(response(plotly_figure, case)), json.loads),
+    'columnar': (lambda case: dumps(response(columnar_graph, case)), json.loads),
+    'binary': (lambda case: pack_binary(response(columnar_graph, case)), lambda body: unpack_sections(body, GRAPH_MAGIC)),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 3, 5, 10])
+    args = parser.parse_args()
+
+    df = load_catalog()
+    catalog = CatalogIndex(df)
+    graphs = build_campus_graphs(catalog, parse_prerequisite_column(df['Prerequisite(s)'].values))
+
+    rng = np.random.default_rng(0)
+    roots = []
+    for campus, g in graphs.items():
+        courses = [n for n in np.flatnonzero(g.kinds == COURSE).tolist() if len(g.predecessors(n))]
+        roots += [(campus, g, int(r)) for r in rng.choice(courses, args.queries // len(graphs))]
+        largest = max(courses, key=lambda r: len(g.semantic_subgraph(r, 10)))
+        roots.append((campus, g, largest))
+
+    print(f"{'depth':>5}{'format':>10}{'nodes':>7}{'KB':>9}{'gzip KB':>9}{'max KB':>9}"
+          f"{'encode ms':>11}{'decode ms':>11}{'total p50':>11}{'total p99':>11}")
+    for depth in args.depths:
+        cases = [(g, g.semantic_subgraph(r, depth), f"Tree: {g.labels[r]} (Depth {depth})", r, catalog.subjects.get(c, set()))
+                 for c, g, r in roots]
+        nodes = np.mean([len(case[1]) for case in cases])
+        for name, (encode, decode) in FORMATS.items():
+            for case in cases[:3]:
+                decode(encode(case))
+            enc, dec, sizes, gz = [], [], [], []
+            for case in cases:
+                t0 = time.perf_counter()
+                body = encode(case)
+                t1 = time.perf_counter()
+                decode(body)
+                t2 = time.perf_counter()
+                enc.append(t1 - t0); dec.append(t2 - t1)
+                sizes.append(len(body)); gz.append(len(gzip.compress(body, 6)))
+            enc, dec = np.array(enc) * 1000, np.array(dec) * 1000
+            total = enc + dec
+            print(f"{depth:>5}{name:>10}{nodes:>7.1f}{np.mean(sizes) / 1024:>9.2f}{np.mean(gz) / 1024:>9.2f}"
+                  f"{max(sizes) / 1024:>9.1f}{enc.mean():>11.3f}{dec.mean():>11.3f}"
+                  f"{np.percentile(total, 50):>11.3f}{np.percentile(total, 99):>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Load test of the gunicorn setup: throughput and per-worker memory as the worker count grows.
+
+    python backend/benchmarks/bench_workers.py [--workers 1 2 4] [--threads 2] [--clients 8] [--seconds 10]
+
+For each worker count the script starts `gunicorn -c gunicorn.conf.py app:app` on a free
+port, waits for /api/search to answer, drives it with --clients client processes for
+--seconds, then reads /proc/<pid>/smaps_rollup of the master and every worker. Private
+memory is what a worker costs on top of the shared, preloaded state; it should stay flat
+as workers are added. Needs the same /app files and packages as the server itself.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from common import BACKEND_DIR, load_catalog
+
+DEPTHS = [1, 2, 3, 5]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def smaps_kb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+
+def worker_pids(master):
+    with open(f'/proc/{master}/task/{master}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+
+def client(url, queries, seconds, seed, out):
+    rng = np.random.default_rng(seed)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        q = queries[rng.integers(len(queries))]
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url + q, timeout=60) as r:
+                r.read()
+        except urllib.error.HTTPError as e:
+            if e.code != 404: errors += 1
+        except OSError:
+            errors += 1
+        latencies.append(time.perf_counter() - t0)
+    out.put((latencies, errors))
+
+
+def wait_ready(url, proc, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def run(n_workers, args, queries):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/api/search?'
+    env = dict(os.environ, WEB_CONCURRENCY=str(n_workers), WEB_THREADS=str(args.threads), PORT=str(port))
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(url + queries[0], proc)
+        while len(worker_pids(proc.pid)) < n_workers:
+            time.sleep(0.2)
+        # one request per worker-thread so lazy per-worker state is counted
+        for q in queries[:n_workers * args.threads * 2]:
+            try: urllib.request.urlopen(url + q, timeout=60).read()
+            except urllib.error.HTTPError: pass
+
+        out = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(url, queries, args.seconds, i, out))
+                   for i in range(args.clients)]
+        for c in clients: c.start()
+        results = [out.get() for _ in clients]
+        for c in clients: c.join()
+
+        master = smaps_kb(proc.pid)
+        workers = [smaps_kb(pid) for pid in worker_pids(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    latencies = np.concatenate([r[0] for r in results]) * 1000
+    private = [w['Private_Clean'] + w['Private_Dirty'] for w in workers]
+    return {
+        'rps': len(latencies) / args.seconds,
+        'p50': np.percentile(latencies, 50),
+        'p99': np.percentile(latencies, 99),
+        'errors': sum(r[1] for r in results),
+        'master_rss': master['Rss'] / 1024,
+        'worker_rss': np.mean([w['Rss'] for w in workers]) / 1024,
+        'worker_private': np.mean(private) / 1024,
+        'total_pss': (master['Pss'] + sum(w['Pss'] for w in workers)) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=2)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    df = load_catalog()
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(df), 500)
+    queries = [f"campus={df['Campus'].iat[r]}&course_id={df['Course_ID'].iat[r]}&depth={rng.choice(DEPTHS)}" for r in rows]
+    print(f"{os.cpu_count()} CPUs, {args.threads} threads/worker, {args.clients} clients, {args.seconds:.0f} s per run")
+
+    # RSS counts shared pages in every process; Private is what each extra worker adds, PSS sums to the real total
+    print(f"{'workers':>7}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+          f"{'master RSS':>12}{'worker RSS':>12}{'worker priv':>13}{'total PSS':>11}")
+    for n in args.workers:
+        r = run(n, args, queries)
+        print(f"{n:>7}{r['rps']:>9.1f}{r['p50']:>9.1f}{r['p99']:>9.1f}{r['errors']:>8}"
+              f"{r['master_rss']:>10.0f}MB{r['worker_rss']:>10.0f}MB{r['worker_private']:>11.0f}MB{r['total_pss']:>9.0f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+CLEANED_DIR = os.path.join(REPO_DIR, 'data', 'cleaned_data')
+sys.path.insert(0, BACKEND_DIR)
+
+CATALOG_CSV = '/app/combined_CLEAN.csv'
+EMBEDDING_FILES = ['/app/course_embeddings.npy', '/app/course_embeddings.pt']
+
+
+def _from_cleaned_catalogs():
+    # combined_CLEAN.csv is not checked in, so rebuild an equivalent table
+    # from the per-campus cleaned catalogs that are
+    frames = []
+    uci = pd.read_csv(os.path.join(CLEANED_DIR, 'uci_courses_catalog_CLEAN.csv'))
+    frames.append(pd.DataFrame({'Campus': 'UCI', 'Subject_Code': uci['subject_code'], 'Course_Code': uci['course_code'],
+                                'Title': uci['title'], 'Prerequisite(s)': uci['prerequisites'],
+                                'Course Description': uci['description']}))
+    ucsc = pd.read_csv(os.path.join(CLEANED_DIR, 'ucsc_courses_catalog_CLEAN.csv'))
+    frames.append(pd.DataFrame({'Campus': 'UCSC', 'Subject_Code': ucsc['Subject'], 'Course_Code': ucsc['Course Name'],
+                                'Title': ucsc['Course_Title'], 'Prerequisite(s)': ucsc['Prerequisites'],
+                                'Course Description': ucsc['Description']}))
+    ucsd = pd.read_csv(os.path.join(CLEANED_DIR, 'ucsd_courses_catalog_CLEAN.csv'))
+    frames.append(pd.DataFrame({'Campus': 'UCSD', 'Subject_Code': ucsd['Subject Code'], 'Course_Code': ucsd['Course Code'],
+                                'Title': ucsd['Title'], 'Prerequisite(s)': ucsd['Prerequisites'],
+                                'Course Description': ucsd['Description']}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_catalog(csv_path=CATALOG_CSV):
+    if os.path.exists(csv_path):
+        cols_to_keep = ['Campus', 'Subject_Code', 'Course_Code', 'Title', 'Prerequisite(s)', 'Course Description']
+        df = pd.read_csv(csv_path, usecols=lambda c: c in cols_to_keep)
+        source = csv_path
+    else:
+        df = _from_cleaned_catalogs()
+        source = CLEANED_DIR
+    df['Campus'] = df['Campus'].str.upper().str.strip()
+    df['Course_ID'] = (df['Subject_Code'].fillna('') + df['Course_Code'].fillna('').astype(str)).str.replace(' ', '').str.upper()
+    print(f"catalog: {len(df)} rows from {source}")
+    return df
+
+
+def load_embeddings(n_rows, dim=768, seed=0):
+    for path in EMBEDDING_FILES:
+        if not os.path.exists(path): continue
+        if path.endswith('.npy'):
+            emb = np.load(path)
+        else:
+            import torch
+            emb = torch.load(path, map_location='cpu').numpy()
+        if len(emb) == n_rows:
+            print(f"embeddings: {emb.shape} from {path}")
+            return np.asarray(emb, dtype=np.float32)
+    # random unit vectors have the same cost profile as the real ones
+    rng = np.random.default_rng(seed)
+    emb = rng.standard_normal((n_rows, dim), dtype=np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    print(f"embeddings: {emb.shape} random (no embedding file matches the catalog)")
+    return emb
+
+
+def time_calls(fn, args_list, warmup=3):
+    for args in args_list[:warmup]:
+        fn(*args)
+    times = []
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - t0)
+    return np.array(times) * 1000
+
+
+def summarize(name, times_ms):
+    return f"{name:<28} mean {times_ms.mean():8.3f} ms   p50 {np.percentile(times_ms, 50):8.3f} ms   p99 {np.percentile(times_ms, 99):8.3f} ms"
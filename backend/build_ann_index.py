@@ -0,0 +1,101 @@
+"""Build the IVF index for the course embeddings and report recall@5 against exact search.
+
+    python build_ann_index.py [--csv /app/combined_CLEAN.csv] [--embeddings /app/course_embeddings.pt]
+                              [--evaluation ../data/cleaned_data/evaluation.csv]
+
+The index is written next to the embeddings (course_embeddings.ivf.npz) and
+picked up by app.py on the next start. Runs on CPU only.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from campus_index import CampusEmbeddingIndex
+from ann_index import IVFIndex, ann_index_path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_embeddings(path):
+    if path.endswith('.npy'):
+        return np.load(path)
+    import torch
+    return torch.load(path, map_location=torch.device('cpu'))
+
+
+def load_catalog(csv_path):
+    df = pd.read_csv(csv_path, usecols=['Campus', 'Subject_Code', 'Course_Code'])
+    df['Campus'] = df['Campus'].str.upper().str.strip()
+    df['Course_ID'] = (df['Subject_Code'].fillna('') + df['Course_Code'].fillna('').astype(str)).str.replace(' ', '').str.upper()
+    return df
+
+
+def evaluation_rows(df, evaluation_csv):
+    # evaluation ids look like "UCD___STA 131A"
+    ev = pd.read_csv(evaluation_csv)
+    ids = pd.concat([ev['Course A Code'], ev['Course B Code']]).dropna().unique()
+    lookup = {}
+    for n, key in enumerate(zip(df['Campus'], df['Course_ID'])):
+        lookup.setdefault(key, n)
+    rows = []
+    for full_id in ids:
+        campus, _, code = str(full_id).partition('___')
+        key = (campus.upper().strip(), code.replace(' ', '').upper())
+        if key in lookup:
+            rows.append(lookup[key])
+    return rows
+
+
+def recall_at_k(exact, ann, rows, campuses, k=5, nprobe=None):
+    hits = total = 0
+    for row, campus in zip(rows, campuses):
+        truth = exact.search([row], k=k, exclude=campus)[0]
+        approx = ann.search([row], k=k, exclude=campus, nprobe=nprobe)[0]
+        for c, t in truth.items():
+            hits += len({r for r, _ in t} & {r for r, _ in approx[c]})
+            total += len(t)
+    return hits / max(total, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='/app/combined_CLEAN.csv')
+    parser.add_argument('--embeddings', default='/app/course_embeddings.pt')
+    parser.add_argument('--evaluation', default=os.path.join(HERE, '..', 'data', 'cleaned_data', 'evaluation.csv'))
+    parser.add_argument('--lists-per-sqrt', type=float, default=4)
+    args = parser.parse_args()
+
+    df = load_catalog(args.csv)
+    exact = CampusEmbeddingIndex.build(df['Campus'].values, load_embeddings(args.embeddings))
+
+    t0 = time.perf_counter()
+    ann = IVFIndex.build(exact, lists_per_sqrt=args.lists_per_sqrt)
+    print(f"Built IVF index: {len(ann.centroids)} lists over {len(exact)} rows in {time.perf_counter() - t0:.1f}s")
+    out = ann_index_path(args.embeddings)
+    ann.save(out)
+    print(f"Saved {out}")
+
+    rows = evaluation_rows(df, args.evaluation)
+    if not rows:
+        print("No evaluation courses found in the catalog, skipping recall report")
+        return
+    campuses = df['Campus'].values[rows]
+    print(f"recall@5 vs exact search on {len(rows)} evaluation courses:")
+    t0 = time.perf_counter()
+    for row, campus in zip(rows, campuses):
+        exact.search([row], k=5, exclude=campus)
+    print(f"  exact        {(time.perf_counter() - t0) * 1000 / len(rows):.2f} ms/query")
+    for nprobe in (1, 4, 8, 16, 32):
+        recall = recall_at_k(exact, ann, rows, campuses, nprobe=nprobe)
+        t0 = time.perf_counter()
+        for row, campus in zip(rows, campuses):
+            ann.search([row], k=5, exclude=campus, nprobe=nprobe)
+        ms = (time.perf_counter() - t0) * 1000 / len(rows)
+        print(f"  nprobe={nprobe:<3}  recall@5 {recall:.3f}   {ms:.2f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Convert course_embeddings.pt/.npy into the memory-mapped quantized store read by app.py.
+
+    python build_embedding_store.py [--csv /app/combined_CLEAN.csv] [--embeddings /app/course_embeddings.pt]
+                                    [--out /app/course_embeddings.q8] [--dtype int8|float16] [--no-full]
+
+Rows are written in campus order, so the store has to be rebuilt whenever the
+catalog CSV changes. The header records a digest of the catalog text and of
+the source embeddings; app.py ignores a store whose text no longer matches the
+catalog, or that was built from other vectors than course_embeddings.vec.
+"""
+import argparse
+import os
+
+from build_ann_index import load_embeddings
+from catalog_index import load_catalog_csv
+from course_vectors import catalog_hashes, texts_digest
+from embedding_store import write_store
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='/app/combined_CLEAN.csv')
+    parser.add_argument('--embeddings', default='/app/course_embeddings.pt')
+    parser.add_argument('--out', default='/app/course_embeddings.q8')
+    parser.add_argument('--dtype', choices=['int8', 'float16'], default='int8')
+    parser.add_argument('--no-full', action='store_true', help="drop the float32 rescoring section")
+    args = parser.parse_args()
+
+    df = load_catalog_csv(args.csv)
+    campuses = df['Campus'].values
+    embeddings = load_embeddings(args.embeddings)
+    if hasattr(embeddings, 'numpy'):
+        embeddings = embeddings.float().numpy()
+    write_store(args.out, campuses, embeddings, dtype=args.dtype, keep_full=not args.no_full,
+                texts=texts_digest(catalog_hashes(df)))
+    print(f"Wrote {args.out} ({os.path.getsize(args.out) / 2**20:.1f} MiB, {len(campuses)} rows, {args.dtype})")
+
+
+if __name__ == '__main__':
+    main()
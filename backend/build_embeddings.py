@@ -0,0 +1,121 @@
+"""Encode the catalog into course_embeddings.vec, re-encoding only rows whose text changed.
+
+    python build_embeddings.py [--csv /app/combined_CLEAN.csv] [--out /app/course_embeddings.vec]
+                               [--model BAAI/bge-base-en-v1.5] [--processes N] [--batch-size 64]
+                               [--bucket 512] [--full]
+
+Each row's "Title. Description" text is hashed; vectors of texts already in the
+previous output (--out, or --previous) are copied over, whatever row they were
+on. The remaining distinct texts are sorted by length and cut into buckets of
+--bucket texts, so a batch pads to similar lengths, and the buckets are encoded
+on --processes worker processes (one model each, CPUs split between them).
+The output is in CSV row order with the text hashes; app.py checks them
+against the catalog before using the file.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from catalog_index import load_catalog_csv
+from course_vectors import catalog_hashes, course_texts, read_vectors, write_vectors
+
+_model = None
+
+
+def _init_worker(model_name, threads, batch_size):
+    global _model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(threads)
+    _model = (SentenceTransformer(model_name, device='cpu'), batch_size)
+
+
+def _encode(texts):
+    model, batch_size = _model
+    return np.asarray(model.encode(texts, batch_size=batch_size, normalize_embeddings=True,
+                                   convert_to_numpy=True, show_progress_bar=False), dtype=np.float32)
+
+
+def length_buckets(texts, bucket):
+    """Indices into `texts`, longest first, cut into lists of `bucket`."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    return [order[i:i + bucket] for i in range(0, len(order), bucket)]
+
+
+def encode(texts, model_name, processes, batch_size, bucket):
+    out = [None] * len(texts)
+    buckets = length_buckets(texts, bucket)
+    threads = max(1, (os.cpu_count() or 1) // processes)
+    if processes == 1:
+        _init_worker(model_name, threads, batch_size)
+        results = map(_encode, ([texts[i] for i in b] for b in buckets))
+        for b, vecs in zip(buckets, results):
+            for i, v in zip(b, vecs): out[i] = v
+        return np.stack(out) if out else None
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(model_name, threads, batch_size)) as pool:
+        # longest buckets go out first, so the slowest work does not start last
+        for b, vecs in zip(buckets, pool.map(_encode, [[texts[i] for i in b] for b in buckets])):
+            for i, v in zip(b, vecs): out[i] = v
+    return np.stack(out) if out else None
+
+
+def build(csv, out, model, previous=None, processes=1, batch_size=64, bucket=512, full=False):
+    """Write `out` for the catalog in `csv`; returns (rows, rows encoded, seconds)."""
+    t0 = time.perf_counter()
+    df = load_catalog_csv(csv)
+    texts = course_texts(df['Title'].to_numpy(dtype=object), df['Course Description'].to_numpy(dtype=object))
+    hashes = catalog_hashes(df)
+    keys = [h.tobytes() for h in hashes]
+    if not keys:
+        raise ValueError(f"{csv} has no catalog rows to embed")
+
+    known, old_vectors = {}, None
+    previous = previous or out
+    if not full and os.path.exists(previous):
+        header, old_hashes, old_vectors = read_vectors(previous)
+        if header.get('model') == model:
+            known = {h.tobytes(): i for i, h in enumerate(old_hashes)}
+        else:
+            print(f"{previous} was built with {header.get('model')}, encoding everything")
+
+    todo = list(dict.fromkeys(k for k in keys if k not in known))
+    print(f"{len(df)} rows, {sum(k in known for k in keys)} reused, {len(todo)} distinct texts to encode")
+    fresh = {}
+    if todo:
+        text_of = dict(zip(keys, texts))
+        vectors = encode([text_of[k] for k in todo], model, processes, batch_size, bucket)
+        fresh = dict(zip(todo, vectors))
+
+    dim = next(iter(fresh.values())).shape[0] if fresh else old_vectors.shape[1]
+    matrix = np.empty((len(keys), dim), dtype=np.float32)
+    for row, k in enumerate(keys):
+        matrix[row] = fresh[k] if k in fresh else old_vectors[known[k]]
+
+    tmp = f'{out}.tmp'
+    write_vectors(tmp, hashes, matrix, model)
+    os.replace(tmp, out)
+    return len(keys), len(todo), time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='/app/combined_CLEAN.csv')
+    parser.add_argument('--out', default='/app/course_embeddings.vec')
+    parser.add_argument('--previous', help="earlier output to reuse vectors from (default: --out)")
+    parser.add_argument('--model', default='BAAI/bge-base-en-v1.5')
+    parser.add_argument('--processes', type=int, default=max(1, min(os.cpu_count() or 1, 4)))
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--bucket', type=int, default=512, help="texts per task handed to a worker")
+    parser.add_argument('--full', action='store_true', help="ignore earlier output and encode every row")
+    args = parser.parse_args()
+
+    rows, encoded, seconds = build(args.csv, args.out, args.model, args.previous, args.processes,
+                                   args.batch_size, args.bucket, args.full)
+    print(f"Wrote {args.out}: {rows} rows, {encoded} encoded, {seconds:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Precompute the cross-campus top-k neighbor table served by app.py.
+
+    python build_neighbor_table.py [--csv /app/combined_CLEAN.csv] [--embeddings /app/course_embeddings.pt]
+                                   [--out /app/course_neighbors.knn] [--k 5] [--refresh]
+
+--refresh reuses an existing table and only recomputes rows whose campus or
+embedding changed (plus rows whose current neighbors changed); every other
+row just merges in the changed columns. A change in row count falls back to
+a full rebuild.
+"""
+import argparse
+import os
+import time
+
+from campus_index import CampusEmbeddingIndex
+from build_ann_index import load_catalog, load_embeddings
+from neighbor_table import NeighborTable, build_table, catalog_digest, refresh_table, save_table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='/app/combined_CLEAN.csv')
+    parser.add_argument('--embeddings', default='/app/course_embeddings.pt')
+    parser.add_argument('--out', default='/app/course_neighbors.knn')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--refresh', action='store_true')
+    args = parser.parse_args()
+
+    df = load_catalog(args.csv)
+    index = CampusEmbeddingIndex.build(df['Campus'].values, load_embeddings(args.embeddings))
+    campuses = df['Campus'].values
+
+    t0 = time.perf_counter()
+    if args.refresh and os.path.exists(args.out):
+        old = NeighborTable(args.out)
+        ids, scores, hashes, n_changed, n_recomputed = refresh_table(
+            index, campuses, old.ids, old.scores, old.hashes, k=args.k)
+        del old
+        print(f"Refresh: {n_changed} changed rows, {n_recomputed} rows recomputed in full, "
+              f"{len(ids) - n_recomputed} merged")
+    else:
+        ids, scores, hashes = build_table(index, campuses, k=args.k)
+    elapsed = time.perf_counter() - t0
+
+    save_table(args.out, ids, scores, hashes, catalog_digest(campuses, df['Course_ID'].values), index.source_digest)
+    print(f"Wrote {args.out} ({os.path.getsize(args.out) / 2**20:.1f} MiB, {len(ids)} rows, k={args.k}) in {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import hashlib
+
+import numpy as np
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+CAMPUSES = ['UCD', 'UCLA', 'UCSC', 'UCI']
+
+
+def partition_by_campus(campuses):
+    # stable sort keeps the original row order inside each campus block
+    campuses = np.asarray(campuses, dtype=object)
+    order = np.argsort(campuses, kind='stable')
+    names, starts = np.unique(campuses[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    offsets = {str(n): (int(s), int(e)) for n, s, e in zip(names, starts, ends)}
+    return order, offsets
+
+
+def vectors_digest(embeddings):
+    """Identity of an embedding matrix (catalog row order), recorded by the files built from it."""
+    if torch is not None and isinstance(embeddings, torch.Tensor):
+        embeddings = embeddings.detach().float().cpu().numpy()
+    matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+    h = hashlib.blake2b(str(matrix.shape).encode(), digest_size=16)
+    h.update(matrix.data)
+    return h.hexdigest()
+
+
+class CampusEmbeddingIndex:
+    """Normalized embeddings laid out as one contiguous block per campus.
+
+    `row_ids[i]` is the catalog row stored at position i, `positions[r]` is the
+    inverse map, and `offsets[campus]` is the (start, end) block of that campus.
+    A query is one matmul against the full matrix followed by a top-k per block.
+    """
+
+    source_digest = None  # vectors_digest() of the embeddings it was built from
+
+    def __init__(self, matrix, row_ids, offsets):
+        self.matrix = matrix
+        self.row_ids = np.asarray(row_ids, dtype=np.int64)
+        self.positions = np.empty_like(self.row_ids)
+        self.positions[self.row_ids] = np.arange(len(self.row_ids))
+        self.offsets = offsets
+        self.is_torch = torch is not None and isinstance(matrix, torch.Tensor)
+
+    @classmethod
+    def build(cls, campuses, embeddings):
+        if len(campuses) != len(embeddings):
+            raise ValueError(f"{len(campuses)} catalog rows but {len(embeddings)} embeddings")
+        order, offsets = partition_by_campus(campuses)
+        if torch is not None and isinstance(embeddings, torch.Tensor):
+            matrix = embeddings[torch.from_numpy(order)].float()
+            matrix = torch.nn.functional.normalize(matrix, dim=1).contiguous()
+        else:
+            matrix = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32)[order])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.maximum(norms, 1e-12)
+        index = cls(matrix, order, offsets)
+        index.source_digest = vectors_digest(embeddings)
+        return index
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def vectors(self, pos):
+        if self.is_torch:
+            return self.matrix[torch.from_numpy(np.asarray(pos, dtype=np.int64))].numpy()
+        return self.matrix[pos]
+
+    def query_scores(self, q):
+        """Cosine score of every catalog row (in row order) against one normalized query vector."""
+        if self.is_torch:
+            return (self.matrix @ torch.from_numpy(np.asarray(q, dtype=np.float32))).numpy()[self.positions]
+        return (self.matrix @ q)[self.positions]
+
+    def scores(self, rows):
+        pos = self.positions[np.atleast_1d(np.asarray(rows, dtype=np.int64))]
+        if self.is_torch:
+            return self.matrix[torch.from_numpy(pos)] @ self.matrix.T
+        return self.matrix[pos] @ self.matrix.T
+
+    def search(self, rows, k=5, campuses=CAMPUSES, exclude=None):
+        """Top-k catalog rows per campus for each query row.
+
+        Returns one {campus: [(row, score), ...]} dict per query; the campus
+        named by `exclude` (or missing from the catalog) maps to an empty list.
+        """
+        scores = self.scores(rows)
+        results = [{} for _ in range(len(scores))]
+        for c in campuses:
+            if c == exclude or c not in self.offsets:
+                for res in results: res[c] = []
+                continue
+            start, end = self.offsets[c]
+            top, top_scores = segment_topk(scores[:, start:end], k)
+            top_rows = self.row_ids[top + start]
+            for res, r, s in zip(results, top_rows, top_scores):
+                res[c] = list(zip(r.tolist(), s.tolist()))
+        return results
+
+
+def segment_topk(block, k):
+    # block is a view of one campus segment of the score matrix
+    k = min(k, block.shape[1])
+    if torch is not None and isinstance(block, torch.Tensor):
+        vals, idx = torch.topk(block, k, dim=1)
+        return idx.numpy(), vals.numpy()
+    if k == 0:
+        empty = np.empty((block.shape[0], 0))
+        return empty.astype(np.int64), empty
+    if k < block.shape[1]:
+        part = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(k), (block.shape[0], k))
+    part_scores = np.take_along_axis(block, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
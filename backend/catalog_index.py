@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from campus_index import partition_by_campus
+from prereq_parser import normalize_course_id
+
+CATALOG_COLUMNS = ['Campus', 'Subject_Code', 'Course_Code', 'Title', 'Prerequisite(s)', 'Course Description']
+
+
+def load_catalog_csv(path):
+    df = pd.read_csv(path, usecols=lambda c: c in CATALOG_COLUMNS)
+    df['Campus'] = df['Campus'].str.upper().str.strip()
+    df['Course_ID'] = (df['Subject_Code'].fillna('') + df['Course_Code'].fillna('').astype(str)).apply(normalize_course_id)
+    return df
+
+
+class CatalogIndex:
+    """Lookup structures over the catalog DataFrame, built once at load time.
+
+    `rows` maps (campus, normalized course id) to the position of the first
+    matching row, `ranges[campus]` is the (start, end) slice of `order` that
+    holds the campus rows, and `subjects[campus]` is that campus's subject set.
+    Column values are kept as object arrays so hot paths avoid pandas indexing.
+    """
+
+    def __init__(self, df):
+        campuses = df['Campus'].to_numpy(dtype=object)
+        self.order, self.ranges = partition_by_campus(campuses)
+        self.campuses = campuses
+        self.course_ids = df['Course_ID'].to_numpy(dtype=object)
+        self.titles = df['Title'].to_numpy(dtype=object)
+        self.prereq_text = df['Prerequisite(s)'].to_numpy(dtype=object)
+
+        self.rows = {}
+        for pos, key in enumerate(zip(campuses, self.course_ids)):
+            self.rows.setdefault(key, pos)
+
+        self.subjects = {}
+        for campus, subjects in df.groupby('Campus')['Subject_Code']:
+            self.subjects[campus] = set(subjects.dropna().unique())
+
+        # subject codes as small ints, so a subject filter is one isin over int32
+        subject_codes, subject_names = pd.factorize(df['Subject_Code'].map(normalize_course_id))
+        self.subject_codes = subject_codes.astype(np.int32)
+        self.subject_ids = {name: i for i, name in enumerate(subject_names)}
+
+    def __len__(self):
+        return len(self.course_ids)
+
+    def lookup(self, campus, course_id):
+        return self.rows.get((campus, course_id))
+
+    def row_mask(self, campuses=(), subjects=()):
+        """Boolean mask of the rows in any of `campuses` and any of `subjects`, or None when both are empty."""
+        if not campuses and not subjects:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        if campuses:
+            mask[:] = False
+            for c in campuses:
+                mask[self.campus_rows(c)] = True
+        if subjects:
+            wanted = [self.subject_ids[s] for s in map(normalize_course_id, subjects) if s in self.subject_ids]
+            mask &= np.isin(self.subject_codes, wanted)
+        return mask
+
+    def campus_rows(self, campus):
+        if campus not in self.ranges:
+            return np.empty(0, dtype=np.int64)
+        start, end = self.ranges[campus]
+        return self.order[start:end]
@@ -0,0 +1,267 @@
+from prereq_graph import EXTERNAL, LOGIC
+
+
+class CoursePlanner:
+    """Courses still needed for a target, and a term-by-term order to take them in.
+
+    The campus graph is an AND/OR graph: a course needs every predecessor,
+    and an OR node needs one of its options. need() is a depth-first AND/OR
+    search, memoized per plan, that keeps the smallest set for every node on
+    its own. It prunes by branch and bound: an OR group tries its options
+    with a budget of the best option found so far, and a node whose set grows
+    past the budget is given up and remembered as a lower bound. Completed
+    courses and OR groups with a completed option cost nothing and are not
+    expanded.
+
+    The plan itself is assembled by build(), which walks down from the target
+    and picks each OR group's option against what the plan already holds:
+    every course the target needs whatever the choices, plus everything
+    picked so far. An option already in the plan costs nothing; any other
+    option costs the courses of its need() set that the plan does not hold
+    yet. Plain prerequisites are walked before OR groups, so shared courses
+    count once. A group picked before another part of the plan brought in one
+    of its other options is then pinned to that option, and the plan kept if
+    it got smaller.
+
+    The plan is a heuristic, not a guaranteed minimum: choosing the options
+    of many groups that share courses is a set cover problem, and build()
+    makes one greedy pass plus the pin rounds instead of trying every
+    combination. need() is exact for each node on its own.
+
+    A requirement that leads back to a course already being expanded (a
+    prerequisite cycle in the catalog) is skipped and reported. An OR group
+    none of whose options can be planned (every option loops back, or it
+    has none) is reported as unsatisfied rather than dropped silently.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def plan(self, target, completed=(), per_term=3):
+        search = _Search(self.graph, set(completed))
+        needed = search.build(target)
+        deps = search.dependencies(needed)
+        used = search.used(needed)
+        return {
+            'needed': sorted(needed),
+            'terms': schedule(needed, deps, per_term, self.graph.labels),
+            'choices': {g: o for g, o in search.picked.items() if o is not None and g in used},
+            'cycles': sorted((v, p) for v, p in search.cycles if v in needed or v in used),
+            'unsatisfied': sorted(g for g in search.unsatisfied if g in used),
+        }
+
+
+class _Search:
+    def __init__(self, graph, done):
+        self.graph = graph
+        self.indptr, self.indices = graph.pred_indptr, graph.pred_indices
+        self.kinds = graph.kinds
+        self.done = done
+        self.memo, self.lower, self.choice = {}, {}, {}
+        self.picked = {}  # OR group -> option, as build() assembled the plan
+        self.unsatisfied = set()  # OR groups build() found no option for
+        self.active = set()
+        self.cycles = set()
+
+    def preds(self, v):
+        return self.indices[self.indptr[v]:self.indptr[v + 1]].tolist()
+
+    def need(self, v, budget):
+        """Smallest set of courses to take for `v` (itself included), or None if it cannot fit in `budget`."""
+        if v in self.done:
+            return frozenset()
+        found = self.memo.get(v)
+        if found is not None:
+            return found if len(found) <= budget else None
+        if self.lower.get(v, 0) > budget:
+            return None
+        self.active.add(v)
+        found = self._choose(v, budget) if self.kinds[v] == LOGIC else self._all(v, budget)
+        self.active.discard(v)
+        if found is None:
+            self.lower[v] = max(self.lower.get(v, 0), budget + 1)
+        else:
+            self.memo[v] = found
+        return found
+
+    def _all(self, v, budget):
+        acc = {v}
+        for p in self.preds(v):
+            if p in self.active:
+                self.cycles.add((v, p))
+                continue
+            sub = self.need(p, budget - 1)
+            if sub is None:
+                return None
+            acc |= sub
+            if len(acc) > budget:
+                return None
+        return frozenset(acc)
+
+    def _choose(self, group, budget):
+        options = self.preds(group)
+        if any(o in self.done for o in options):
+            self.choice[group] = None
+            return frozenset()
+        options = self.option_order(options)
+        best = None
+        for o in options:
+            if o in self.active:
+                self.cycles.add((group, o))
+                continue
+            sub = self.need(o, budget if best is None else len(best) - 1)
+            if sub is not None and (best is None or len(sub) < len(best)):
+                best, self.choice[group] = sub, o
+                if len(best) == 1:
+                    break
+        return best
+
+    def option_order(self, options):
+        # catalog courses before external ones, then by id, so equal plans come out the same every time
+        return sorted(options, key=lambda o: (self.kinds[o] == EXTERNAL, self.graph.labels[o]))
+
+    def forced(self, target):
+        """Courses every plan for `target` contains: its plain predecessors, transitively, up to the OR groups."""
+        out, stack = set(), [target]
+        while stack:
+            v = stack.pop()
+            if v in out or v in self.done:
+                continue
+            out.add(v)
+            stack.extend(p for p in self.preds(v) if self.kinds[p] != LOGIC)
+        return out
+
+    def build(self, target):
+        """The courses of the plan for `target`; fills `picked` with the option taken for each OR group."""
+        forced = self.forced(target)
+        pins = {}
+        plan, picked, unsatisfied = self._assemble(target, forced, pins)
+        improved = True
+        while improved:
+            improved = False
+            for group, o in list(picked.items()):
+                for other in self.preds(group):
+                    if other == o or other not in plan or (group, other) in self.cycles:
+                        continue
+                    tried = self._assemble(target, forced, {**pins, group: other})
+                    # fewer unmet groups first, then fewer courses
+                    if (len(tried[2]), len(tried[0])) < (len(unsatisfied), len(plan)):
+                        pins[group] = other
+                        (plan, picked, unsatisfied), improved = tried, True
+                        break
+                if improved:
+                    break
+        self.picked, self.unsatisfied = picked, unsatisfied
+        return plan
+
+    def _assemble(self, target, forced, pins):
+        acc = set()
+        self.picked, self.unsatisfied, self.pins = {}, set(), pins
+        self._build(target, acc, forced)
+        return frozenset(acc), self.picked, self.unsatisfied
+
+    def _build(self, v, acc, forced):
+        if v in self.done or v in acc:
+            return
+        acc.add(v)
+        self.active.add(v)
+        # plain prerequisites first, so the OR groups after them can reuse what they bring in
+        for p in sorted(self.preds(v), key=lambda p: self.kinds[p] == LOGIC):
+            if p in self.active:
+                self.cycles.add((v, p))
+            elif self.kinds[p] == LOGIC:
+                self._pick(p, acc, forced)
+            else:
+                self._build(p, acc, forced)
+        self.active.discard(v)
+
+    def _pick(self, group, acc, forced):
+        if group in self.picked:
+            return
+        options = self.option_order(self.preds(group))
+        if any(o in self.done for o in options):
+            self.picked[group] = None
+            return
+        best, best_cost = self.pins.get(group), None
+        for o in options if best is None else ():
+            if o in self.active:
+                self.cycles.add((group, o))
+                continue
+            if o in acc or o in forced:
+                best = o
+                break
+            sub = self.need(o, float('inf'))
+            if sub is None:
+                continue
+            cost = sum(1 for c in sub if c not in acc and c not in forced)
+            if best is None or cost < best_cost:
+                best, best_cost = o, cost
+        self.picked[group] = best
+        if best is None:
+            self.unsatisfied.add(group)
+        else:
+            self._build(best, acc, forced)
+
+    def requirements(self, c):
+        """Courses of the plan that `c` waits for: plain predecessors and the picked option of each OR group."""
+        out = []
+        for p in self.preds(c):
+            if (c, p) in self.cycles:
+                continue
+            if self.kinds[p] == LOGIC:
+                p = self.picked.get(p)
+                if p is None:
+                    continue
+            out.append(p)
+        return out
+
+    def dependencies(self, needed):
+        return {c: [p for p in self.requirements(c) if p in needed and p != c] for c in needed}
+
+    def used(self, needed):
+        return {p for c in needed for p in self.preds(c) if self.kinds[p] == LOGIC}
+
+
+def schedule(needed, deps, per_term, labels):
+    """Terms of at most `per_term` courses, each after all of its dependencies.
+
+    List scheduling: among the courses whose dependencies are all in earlier
+    terms, take the ones with the longest chain still above them first.
+    """
+    dependents = {c: [] for c in needed}
+    for c, ds in deps.items():
+        for d in ds:
+            dependents[d].append(c)
+    chain, visiting = {}, set()
+
+    def height(c):
+        # longest path from c up to the target, iterative so deep chains do not hit the recursion limit
+        stack = [c]
+        visiting.add(c)
+        while stack:
+            n = stack[-1]
+            pending = [d for d in dependents[n] if d not in chain and d not in visiting]
+            if pending:
+                stack.extend(pending)
+                visiting.update(pending)
+                continue
+            stack.pop()
+            chain[n] = 1 + max((chain.get(d, 0) for d in dependents[n]), default=0)
+        return chain[c]
+
+    waiting = {c: len(ds) for c, ds in deps.items()}
+    ready = [c for c, k in waiting.items() if k == 0]
+    terms = []
+    while ready:
+        ready.sort(key=lambda c: (-height(c), labels[c]))
+        term, ready = ready[:per_term], ready[per_term:]
+        terms.append(term)
+        for c in term:
+            for d in dependents[c]:
+                waiting[d] -= 1
+                if waiting[d] == 0:
+                    ready.append(d)
+    # anything left waits on a cycle the search did not break; keep it in the plan, last
+    left = sorted((c for c, k in waiting.items() if k > 0), key=lambda c: labels[c])
+    terms += [left[i:i + per_term] for i in range(0, len(left), per_term)]
+    return terms
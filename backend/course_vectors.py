@@ -0,0 +1,55 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import read_sections, write_sections
+
+# One embedding per catalog row, in CSV row order, each tagged with the
+# blake2b hash of the text it was encoded from. The hashes let the server
+# check the file against the catalog it loaded and let build_embeddings.py
+# reuse every vector whose text did not change.
+VECTORS_MAGIC = b'UCVEC\x00\x00\x00'
+HASH_BYTES = 16
+
+
+def course_texts(titles, descriptions):
+    # the same "Title. Description" text Final_Embedding.ipynb encoded
+    titles = pd.Series(titles, dtype=object).fillna('').astype(str)
+    descriptions = pd.Series(descriptions, dtype=object).fillna('').astype(str)
+    return (titles + '. ' + descriptions).tolist()
+
+
+def text_hashes(texts):
+    out = np.empty((len(texts), HASH_BYTES), dtype=np.uint8)
+    for i, t in enumerate(texts):
+        out[i] = np.frombuffer(hashlib.blake2b(t.encode(), digest_size=HASH_BYTES).digest(), dtype=np.uint8)
+    return out
+
+
+def catalog_hashes(df):
+    return text_hashes(course_texts(df['Title'].to_numpy(dtype=object), df['Course Description'].to_numpy(dtype=object)))
+
+
+def texts_digest(hashes):
+    # one digest for the whole catalog text, for files that only need to know whether it changed
+    return hashlib.blake2b(np.ascontiguousarray(hashes).tobytes(), digest_size=16).hexdigest()
+
+
+def write_vectors(path, hashes, vectors, model):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    header = {'model': model, 'rows': int(vectors.shape[0]), 'dim': int(vectors.shape[1])}
+    write_sections(path, VECTORS_MAGIC, header, [('hashes', hashes), ('vectors', vectors)])
+
+
+def read_vectors(path):
+    """(header, hashes, vectors) with both arrays memory-mapped."""
+    header, sections = read_sections(path, VECTORS_MAGIC)
+    return header, sections['hashes'], sections['vectors']
+
+
+def check_alignment(hashes, expected):
+    """Rows whose stored text hash differs from the catalog's; raises if the row counts differ."""
+    if len(hashes) != len(expected):
+        raise ValueError(f"{len(hashes)} embeddings but {len(expected)} catalog rows")
+    return np.flatnonzero((np.asarray(hashes) != expected).any(axis=1))
@@ -0,0 +1,180 @@
+import json
+import struct
+
+import numpy as np
+
+from campus_index import CAMPUSES, partition_by_campus, segment_topk, vectors_digest
+
+# Layout: 16-byte preamble (magic, version, json length), a JSON header with
+# shapes and section offsets, then 64-byte aligned raw sections:
+#   codes   (n, dim) int8 or float16, rows in campus order
+#   scales  (n,) float32, codes * scale ~= normalized vector
+#   row_ids (n,) int64, catalog row of each stored vector
+#   full    (n, dim) float32 normalized vectors, optional, used for rescoring
+STORE_MAGIC = b'UCEMB\x00\x00\x00'
+STORE_VERSION = 1
+PREAMBLE = struct.Struct('<8sII')
+ALIGN = 64
+CHUNK_ROWS = 2048
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def quantize(matrix, dtype='int8'):
+    if dtype == 'float16':
+        return matrix.astype(np.float16), np.ones(len(matrix), dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def _section_offsets(header, sections):
+    header = dict(header, sections={})
+    # section offsets depend on the header length, which depends on the
+    # offsets; repeat until the header stops changing
+    while True:
+        pos = _align(PREAMBLE.size + len(json.dumps(header).encode()))
+        offsets = {}
+        for name, arr in sections:
+            offsets[name] = [pos, arr.dtype.str, list(arr.shape)]
+            pos = _align(pos + arr.nbytes)
+        if offsets == header['sections']:
+            return header, pos
+        header['sections'] = offsets
+
+
+def write_sections(path, magic, header, sections):
+    """Write a preamble, a JSON header and 64-byte aligned raw array sections."""
+    header, end = _section_offsets(header, sections)
+    blob = json.dumps(header).encode()
+
+    with open(path, 'wb') as f:
+        f.write(PREAMBLE.pack(magic, STORE_VERSION, len(blob)))
+        f.write(blob)
+        for name, arr in sections:
+            f.seek(header['sections'][name][0])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(end)
+
+
+def pack_sections(magic, header, sections):
+    """The bytes write_sections() would write, for small payloads sent over the wire."""
+    header, end = _section_offsets(header, sections)
+    blob = json.dumps(header).encode()
+    buf = bytearray(end)
+    buf[:PREAMBLE.size] = PREAMBLE.pack(magic, STORE_VERSION, len(blob))
+    buf[PREAMBLE.size:PREAMBLE.size + len(blob)] = blob
+    for name, arr in sections:
+        offset = header['sections'][name][0]
+        buf[offset:offset + arr.nbytes] = np.ascontiguousarray(arr).tobytes()
+    return bytes(buf)
+
+
+def _parse_sections(raw, magic, source):
+    file_magic, version, header_len = PREAMBLE.unpack(raw[:PREAMBLE.size].tobytes())
+    if file_magic != magic or version != STORE_VERSION:
+        raise ValueError(f"{source} is not a version {STORE_VERSION} {magic.rstrip(bytes(1)).decode()} file")
+    header = json.loads(raw[PREAMBLE.size:PREAMBLE.size + header_len].tobytes())
+    sections = {}
+    for name, (offset, dtype, shape) in header['sections'].items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        sections[name] = raw[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+    return header, sections
+
+
+def read_sections(path, magic):
+    """Map a file written by write_sections; returns (header, {name: read-only array view})."""
+    return _parse_sections(np.memmap(path, dtype=np.uint8, mode='r'), magic, path)
+
+
+def unpack_sections(data, magic):
+    """read_sections() for bytes produced by pack_sections()."""
+    return _parse_sections(np.frombuffer(data, dtype=np.uint8), magic, 'payload')
+
+
+def write_store(path, campuses, embeddings, dtype='int8', keep_full=True, texts=None):
+    """`texts` is course_vectors.texts_digest() of the catalog text the embeddings were encoded from."""
+    order, offsets = partition_by_campus(campuses)
+    matrix = np.asarray(embeddings, dtype=np.float32)[order]
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    codes, scales = quantize(matrix, dtype)
+
+    sections = [('codes', codes), ('scales', scales), ('row_ids', order.astype(np.int64))]
+    if keep_full:
+        sections.append(('full', matrix))
+    header = {'n_rows': len(matrix), 'dim': matrix.shape[1], 'dtype': dtype, 'offsets': offsets,
+              'texts': texts, 'source': vectors_digest(embeddings)}
+    write_sections(path, STORE_MAGIC, header, sections)
+
+
+class QuantizedCampusIndex:
+    """Memory-mapped, quantized counterpart of CampusEmbeddingIndex.
+
+    Candidates are scored on the int8/float16 codes in fixed-size chunks, then
+    the best `rescore` per campus are rescored against the float32 section.
+    Nothing is copied at open time, so forked workers share the page cache.
+    """
+
+    def __init__(self, path, rescore=32):
+        header, sections = read_sections(path, STORE_MAGIC)
+        self.path = path
+        self.dtype = header['dtype']
+        self.codes = sections['codes']
+        self.scales = sections['scales']
+        self.row_ids = sections['row_ids']
+        self.matrix = sections.get('full')
+        self.offsets = {c: tuple(o) for c, o in header['offsets'].items()}
+        self.source_digest = header.get('source')
+        self.texts_digest = header.get('texts')
+        self.positions = np.empty(len(self.row_ids), dtype=np.int64)
+        self.positions[self.row_ids] = np.arange(len(self.row_ids))
+        self.is_torch = False
+        self.rescore = rescore
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def vectors(self, pos):
+        if self.matrix is not None:
+            return np.asarray(self.matrix[pos])
+        return self.codes[pos].astype(np.float32) * self.scales[pos, None]
+
+    def approx_scores(self, q, start, end):
+        out = np.empty((len(q), end - start), dtype=np.float32)
+        for s in range(start, end, CHUNK_ROWS):
+            e = min(s + CHUNK_ROWS, end)
+            out[:, s - start:e - start] = (q @ self.codes[s:e].astype(np.float32).T) * self.scales[s:e]
+        return out
+
+    def query_scores(self, q):
+        """Approximate score of every catalog row (in row order) against one query vector."""
+        return self.approx_scores(np.asarray(q, dtype=np.float32)[None, :], 0, len(self))[0][self.positions]
+
+    def search(self, rows, k=5, campuses=CAMPUSES, exclude=None):
+        pos = self.positions[np.atleast_1d(np.asarray(rows, dtype=np.int64))]
+        q = self.vectors(pos)
+        results = [{} for _ in range(len(q))]
+        for c in campuses:
+            if c == exclude or c not in self.offsets:
+                for res in results: res[c] = []
+                continue
+            start, end = self.offsets[c]
+            cand, approx = segment_topk(self.approx_scores(q, start, end), max(k, self.rescore))
+            for i, res in enumerate(results):
+                cand_pos = cand[i] + start
+                if self.matrix is not None:
+                    exact = np.asarray(self.matrix[cand_pos]) @ q[i]
+                else:
+                    exact = approx[i]
+                top, top_scores = segment_topk(exact[None, :], k)
+                res[c] = list(zip(self.row_ids[cand_pos[top[0]]].tolist(), top_scores[0].tolist()))
+        return results
+
+    def matches_catalog(self, campuses, texts):
+        """Same row layout and the same catalog text (course_vectors.texts_digest) as when the store was written."""
+        order, offsets = partition_by_campus(campuses)
+        return offsets == self.offsets and np.array_equal(order, self.row_ids) and self.texts_digest == texts
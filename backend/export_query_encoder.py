@@ -0,0 +1,77 @@
+"""Export the production model to ONNX with int8 weights, for the query encoder behind /api/match.
+
+    python export_query_encoder.py [--model BAAI/bge-base-en-v1.5] [--out /app/query_encoder]
+                                   [--max-seq-length 256]
+
+Writes model.int8.onnx (dynamic int8 quantization of the fp32 export),
+tokenizer.json and encoder.json (pooling, max length, dimension), then checks
+the export against the float model on a few catalog texts. Exporting needs
+torch, sentence-transformers and onnxruntime; serving needs only onnxruntime
+and tokenizers.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from query_encoder import META_FILE, ONNX_FILE, OnnxBackend
+
+SAMPLE_TEXTS = [
+    "Introduction to Probability. Fundamental concepts of probability theory, random variables and distributions.",
+    "Elementary Hindi. Basic conversation, word structure and literacy using the Devanagari script.",
+    "Calculus for the life sciences: limits, derivatives and integrals with biological applications.",
+    "Data Structures",
+]
+
+
+def main():
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='BAAI/bge-base-en-v1.5')
+    parser.add_argument('--out', default='/app/query_encoder')
+    parser.add_argument('--max-seq-length', type=int, default=256)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(args.model, device='cpu')
+    model.max_seq_length = args.max_seq_length
+    tokenizer = model.tokenizer
+    os.makedirs(args.out, exist_ok=True)
+    tokenizer.save_pretrained(args.out)
+
+    class Transformer(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask):
+            return self.auto_model(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    dummy = tokenizer(SAMPLE_TEXTS[:2], padding=True, return_tensors='pt')
+    fp32 = os.path.join(args.out, 'model.fp32.onnx')
+    torch.onnx.export(Transformer(model[0].auto_model).eval(), (dummy['input_ids'], dummy['attention_mask']), fp32,
+                      input_names=['input_ids', 'attention_mask'], output_names=['last_hidden_state'],
+                      dynamic_axes={'input_ids': {0: 'batch', 1: 'tokens'}, 'attention_mask': {0: 'batch', 1: 'tokens'},
+                                    'last_hidden_state': {0: 'batch', 1: 'tokens'}},
+                      opset_version=14)
+    quantize_dynamic(fp32, os.path.join(args.out, ONNX_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32)
+
+    meta = {'model': args.model, 'pooling': model[1].get_pooling_mode_str(), 'max_seq_length': args.max_seq_length,
+            'dim': model.get_sentence_embedding_dimension(), 'pad_id': tokenizer.pad_token_id}
+    with open(os.path.join(args.out, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=1)
+
+    reference = model.encode(SAMPLE_TEXTS, normalize_embeddings=True)
+    exported = OnnxBackend(args.out, os.cpu_count() or 1).encode(SAMPLE_TEXTS)
+    exported /= np.linalg.norm(exported, axis=1, keepdims=True)
+    agreement = (reference * exported).sum(axis=1)
+    print(f"Exported {args.model} to {args.out} ({meta['pooling']} pooling, dim {meta['dim']}); "
+          f"cosine to the float model: min {agreement.min():.4f}, mean {agreement.mean():.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import re
+
+import numpy as np
+import orjson
+import plotly.graph_objects as go
+
+from embedding_store import pack_sections
+from graph_layout import layered_layout
+from prereq_graph import COURSE, LOGIC
+
+SUBJECT_RE = re.compile(r'^([A-Z&]+)')
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+# what go.Figure().to_plotly_json() puts under layout.template; resolved once
+# so figures can be written as plain dicts with the same look
+PLOTLY_TEMPLATE = go.Figure().to_plotly_json()['layout'].get('template')
+
+GRAPH_MAGIC = b'UCGRAPH\x00'
+FORMATS = {'plotly': 'application/json', 'columnar': 'application/json', 'binary': 'application/octet-stream'}
+COLUMNS = ('x', 'y', 'kind', 'role', 'src', 'dst')
+
+STYLE = {
+    'target': ('#FFD700', 40, 'TARGET'),
+    'direct': ('#FFA500', 25, 'Direct Prereq'),
+    'option': ('#FF4500', 25, 'OR-Option'),
+    'logic': ('#ff6b6b', 8, 'Logic (OR)'),
+    'course': ('#4dabf7', 15, 'Course'),
+    'legacy': ('#343a40', 12, 'Discontinued/Legacy'),
+    'external': ('#adb5bd', 12, 'External'),
+}
+
+
+def dumps(obj):
+    # NumPy arrays are written directly; NaN becomes null, which is how the
+    # edge traces separate line segments
+    return orjson.dumps(obj, option=JSON_OPTIONS)
+
+
+def node_roles(graph, nodes, placed, highlight, valid_subjects=frozenset()):
+    """STYLE key of every node in `nodes`, by the same precedence the figure always used."""
+    direct, indirect = set(), set()
+    for p in graph.predecessors(highlight).tolist():
+        if not placed.get(p): continue
+        if graph.kinds[p] == LOGIC:
+            indirect.update(q for q in graph.predecessors(p).tolist() if placed.get(q))
+        else:
+            direct.add(p)
+
+    roles = []
+    for n, kind in zip(nodes.tolist(), graph.kinds[nodes].tolist()):
+        if n == highlight: roles.append('target')
+        elif n in direct: roles.append('direct')
+        elif n in indirect: roles.append('option')
+        elif kind == LOGIC: roles.append('logic')
+        elif kind == COURSE: roles.append('course')
+        else:
+            match = SUBJECT_RE.match(graph.labels[n])
+            roles.append('legacy' if match and match.group(1) in valid_subjects else 'external')
+    return roles
+
+
+def _placed(graph, nodes, highlight):
+    # laid-out nodes with their positions, and the edges between them as local indices
+    x, y = layered_layout(graph, nodes, highlight)
+    keep = ~np.isnan(x)
+    nodes, x, y = nodes[keep], x[keep], y[keep]
+    src, dst = graph.induced_edges(nodes)
+    return nodes, x, y, np.searchsorted(nodes, src), np.searchsorted(nodes, dst)
+
+
+def plotly_figure(graph, nodes, title, highlight, valid_subjects=frozenset()):
+    """The figure dict matcher.html passes to Plotly.react, built without go.Figure.
+
+    Same traces, styling and layout as the go.Figure version, with x/y kept as
+    NumPy arrays for dumps().
+    """
+    nodes, x, y, s, d = _placed(graph, nodes, highlight)
+    placed = dict.fromkeys(nodes.tolist(), True)
+    gap = np.full(len(s), np.nan)
+    edge_x = np.column_stack([x[s], x[d], gap]).ravel()
+    edge_y = np.column_stack([y[s], y[d], gap]).ravel()
+
+    ids, color, size, txt = [], [], [], []
+    for n, kind, role in zip(nodes.tolist(), graph.kinds[nodes].tolist(), node_roles(graph, nodes, placed, highlight, valid_subjects)):
+        label = graph.labels[n]
+        c, sz, prefix = STYLE[role]
+        ids.append(label); color.append(c); size.append(sz)
+        if kind == LOGIC:
+            txt.append("")
+            continue
+        node_title = graph.titles[n] if kind == COURSE else ''
+        txt.append(f"<b>{prefix}: {label}</b><br>{node_title}" if node_title else f"<b>{prefix}: {label}</b>")
+
+    layout = {
+        'clickmode': 'event+select', 'hovermode': 'closest', 'margin': {'b': 20, 'l': 5, 'r': 5, 't': 40},
+        'showlegend': False, 'title': {'font': {'size': 16}, 'text': title, 'x': 0.5},
+        'xaxis': {'visible': False}, 'yaxis': {'visible': False},
+    }
+    if PLOTLY_TEMPLATE is not None:
+        layout['template'] = PLOTLY_TEMPLATE
+    return {
+        'data': [
+            {'hoverinfo': 'none', 'line': {'color': '#ccc', 'width': 0.8}, 'mode': 'lines', 'type': 'scatter',
+             'x': edge_x, 'y': edge_y},
+            {'customdata': ids, 'hoverinfo': 'text', 'hovertext': txt, 'marker': {'color': color, 'size': size},
+             'mode': 'markers', 'type': 'scatter', 'x': x, 'y': y},
+        ],
+        'layout': layout,
+    }
+
+
+def columnar_graph(graph, nodes, title, highlight, valid_subjects=frozenset()):
+    """The same subgraph as parallel columns instead of a figure.
+
+    Node i is ids[i] with kinds[i], roles[role[i]] (a STYLE key) and float32
+    x[i], y[i]; titles[i] is the course title or None. Edge j runs from node
+    src[j] to node dst[j]. Hover text, colors and sizes are left to the client.
+    """
+    nodes, x, y, s, d = _placed(graph, nodes, highlight)
+    role_names = list(STYLE)
+    roles = node_roles(graph, nodes, dict.fromkeys(nodes.tolist(), True), highlight, valid_subjects)
+    kinds = graph.kinds[nodes]
+    titles = [t if k == COURSE and isinstance(t, str) else None for t, k in zip(graph.titles[nodes].tolist(), kinds.tolist())]
+    return {
+        'title': title, 'root': int(np.searchsorted(nodes, highlight)), 'roles': role_names,
+        'ids': [graph.labels[n] for n in nodes.tolist()], 'titles': titles,
+        'x': x.astype(np.float32), 'y': y.astype(np.float32), 'kind': kinds.astype(np.int8),
+        'role': np.array([role_names.index(r) for r in roles], dtype=np.uint8),
+        'src': s.astype(np.int32), 'dst': d.astype(np.int32),
+    }
+
+
+def pack_binary(resp):
+    """A /api/search response with a columnar graph as one binary payload.
+
+    Layout of write_sections(): preamble, JSON header (everything except the
+    numeric columns, which go under header["graph"] minus COLUMNS), then each
+    column as a 64-byte aligned little-endian typed array, ready for
+    Float32Array / Int32Array views in the browser.
+    """
+    header = orjson.loads(dumps(resp if resp.get('graph') is None else dict(resp, graph=None)))
+    sections = []
+    if resp.get('graph') is not None:
+        graph = dict(resp['graph'])
+        sections = [(name, graph.pop(name)) for name in COLUMNS]
+        header['graph'] = graph
+    return pack_sections(GRAPH_MAGIC, header, sections)
@@ -0,0 +1,132 @@
+from bisect import bisect_right, insort
+
+import numpy as np
+
+from prereq_graph import LOGIC
+
+X_SEP = 1.2
+Y_SEP = 1.5
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def _crossings(layers, down, slot):
+    # per pair of adjacent layers: sort the edges by (upper slot, lower slot),
+    # then every inversion among the lower slots is one crossing
+    total = 0
+    for layer in layers[:-1]:
+        ends = sorted([(slot[u], slot[w]) for u in layer for w in down[u]])
+        seen = []
+        for _, b in ends:
+            total += len(seen) - bisect_right(seen, b)
+            insort(seen, b)
+    return total
+
+
+def _sweep(layers, neighbors, slot, order):
+    changed = False
+    for l in order:
+        layer = layers[l]
+        keyed = []
+        for v in layer:
+            nb = neighbors[v]
+            keyed.append(((sum([slot[u] for u in nb]) / len(nb) if nb else slot[v]), slot[v], v))
+        keyed.sort()
+        new = [v for _, _, v in keyed]
+        if new != layer:
+            changed = True
+            layers[l] = new
+            for i, v in enumerate(new):
+                slot[v] = i
+    return changed
+
+
+def _compact(desired, gaps):
+    # closest positions to `desired` (in layer order) keeping gaps[i] between
+    # nodes i and i + 1: the average of a left-to-right and a right-to-left pass
+    # respects both
+    left, right = [desired[0]], [0.0] * len(desired)
+    for d, g in zip(desired[1:], gaps):
+        left.append(max(d, left[-1] + g))
+    right[-1] = desired[-1]
+    for i in range(len(desired) - 2, -1, -1):
+        right[i] = min(desired[i], right[i + 1] - gaps[i])
+    return [(a + b) / 2 for a, b in zip(left, right)]
+
+
+def layered_layout(graph, nodes, root, sweeps=4, x_sep=X_SEP, y_sep=Y_SEP):
+    """x, y arrays aligned with the sorted subgraph `nodes` (NaN where `root` does not reach).
+
+    A node's layer is its BFS depth over predecessor edges, so an ancestor
+    shared by several courses sits one level below the nearest of them. Each
+    layer is first sorted by the mean slot of the nodes it feeds in the layer
+    above, then OR nodes after courses, then label. Up to `sweeps` rounds of
+    down and up barycenter passes follow, and the round with the fewest
+    crossings wins. Every tie falls back to that first order, so the layout
+    depends only on the subgraph. Finally each node is pulled under the mean x
+    of the nodes it feeds, keeping `x_sep` between neighbours (half that next
+    to the small OR markers), instead of centering every layer on its own.
+    """
+    # subgraphs are small, so plain int loops beat per-layer NumPy calls here
+    nodes = np.asarray(nodes)
+    n = len(nodes)
+    x = np.full(n, np.nan)
+    y = np.full(n, np.nan)
+    if n == 0:
+        return x, y
+    src, dst = graph.induced_edges(nodes)
+    preds = [[] for _ in range(n)]
+    succs = [[] for _ in range(n)]
+    for s, d in zip(np.searchsorted(nodes, src).tolist(), np.searchsorted(nodes, dst).tolist()):
+        preds[d].append(s)
+        succs[s].append(d)
+    r = int(np.searchsorted(nodes, root))
+
+    level = [-1] * n
+    level[r] = 0
+    layers = [[r]]
+    while True:
+        next_layer = []
+        for v in layers[-1]:
+            for p in preds[v]:
+                if level[p] < 0:
+                    level[p] = len(layers)
+                    next_layer.append(p)
+        if not next_layer: break
+        layers.append(next_layer)
+
+    # only edges between adjacent layers take part in ordering
+    up = [[u for u in preds[v] + succs[v] if level[u] == level[v] - 1] if level[v] > 0 else [] for v in range(n)]
+    down = [[u for u in preds[v] + succs[v] if level[u] == level[v] + 1] if level[v] >= 0 else [] for v in range(n)]
+
+    labels = [graph.labels[i] for i in nodes.tolist()]
+    is_logic = (graph.kinds[nodes] == LOGIC).tolist()
+    slot = [0] * n
+    for l in range(1, len(layers)):
+        layers[l].sort(key=lambda v: (_mean([slot[u] for u in up[v]]) or 0, is_logic[v], labels[v]))
+        for i, v in enumerate(layers[l]):
+            slot[v] = i
+
+    best, best_crossings = [list(l) for l in layers], _crossings(layers, down, slot)
+    for _ in range(sweeps):
+        if best_crossings == 0: break
+        changed = _sweep(layers, up, slot, range(1, len(layers)))
+        changed |= _sweep(layers, down, slot, range(len(layers) - 2, 0, -1))
+        if not changed: break
+        crossings = _crossings(layers, down, slot)
+        if crossings >= best_crossings: break
+        best, best_crossings = [list(l) for l in layers], crossings
+
+    pos_x = [0.0] * n
+    for l, layer in enumerate(best[1:], start=1):
+        desired = [_mean([pos_x[u] for u in up[v]]) or 0.0 for v in layer]
+        gaps = [x_sep / 2 if is_logic[a] or is_logic[b] else x_sep for a, b in zip(layer, layer[1:])]
+        for v, px in zip(layer, _compact(desired, gaps)):
+            pos_x[v] = px
+            y[v] = -l * y_sep
+    placed = np.array(level) >= 0
+    x[placed] = np.array(pos_x)[placed]
+    y[r] = 0.0
+    return x, y
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+
+# The app is imported once in the master (preload_app) and the workers are
+# forked from it, so the catalog, graph arrays and embeddings are shared
+# copy-on-write instead of being rebuilt per worker. The embedding store,
+# neighbor table and startup snapshot are mmap'd files and shared through the
+# page cache either way.
+#
+#   WEB_CONCURRENCY  worker processes (default: one per CPU, at most 8)
+#   WEB_THREADS      threads per worker (default 2); similarity and graph work
+#                    is mostly NumPy/torch, which releases the GIL
+#   TORCH_THREADS    intra-op threads per worker (default: CPUs / workers)
+bind = f"0.0.0.0:{os.getenv('PORT', '7860')}"
+workers = int(os.getenv("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 8)))
+threads = int(os.getenv("WEB_THREADS", "2"))
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+
+
+def post_fork(server, worker):
+    # N workers each running cpu_count torch threads oversubscribe the machine
+    import sys
+    n = int(os.getenv("TORCH_THREADS", max(1, multiprocessing.cpu_count() // server.cfg.workers)))
+    # the query encoder loads later in the worker and reads its thread count from here
+    os.environ["TORCH_THREADS"] = str(n)
+    torch = sys.modules.get("torch")
+    if torch is not None and hasattr(torch, "set_num_threads"):
+        torch.set_num_threads(n)
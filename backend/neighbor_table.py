@@ -0,0 +1,163 @@
+import hashlib
+
+import numpy as np
+
+from campus_index import CAMPUSES, segment_topk
+from embedding_store import read_sections, write_sections
+
+# (n_rows, len(campuses), k) neighbor rows (int32, -1 = none) and float16
+# scores, plus one uint64 content hash per row for incremental refresh.
+TABLE_MAGIC = b'UCKNN\x00\x00\x00'
+BLOCK_ROWS = 512
+
+
+def row_hashes(campuses, matrix):
+    # a row only needs recomputing when its campus or its vector changes
+    out = np.empty(len(campuses), dtype=np.uint64)
+    for i, (c, v) in enumerate(zip(campuses, matrix)):
+        digest = hashlib.blake2b(str(c).encode() + np.asarray(v, dtype=np.float32).tobytes(), digest_size=8)
+        out[i] = int.from_bytes(digest.digest(), 'little')
+    return out
+
+
+def catalog_digest(campuses, course_ids):
+    h = hashlib.sha1()
+    for c, i in zip(campuses, course_ids):
+        h.update(f"{c}\t{i}\n".encode())
+    return h.hexdigest()
+
+
+def _sorted_matrix(index):
+    return index.matrix.numpy() if index.is_torch else np.asarray(index.matrix)
+
+
+def compute_rows(index, rows, k, campuses=CAMPUSES):
+    """Full neighbor lists for catalog `rows`, computed BLOCK_ROWS at a time."""
+    rows = np.asarray(rows, dtype=np.int64)
+    ids = np.full((len(rows), len(campuses), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), len(campuses), k), dtype=np.float16)
+    own = np.empty(len(index), dtype=object)
+    for c, (start, end) in index.offsets.items():
+        own[index.row_ids[start:end]] = c
+    for b in range(0, len(rows), BLOCK_ROWS):
+        block = rows[b:b + BLOCK_ROWS]
+        sim = index.scores(block)
+        sim = sim.numpy() if hasattr(sim, 'numpy') else sim
+        for j, c in enumerate(campuses):
+            if c not in index.offsets: continue
+            start, end = index.offsets[c]
+            top, top_scores = segment_topk(sim[:, start:end], k)
+            n = top.shape[1]
+            ids[b:b + len(block), j, :n] = index.row_ids[top + start]
+            scores[b:b + len(block), j, :n] = top_scores
+            same = own[block] == c
+            ids[b:b + len(block)][same, j] = -1
+            scores[b:b + len(block)][same, j] = 0
+    return ids, scores
+
+
+def build_table(index, campuses_col, k=5, campuses=CAMPUSES):
+    ids, scores = compute_rows(index, np.arange(len(index)), k, campuses)
+    matrix = _sorted_matrix(index)[index.positions]
+    return ids, scores, row_hashes(campuses_col, matrix)
+
+
+def refresh_table(index, campuses_col, old_ids, old_scores, old_hashes, k=5, campuses=CAMPUSES):
+    """Update a table after some rows changed, without redoing the full N x N product.
+
+    Changed rows are recomputed in full. Unchanged rows whose current lists
+    point at a changed row are recomputed too, since that neighbor's score may
+    have dropped. Every other row only merges in the changed columns.
+    Returns (ids, scores, hashes, n_changed, n_recomputed).
+    """
+    matrix = _sorted_matrix(index)
+    hashes = row_hashes(campuses_col, matrix[index.positions])
+    if len(hashes) != len(old_hashes) or old_ids.shape[1:] != (len(campuses), k):
+        ids, scores = compute_rows(index, np.arange(len(index)), k, campuses)
+        return ids, scores, hashes, len(hashes), len(hashes)
+
+    changed = np.flatnonzero(hashes != old_hashes)
+    ids, scores = np.array(old_ids), np.array(old_scores)
+    if len(changed) == 0:
+        return ids, scores, hashes, 0, 0
+
+    is_changed = np.zeros(len(hashes), dtype=bool)
+    is_changed[changed] = True
+    stale = is_changed | (is_changed[np.maximum(ids, 0)] & (ids >= 0)).any(axis=(1, 2))
+    recompute = np.flatnonzero(stale)
+    ids[recompute], scores[recompute] = compute_rows(index, recompute, k, campuses)
+
+    # merge the changed columns into every other row's lists
+    keep = np.flatnonzero(~stale)
+    changed_vecs = matrix[index.positions[changed]]
+    changed_campus = np.asarray(campuses_col, dtype=object)[changed]
+    own = np.asarray(campuses_col, dtype=object)
+    for b in range(0, len(keep), BLOCK_ROWS):
+        block = keep[b:b + BLOCK_ROWS]
+        sim = matrix[index.positions[block]] @ changed_vecs.T
+        for j, c in enumerate(campuses):
+            cols = np.flatnonzero(changed_campus == c)
+            rows_in = np.flatnonzero(own[block] != c)
+            if len(cols) == 0 or len(rows_in) == 0: continue
+            r = block[rows_in]
+            cand_ids = np.concatenate([ids[r, j], np.broadcast_to(changed[cols].astype(np.int32), (len(r), len(cols)))], axis=1)
+            cand_scores = np.concatenate([scores[r, j].astype(np.float32), sim[rows_in][:, cols]], axis=1)
+            cand_scores[cand_ids < 0] = -np.inf
+            top, top_scores = segment_topk(cand_scores, k)
+            new_ids = np.take_along_axis(cand_ids, top, axis=1)
+            new_ids[~np.isfinite(top_scores)] = -1
+            ids[r, j] = new_ids
+            scores[r, j] = np.where(np.isfinite(top_scores), top_scores, 0)
+    return ids, scores, hashes, len(changed), len(recompute)
+
+
+def save_table(path, ids, scores, hashes, digest, source=None, campuses=CAMPUSES):
+    # `source` is the vectors_digest() of the embeddings the table was computed from
+    header = {'n_rows': len(ids), 'k': ids.shape[2], 'campuses': list(campuses), 'catalog': digest,
+              'source': source}
+    write_sections(path, TABLE_MAGIC, header, [('ids', ids), ('scores', scores), ('hashes', hashes)])
+
+
+class NeighborTable:
+    """Memory-mapped precomputed top-k per campus; search() is a single row lookup."""
+
+    def __init__(self, path):
+        header, sections = read_sections(path, TABLE_MAGIC)
+        self.path = path
+        self.k = header['k']
+        self.campuses = header['campuses']
+        self.digest = header['catalog']
+        self.source = header.get('source')
+        self.ids = sections['ids']
+        self.scores = sections['scores']
+        self.hashes = sections['hashes']
+
+    def __len__(self):
+        return len(self.ids)
+
+    def changed_rows(self, index, campuses_col):
+        """Catalog rows whose campus or vector in `index` differs from what the table was computed from."""
+        if len(index) != len(self.hashes):
+            return np.arange(len(index))
+        return np.flatnonzero(row_hashes(campuses_col, index.vectors(index.positions)) != self.hashes)
+
+    def matches_embeddings(self, index, campuses_col):
+        # the source digest is exact; tables written before it was recorded fall back to the row hashes
+        if self.source is not None:
+            return self.source == index.source_digest
+        return len(self.changed_rows(index, campuses_col)) == 0
+
+    def search(self, rows, k=5, campuses=CAMPUSES, exclude=None):
+        results = []
+        for row in np.atleast_1d(np.asarray(rows, dtype=np.int64)):
+            ids, scores = self.ids[row], self.scores[row]
+            res = {}
+            for c in campuses:
+                if c == exclude or c not in self.campuses:
+                    res[c] = []
+                    continue
+                j = self.campuses.index(c)
+                n = int((ids[j, :k] >= 0).sum())
+                res[c] = list(zip(ids[j, :n].tolist(), scores[j, :n].astype(np.float32).tolist()))
+            results.append(res)
+        return results
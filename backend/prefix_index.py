@@ -0,0 +1,66 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from prereq_parser import normalize_course_id
+
+LOOSE_RE = re.compile(r"[^A-Z0-9&/]")
+# zeros padding the course number ("MAT022A"), so "MAT22", "MAT022" and "MAT 22" all meet
+PAD_RE = re.compile(r"(?<=[A-Z&/])0+(?=\d)")
+QUERY_PAD_RE = re.compile(r"(?<=[A-Z&/])0+(?=\d|$)")
+NUMBER_RE = re.compile(r"^([A-Z&/]*)(\d*)(.*)$")
+
+
+def course_key(course_id):
+    return PAD_RE.sub('', LOOSE_RE.sub('', normalize_course_id(course_id)))
+
+
+def query_key(text):
+    """The prefix to look up for what a user typed: "mat 21a", "MAT-021A" and "mat21A" all give "MAT21A"."""
+    return QUERY_PAD_RE.sub('', LOOSE_RE.sub('', normalize_course_id(text)))
+
+
+def _natural(key):
+    subject, number, rest = NUMBER_RE.match(key).groups()
+    return subject, int(number) if number else -1, rest
+
+
+class PrefixIndex:
+    """Course ids of one campus (or all) in a sorted list of canonical keys for prefix lookups.
+
+    `keys` are course_key() of every distinct (campus, course id), sorted so
+    the matches of a prefix are one contiguous slice found by two bisections.
+    `rank[i]` is the position of keys[i] in natural order (subject, course
+    number as an int, suffix), so within a slice "MAT21A" comes before "MAT200".
+    """
+
+    def __init__(self, rows, course_ids, campuses):
+        seen = {}
+        for r in rows.tolist():
+            seen.setdefault((campuses[r], course_ids[r]), r)
+        entries = sorted((course_key(cid), campus, r) for (campus, cid), r in seen.items())
+        self.keys = [k for k, _, _ in entries]
+        self.rows = np.array([r for _, _, r in entries], dtype=np.int64)
+        natural = sorted(range(len(entries)), key=lambda i: (_natural(entries[i][0]), entries[i][1]))
+        self.rank = np.empty(len(entries), dtype=np.int32)
+        self.rank[natural] = np.arange(len(entries), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def span(self, prefix):
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        return lo, hi
+
+    def complete(self, text, limit=10):
+        """(catalog rows of the first `limit` matches in natural order, number of matches)."""
+        lo, hi = self.span(query_key(text))
+        ranks = self.rank[lo:hi]
+        if hi - lo > limit:
+            best = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            best = np.arange(hi - lo)
+        best = best[np.argsort(ranks[best], kind='stable')]
+        return self.rows[lo + best], hi - lo
@@ -0,0 +1,187 @@
+from collections import deque
+
+import numpy as np
+
+from prereq_graph import LOGIC
+
+
+def strongly_connected(graph):
+    """Component id of every node (iterative Tarjan over predecessor edges).
+
+    Components come out in reverse topological order of the condensation:
+    every predecessor's component is numbered before the node's own.
+    """
+    n = len(graph)
+    indptr, indices = graph.pred_indptr, graph.pred_indices
+    index = np.full(n, -1, dtype=np.int64).tolist()
+    low = [0] * n
+    comp = [-1] * n
+    on_stack = [False] * n
+    stack, counter, n_comp = [], 0, 0
+    for start in range(n):
+        if index[start] >= 0: continue
+        work = [(start, int(indptr[start]))]
+        index[start] = low[start] = counter; counter += 1
+        stack.append(start); on_stack[start] = True
+        while work:
+            v, i = work[-1]
+            if i < indptr[v + 1]:
+                work[-1] = (v, i + 1)
+                w = int(indices[i])
+                if index[w] < 0:
+                    index[w] = low[w] = counter; counter += 1
+                    stack.append(w); on_stack[w] = True
+                    work.append((w, int(indptr[w])))
+                elif on_stack[w]:
+                    low[v] = min(low[v], index[w])
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop(); on_stack[w] = False
+                    comp[w] = n_comp
+                    if w == v: break
+                n_comp += 1
+    return np.array(comp, dtype=np.int32), n_comp
+
+
+class PrereqClosure:
+    """All ancestors of every node of a CampusGraph, with their distance.
+
+    Distance counts prerequisite levels the way semantic_subgraph() does: one
+    per edge into a course, none for the edge from an OR option into its OR
+    node, so `within(v, k)` is exactly semantic_subgraph(v, k). Ancestor lists
+    are sorted node ids in CSR form (`indptr`, `indices`, `dist`).
+
+    Cycles in the scraped prerequisites are kept, not broken: every node of a
+    strongly connected component is an ancestor of the others (and of itself,
+    flagged in `cyclic`). Those nodes get their lists from a 0-1 BFS; the rest
+    merge their predecessors' lists in topological order.
+    """
+
+    def __init__(self, indptr, indices, dist, cyclic, logic):
+        self.indptr = indptr
+        self.indices = indices
+        self.dist = dist
+        self.cyclic = cyclic
+        self.logic = logic
+        # deepest ancestor of every node; queries at or beyond it skip the distance filter
+        self.height = np.zeros(len(indptr) - 1, dtype=np.int32)
+        nonempty = indptr[1:] > indptr[:-1]
+        if len(dist):
+            self.height[nonempty] = np.maximum.reduceat(dist, indptr[:-1][nonempty])
+
+    @classmethod
+    def build(cls, graph):
+        n = len(graph)
+        comp, n_comp = strongly_connected(graph)
+        sizes = np.bincount(comp, minlength=n_comp)
+        in_cycle = sizes[comp] > 1
+        indptr, indices = graph.pred_indptr, graph.pred_indices
+        weight = np.where(graph.kinds == LOGIC, 0, 1).tolist()
+
+        anc = [None] * n
+        for v in np.argsort(comp, kind='stable').tolist():
+            if in_cycle[v]:
+                anc[v] = cls._bfs(graph, v, weight)
+                continue
+            w = weight[v]
+            cur = {}
+            for p in indices[indptr[v]:indptr[v + 1]].tolist():
+                if w < cur.get(p, w + 1):
+                    cur[p] = w
+                for a, d in anc[p].items():
+                    if d + w < cur.get(a, d + w + 1):
+                        cur[a] = d + w
+            anc[v] = cur
+
+        lens = np.fromiter((len(a) for a in anc), dtype=np.int64, count=n)
+        out_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lens, out=out_indptr[1:])
+        out_indices = np.empty(out_indptr[-1], dtype=np.int32)
+        out_dist = np.empty(out_indptr[-1], dtype=np.int32)
+        for v, a in enumerate(anc):
+            if not a: continue
+            keys = sorted(a)
+            out_indices[out_indptr[v]:out_indptr[v + 1]] = keys
+            out_dist[out_indptr[v]:out_indptr[v + 1]] = [a[k] for k in keys]
+        cyclic = np.zeros(n, dtype=bool)
+        cyclic[np.flatnonzero(in_cycle)] = True
+        return cls(out_indptr, out_indices, out_dist, cyclic, graph.kinds == LOGIC)
+
+    @staticmethod
+    def _bfs(graph, root, weight):
+        # 0-1 BFS over predecessors; root is its own ancestor only via a cycle
+        indptr, indices = graph.pred_indptr, graph.pred_indices
+        best = {root: 0}
+        own = None
+        queue = deque([root])
+        while queue:
+            v = queue.popleft()
+            d, w = best[v], weight[v]
+            for p in indices[indptr[v]:indptr[v + 1]].tolist():
+                nd = d + w
+                if p == root:
+                    own = nd if own is None else min(own, nd)
+                elif nd < best.get(p, nd + 1):
+                    best[p] = nd
+                    if w == 0: queue.appendleft(p)
+                    else: queue.append(p)
+        del best[root]
+        if own is not None:
+            best[root] = own
+        return best
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_cyclic(self):
+        return int(self.cyclic.sum())
+
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.dist.nbytes + self.cyclic.nbytes
+
+    def ancestors(self, v, max_dist=None):
+        """(node ids, distances) of every ancestor of `v`, or those within `max_dist` levels."""
+        s, e = self.indptr[v], self.indptr[v + 1]
+        nodes, dist = self.indices[s:e], self.dist[s:e]
+        if max_dist is not None:
+            keep = dist <= max_dist
+            nodes, dist = nodes[keep], dist[keep]
+        return nodes, dist
+
+    def distance(self, a, b):
+        """Levels from `b` down to its prerequisite `a`, or None when `a` is not one."""
+        s, e = self.indptr[b], self.indptr[b + 1]
+        i = s + np.searchsorted(self.indices[s:e], a)
+        if i < e and self.indices[i] == a:
+            return int(self.dist[i])
+        return None
+
+    def is_prerequisite(self, a, b):
+        return self.distance(a, b) is not None
+
+    def within(self, v, depth):
+        """Sorted node ids within `depth` levels of `v`, `v` included; same set as semantic_subgraph()."""
+        depth = min(depth, len(self))
+        if self.logic[v]:
+            # as a root an OR node is one level above its options, not level with them
+            parts = [np.array([v], dtype=np.int32)]
+            if depth >= 1:
+                options, _ = self.ancestors(v, 0)
+                parts += [self.within(p, depth - 1) for p in options.tolist()]
+            return np.unique(np.concatenate(parts)).astype(np.int32)
+        s, e = self.indptr[v], self.indptr[v + 1]
+        if s == e:
+            return np.array([v], dtype=np.int32)
+        nodes = self.indices[s:e]
+        if depth < self.height[v]:
+            nodes = nodes[self.dist[s:e] <= depth]
+        i = int(nodes.searchsorted(v))
+        if i < len(nodes) and nodes[i] == v:
+            return nodes
+        return np.concatenate((nodes[:i], [v], nodes[i:])).astype(np.int32, copy=False)
@@ -0,0 +1,164 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from prereq_parser import edges_for_rows
+
+COURSE, EXTERNAL, LOGIC = 0, 1, 2
+KIND_NAMES = ['Course', 'External', 'Logic']
+
+
+def _gather(indptr, indices, nodes):
+    # concatenated neighbor lists of `nodes` without a Python loop
+    starts = indptr[nodes]
+    lens = indptr[nodes + 1] - starts
+    total = int(lens.sum())
+    if total == 0:
+        return np.empty(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.cumsum(lens) + lens, lens) + np.arange(total)
+    return indices[offsets]
+
+
+def _csr(keys, values, n):
+    order = np.lexsort((values, keys))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return indptr, values[order].astype(np.int32)
+
+
+class CampusGraph:
+    """Prerequisite graph of one campus in CSR form.
+
+    Nodes are integer ids in insertion order with interned `labels`, a
+    `kinds` array (COURSE / EXTERNAL / LOGIC) and `titles` for course nodes.
+    An OR group becomes a LOGIC node labelled "OR_<target>_<options>" with an
+    edge from every option to it and one edge from it to the target, the same
+    shape the networkx graphs had. Edges are stored twice, as predecessor and
+    successor lists (`pred_indptr`/`pred_indices`, `succ_indptr`/`succ_indices`).
+    """
+
+    def __init__(self, labels, kinds, titles, src, dst):
+        self.labels = labels
+        self.ids = {label: i for i, label in enumerate(labels)}
+        self.kinds = np.asarray(kinds, dtype=np.int8)
+        self.titles = titles
+        n = len(labels)
+        src = np.asarray(src, dtype=np.int32)
+        dst = np.asarray(dst, dtype=np.int32)
+        self.pred_indptr, self.pred_indices = _csr(dst, src, n)
+        self.succ_indptr, self.succ_indices = _csr(src, dst, n)
+
+    @classmethod
+    def build(cls, course_ids, titles, edges):
+        """Build from campus rows and their slice of parse_prerequisite_column().
+
+        `edges.row` indexes into `course_ids`/`titles`. A course listed on
+        several rows keeps the title of its last row.
+        """
+        course_ids = np.asarray(course_ids, dtype=object)
+        by_label = pd.Series(np.asarray(titles, dtype=object), index=course_ids)
+        by_label = by_label[~by_label.index.duplicated(keep='last')]
+        courses = pd.unique(course_ids)
+
+        target = course_ids[edges['row'].to_numpy()]
+        e = pd.DataFrame({'source': edges['source'].to_numpy(), 'target': target})
+        size = edges['size'].to_numpy()
+        single = e[size == 1]
+        multi = e[size > 1]
+        or_labels = 'OR_' + multi['target'] + '_' + edges['options'][size > 1].to_numpy()
+
+        course_set = set(courses)
+        externals = [s for s in pd.unique(e['source']) if s not in course_set]
+        logic = pd.unique(or_labels)
+        labels = [sys.intern(str(l)) for l in (*courses, *externals, *logic)]
+        kinds = np.repeat(np.array([COURSE, EXTERNAL, LOGIC], dtype=np.int8), [len(courses), len(externals), len(logic)])
+        node_titles = np.empty(len(labels), dtype=object)
+        node_titles[:len(courses)] = by_label.reindex(courses).to_numpy()
+
+        index = pd.Index(labels)
+        no_self = single['source'] != single['target']
+        option = multi['source'] != multi['target']
+        src = np.concatenate([index.get_indexer(single['source'][no_self]), index.get_indexer(multi['source'][option]),
+                              index.get_indexer(or_labels)])
+        dst = np.concatenate([index.get_indexer(single['target'][no_self]), index.get_indexer(or_labels[option]),
+                              index.get_indexer(multi['target'])])
+        pairs = np.unique(src.astype(np.int64) << 32 | dst.astype(np.int64))
+        return cls(labels, kinds, node_titles, pairs >> 32, pairs & 0xFFFFFFFF)
+
+    @classmethod
+    def from_csr(cls, labels, kinds, titles, pred_indptr, pred_indices, succ_indptr, succ_indices):
+        graph = cls.__new__(cls)
+        graph.labels = labels
+        graph.ids = {label: i for i, label in enumerate(labels)}
+        graph.kinds = kinds
+        graph.titles = titles
+        graph.pred_indptr, graph.pred_indices = pred_indptr, pred_indices
+        graph.succ_indptr, graph.succ_indices = succ_indptr, succ_indices
+        return graph
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def n_edges(self):
+        return len(self.succ_indices)
+
+    def node_id(self, label):
+        return self.ids.get(label)
+
+    def predecessors(self, n):
+        return self.pred_indices[self.pred_indptr[n]:self.pred_indptr[n + 1]]
+
+    def successors(self, n):
+        return self.succ_indices[self.succ_indptr[n]:self.succ_indptr[n + 1]]
+
+    def nbytes(self):
+        arrays = (self.kinds, self.pred_indptr, self.pred_indices, self.succ_indptr, self.succ_indices)
+        return sum(a.nbytes for a in arrays)
+
+    def semantic_subgraph(self, root, depth=1):
+        """Node ids within `depth` prerequisite levels of `root`; OR nodes do not count as a level."""
+        # subgraphs are small, so plain int loops beat per-level NumPy calls here
+        indptr, indices, kinds = self.pred_indptr, self.pred_indices, self.kinds
+        keep = {root}
+        frontier = [root]
+        for _ in range(depth):
+            next_frontier = []
+            for n in frontier:
+                for p in indices[indptr[n]:indptr[n + 1]].tolist():
+                    if kinds[p] == LOGIC:
+                        keep.add(p)
+                        options = indices[indptr[p]:indptr[p + 1]].tolist()
+                    else:
+                        options = (p,)
+                    # nodes seen before were already expanded, so only new ones go on
+                    for q in options:
+                        if q not in keep:
+                            keep.add(q)
+                            next_frontier.append(q)
+            frontier = next_frontier
+            if not frontier: break
+        return np.fromiter(sorted(keep), dtype=np.int32, count=len(keep))
+
+    def induced_edges(self, nodes):
+        """(src, dst) arrays of every edge between `nodes`."""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[nodes] = True
+        lens = self.succ_indptr[nodes + 1] - self.succ_indptr[nodes]
+        src = np.repeat(nodes, lens)
+        dst = _gather(self.succ_indptr, self.succ_indices, nodes)
+        inside = mask[dst]
+        return src[inside], dst[inside]
+
+
+def build_campus_graphs(catalog, prereq_edges):
+    graphs = {}
+    for campus in catalog.ranges:
+        rows = catalog.campus_rows(campus)
+        campus_edges = edges_for_rows(prereq_edges, rows, len(catalog))
+        graphs[campus] = CampusGraph.build(catalog.course_ids[rows], catalog.titles[rows], campus_edges)
+    return graphs
+
+
+EMPTY_GRAPH = CampusGraph([], [], np.array([], dtype=object), [], [])
@@ -0,0 +1,90 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+GRADE_RE = re.compile(r"\s+[A-D][+-]?\s+OR\s+BETTER")
+# course codes and part separators in one pass
+TOKEN_RE = re.compile(r"\b[A-Z&]{2,5}\s*\d+[A-Z]*\b|;")
+
+
+def normalize_course_id(text):
+    if pd.isna(text): return ""
+    return str(text).replace(" ", "").upper()
+
+
+def _close_part(part, courses, structure):
+    if not courses: return
+    part = part.strip()
+    if ' OR ' in part or 'ONE OF' in part:
+        structure.append(courses)
+    else:
+        structure.extend([c] for c in courses)
+
+
+def parse_prerequisite(prereq_text):
+    if not isinstance(prereq_text, str) or not prereq_text.strip(): return []
+    text = GRADE_RE.sub("", prereq_text.upper().replace("\xa0", " ").strip())
+    text = text.replace("(", " ( ").replace(")", " ) ")
+
+    parts = text.split(';')
+    structure = []
+    part_idx, courses = 0, []
+    for token in TOKEN_RE.findall(text):
+        if token == ';':
+            _close_part(parts[part_idx], courses, structure)
+            part_idx, courses = part_idx + 1, []
+        else:
+            courses.append(token.replace(" ", ""))
+    _close_part(parts[part_idx], courses, structure)
+    return structure
+
+
+def parse_prerequisite_column(texts):
+    """Parse a whole Prerequisite(s) column into a flat edge list.
+
+    Identical strings are parsed once. Returns a DataFrame with one line per
+    course option: `row` (position in `texts`), `group` (global id of the
+    AND-ed requirement group), `source` (normalized course id), `size` (number
+    of options in the group) and `options` (the group's ids joined by "_").
+    """
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object))
+    structs = [parse_prerequisite(u) for u in uniques]
+
+    # per unique string: flat option list plus its local group index
+    n_groups = np.array([len(s) for s in structs], dtype=np.int64)
+    n_options = np.array([sum(len(g) for g in s) for s in structs], dtype=np.int64)
+    sources = np.array([c for s in structs for g in s for c in g], dtype=object)
+    local_group = np.array([i for s in structs for i, g in enumerate(s) for _ in g], dtype=np.int64)
+    group_size = np.array([len(g) for s in structs for g in s for _ in g], dtype=np.int32)
+    group_key = np.array(['_'.join(g) for s in structs for g in s for _ in g], dtype=object)
+    option_ptr = np.concatenate([[0], np.cumsum(n_options)])
+
+    rows = np.flatnonzero(codes >= 0)
+    row_codes = codes[rows]
+    counts = n_options[row_codes]
+    total = int(counts.sum())
+    if total == 0:
+        return pd.DataFrame({'row': np.empty(0, np.int32), 'group': np.empty(0, np.int32), 'source': np.empty(0, object),
+                             'size': np.empty(0, np.int32), 'options': np.empty(0, object)})
+
+    # gather every row's options without a Python loop over rows
+    starts = option_ptr[row_codes]
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    group_base = np.concatenate([[0], np.cumsum(n_groups[row_codes])[:-1]])
+    return pd.DataFrame({
+        'row': np.repeat(rows, counts).astype(np.int32),
+        'group': (np.repeat(group_base, counts) + local_group[offsets]).astype(np.int32),
+        'source': sources[offsets],
+        'size': group_size[offsets],
+        'options': group_key[offsets],
+    })
+
+
+def edges_for_rows(edges, rows, n_rows):
+    """The part of an edge list whose targets are `rows`, renumbered to positions within `rows`."""
+    local = np.full(n_rows, -1, dtype=np.int64)
+    local[rows] = np.arange(len(rows))
+    row_local = local[edges['row'].to_numpy()]
+    keep = row_local >= 0
+    return edges[keep].assign(row=row_local[keep].astype(np.int32))
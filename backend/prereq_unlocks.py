@@ -0,0 +1,73 @@
+import numpy as np
+
+from prereq_graph import COURSE, LOGIC
+
+
+class UnlockIndex:
+    """Descendants of every node of a CampusGraph: the PrereqClosure turned around.
+
+    `indptr`/`indices`/`dist` list, for each node, every node that has it as
+    an ancestor and how many levels down, sorted by node id. A course at
+    distance 1 has the node as a direct prerequisite or as one option of an OR
+    group; deeper ones need it through a chain.
+
+    Whether a course is actually open is decided against its own predecessor
+    list: every plain predecessor must be completed, and every OR node needs
+    at least one completed option. met() counts that by walking successors of
+    the completed courses only.
+    """
+
+    def __init__(self, graph, closure):
+        n = len(closure)
+        owners = np.repeat(np.arange(n, dtype=np.int32), np.diff(closure.indptr))
+        order = np.lexsort((owners, closure.indices))
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(closure.indices, minlength=n), out=self.indptr[1:])
+        self.indices = owners[order]
+        self.dist = closure.dist[order]
+        self.graph = graph
+        # a course's requirements are its predecessors: plain courses and OR nodes alike
+        self.requirements = np.diff(graph.pred_indptr).astype(np.int32)
+
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.dist.nbytes + self.requirements.nbytes
+
+    def descendants(self, v, max_dist=None):
+        """(node ids, distances) of every node `v` is a prerequisite of, or those within `max_dist` levels."""
+        s, e = self.indptr[v], self.indptr[v + 1]
+        nodes, dist = self.indices[s:e], self.dist[s:e]
+        if max_dist is not None:
+            keep = dist <= max_dist
+            nodes, dist = nodes[keep], dist[keep]
+        return nodes, dist
+
+    def met(self, completed):
+        """{course: requirements met by `completed`}, counting each OR group once however many options are done."""
+        graph = self.graph
+        indptr, indices, kinds = graph.succ_indptr, graph.succ_indices, graph.kinds
+        counts, groups = {}, set()
+        for c in completed:
+            if kinds[c] == LOGIC: continue
+            for s in indices[indptr[c]:indptr[c + 1]].tolist():
+                if kinds[s] != LOGIC:
+                    counts[s] = counts.get(s, 0) + 1
+                elif s not in groups:
+                    groups.add(s)
+                    for t in indices[indptr[s]:indptr[s + 1]].tolist():
+                        counts[t] = counts.get(t, 0) + 1
+        return counts
+
+    def unlocks(self, v, completed=(), max_dist=1):
+        """(course, distance, missing requirements) for every course below `v` that is not completed yet.
+
+        `v` counts as completed along with `completed`; missing == 0 means the
+        course can be taken now.
+        """
+        have = set(completed)
+        have.add(v)
+        nodes, dist = self.descendants(v, max_dist)
+        courses = self.graph.kinds[nodes] == COURSE
+        nodes, dist = nodes[courses].tolist(), dist[courses].tolist()
+        met = self.met(have)
+        missing = (self.requirements[nodes] - np.array([met.get(n, 0) for n in nodes], dtype=np.int32)).tolist()
+        return [(n, d, m) for n, d, m in zip(nodes, dist, missing) if n not in have]
@@ -0,0 +1,210 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+# written by export_query_encoder.py
+ONNX_FILE = 'model.int8.onnx'
+META_FILE = 'encoder.json'
+TOKENIZER_FILE = 'tokenizer.json'
+
+
+def cache_key(text):
+    return ' '.join(text.split())
+
+
+def worker_threads():
+    """Intra-op threads for this process: TORCH_THREADS (gunicorn's post_fork sets it to the
+    worker's share), else torch's current setting, else every CPU."""
+    if os.getenv('TORCH_THREADS'):
+        return int(os.getenv('TORCH_THREADS'))
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        return torch.get_num_threads()
+    return os.cpu_count() or 1
+
+
+class OnnxBackend:
+    """The int8 ONNX export run with onnxruntime; pooling as in the SentenceTransformer it came from."""
+    name = 'onnx-int8'
+
+    def __init__(self, directory, threads):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(directory, ONNX_FILE), opts, providers=['CPUExecutionProvider'])
+        self.inputs = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(directory, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(self.meta['max_seq_length'])
+        self.tokenizer.enable_padding(pad_id=self.meta.get('pad_id', 0))
+
+    def encode(self, texts):
+        encoded = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {'input_ids': ids, 'attention_mask': mask}
+        if 'token_type_ids' in self.inputs:
+            feeds['token_type_ids'] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]
+        if self.meta['pooling'] == 'cls':
+            return hidden[:, 0]
+        return (hidden * mask[..., None]).sum(axis=1) / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+
+
+class TorchBackend:
+    """Fallback when there is no ONNX export: the SentenceTransformer with int8 dynamic quantization of its Linear layers."""
+    name = 'torch-qint8'
+
+    def __init__(self, model_name, threads, max_seq_length):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device='cpu')
+        model.max_seq_length = max_seq_length
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def encode(self, texts):
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+
+
+class QueryEncoder:
+    """Free text -> normalized vector in the catalog's embedding space.
+
+    Nothing is loaded until the first encode() or start_loading(); then the
+    ONNX export in `onnx_dir` is used if it exists, else the torch model is
+    quantized on load. Loading happens per process, after gunicorn forks, on
+    a background thread under its own lock: cache hits never wait for it, and
+    encode() waits for it only up to its timeout. Both backends run
+    `threads` intra-op threads; by default the worker's share, read when the
+    model loads (see worker_threads).
+
+    Recent vectors are kept in an LRU of `cache_entries` keyed by the text with
+    whitespace collapsed. Misses go on a queue that one thread drains: it takes
+    the first waiting text, collects more for up to `max_wait` seconds (at most
+    `max_batch`), and encodes them as one batch, so concurrent requests share a
+    forward pass.
+    """
+
+    def __init__(self, model_name, onnx_dir=None, cache_entries=1024, max_batch=16, max_wait=0.002,
+                 max_seq_length=256, threads=None):
+        self.model_name = model_name
+        self.onnx_dir = onnx_dir
+        self.cache_entries = cache_entries
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_seq_length = max_seq_length
+        self.threads = threads
+        self.backend = None
+        self.error = None
+        self.load_seconds = None
+        self.cache = OrderedDict()
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()  # cache and counters only
+        self.load_lock = threading.Lock()
+        self.loaded = threading.Event()  # set once loading succeeded or failed
+        self.loading = False
+        self.hits = self.misses = self.batches = self.batched = 0
+
+    def start_loading(self):
+        """Starts loading the model in the background, once; returns immediately."""
+        with self.load_lock:
+            if self.loading:
+                return
+            self.loading = True
+        threading.Thread(target=self._load, name='query-encoder-load', daemon=True).start()
+
+    def _load(self):
+        try:
+            t0 = time.perf_counter()
+            if self.threads is None:
+                self.threads = worker_threads()
+            try:
+                if self.onnx_dir and os.path.exists(os.path.join(self.onnx_dir, ONNX_FILE)):
+                    backend = OnnxBackend(self.onnx_dir, self.threads)
+                else:
+                    backend = TorchBackend(self.model_name, self.threads, self.max_seq_length)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"Loading query encoder error: {self.error}")
+                return
+            self.load_seconds = time.perf_counter() - t0
+            threading.Thread(target=self._run, name='query-encoder', daemon=True).start()
+            self.backend = backend
+            print(f"Query encoder ready: {self.model_name} ({backend.name}) in {self.load_seconds:.1f}s")
+        finally:
+            self.loaded.set()
+
+    def available(self, timeout=None):
+        """Whether the model is loaded, waiting up to `timeout` seconds for a load in progress."""
+        if self.backend is None and self.error is None:
+            self.start_loading()
+            self.loaded.wait(timeout)
+        return self.backend is not None
+
+    def encode(self, text, timeout=None):
+        """(normalized float32 vector, whether it came from the cache)."""
+        key = cache_key(text)
+        with self.lock:
+            vector = self.cache.get(key)
+            if vector is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return vector, True
+            self.misses += 1
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        if not self.available(timeout):
+            if self.error is None:
+                raise RuntimeError(f"Query encoder still loading after {timeout}s")
+            raise RuntimeError(f"Query encoder not available: {self.error}")
+        future = Future()
+        self.pending.put((key, future))
+        try:
+            vector = future.result(None if deadline is None else max(deadline - time.perf_counter(), 0))
+        except FutureTimeout:
+            raise RuntimeError(f"Query encoder did not answer within {timeout}s")
+        with self.lock:
+            self.cache[key] = vector
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+        return vector, False
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            texts = list(dict.fromkeys(key for key, _ in batch))
+            try:
+                vectors = np.asarray(self.backend.encode(texts), dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            by_text = dict(zip(texts, vectors))
+            for key, future in batch:
+                future.set_result(by_text[key])
+            self.batches += 1
+            self.batched += len(batch)
+
+    def stats(self):
+        return {"model": self.model_name, "backend": self.backend.name if self.backend else None,
+                "error": self.error, "load_seconds": self.load_seconds, "threads": self.threads, "cache_entries": len(self.cache),
+                "hits": self.hits, "misses": self.misses, "batches": self.batches,
+                "mean_batch": round(self.batched / self.batches, 2) if self.batches else None}
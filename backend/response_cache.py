@@ -0,0 +1,75 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def strong_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU of serialized responses, evicting by entry count and total bytes.
+
+    Entries belong to one data `version`; asking for a different version drops
+    everything first, so a response built from old data is never served.
+    Safe to share between the threads of one worker.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = None
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.nbytes = 0
+            self.version = version
+
+    def get(self, key, version):
+        """(etag, body) for `key`, or None."""
+        with self.lock:
+            self._check_version(version)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body):
+        entry = (strong_etag(body), body)
+        if len(body) > self.max_bytes:
+            return entry
+        with self.lock:
+            self._check_version(version)
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old[1])
+            self.entries[key] = entry
+            self.nbytes += len(body)
+            while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+                self.evictions += 1
+        return entry
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version, 'entries': len(self.entries), 'bytes': self.nbytes,
+                'max_entries': self.max_entries, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'invalidations': self.invalidations, 'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
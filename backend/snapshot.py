@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from embedding_store import read_sections, write_sections
+from prereq_closure import PrereqClosure
+from prereq_graph import CampusGraph
+from text_index import TextIndex
+
+# Everything app.py derives from combined_CLEAN.csv at startup, in one file
+# laid out by write_sections(). String columns are stored as one UTF-8 blob
+# joined by SEP plus a null mask; numeric arrays are mapped as they are.
+SNAPSHOT_MAGIC = b'UCSNAP\x00\x00'
+SNAPSHOT_SCHEMA = 3
+SEP = '\x1f'
+
+
+def file_digest(paths):
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if path is None or not os.path.exists(path): continue
+        h.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def _pack_strings(values):
+    values = np.asarray(values, dtype=object)
+    null = pd.isna(values)
+    strings = ['' if n else str(v) for v, n in zip(values, null)]
+    blob = SEP.join(strings)
+    if blob.count(SEP) != max(len(strings) - 1, 0):
+        raise ValueError("string column contains the snapshot separator")
+    return np.frombuffer(blob.encode(), dtype=np.uint8), null
+
+
+def _unpack_strings(data, null):
+    values = np.array(data.tobytes().decode().split(SEP) if len(null) else [], dtype=object)
+    values[null] = np.nan
+    return values
+
+
+def save_snapshot(path, key, df, prereq_edges, graphs, closures, text_index, embedding_path):
+    sections, columns = [], []
+
+    def strings(name, values):
+        data, null = _pack_strings(values)
+        sections.extend([(f'{name}.data', data), (f'{name}.null', null)])
+
+    for col in df.columns:
+        columns.append([col, str(df[col].dtype)])
+        if df[col].dtype.kind in 'biuf':
+            sections.append((f'df.{col}', df[col].to_numpy()))
+        else:
+            strings(f'df.{col}', df[col].to_numpy(dtype=object))
+
+    for col in ('row', 'group', 'size'):
+        sections.append((f'edges.{col}', prereq_edges[col].to_numpy()))
+    strings('edges.source', prereq_edges['source'].to_numpy())
+    strings('edges.options', prereq_edges['options'].to_numpy())
+
+    for campus, g in graphs.items():
+        strings(f'graph.{campus}.labels', g.labels)
+        strings(f'graph.{campus}.titles', g.titles)
+        for name in ('kinds', 'pred_indptr', 'pred_indices', 'succ_indptr', 'succ_indices'):
+            sections.append((f'graph.{campus}.{name}', getattr(g, name)))
+        for name in ('indptr', 'indices', 'dist', 'cyclic', 'logic'):
+            sections.append((f'closure.{campus}.{name}', getattr(closures[campus], name)))
+
+    strings('text.terms', text_index.terms)
+    for name in ('indptr', 'docs', 'tfs', 'lengths'):
+        sections.append((f'text.{name}', getattr(text_index, name)))
+
+    header = {'schema': SNAPSHOT_SCHEMA, 'key': key, 'columns': columns, 'campuses': list(graphs),
+              'embedding_path': embedding_path}
+    # workers started without preload all write the snapshot at once, so each one gets its own temp file
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(path) or '.')
+    os.close(fd)
+    try:
+        write_sections(tmp, SNAPSHOT_MAGIC, header, sections)
+        os.chmod(tmp, 0o644)  # mkstemp creates it owner-only
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def load_snapshot(path, key):
+    """(df, prereq_edges, graphs, closures, text_index, header) from a snapshot whose key matches, else None."""
+    if not os.path.exists(path):
+        return None
+    header, sections = read_sections(path, SNAPSHOT_MAGIC)
+    if header.get('schema') != SNAPSHOT_SCHEMA or header.get('key') != key:
+        return None
+
+    def strings(name):
+        return _unpack_strings(sections[f'{name}.data'], sections[f'{name}.null'])
+
+    data = {}
+    for col, dtype in header['columns']:
+        if f'df.{col}' in sections:
+            data[col] = pd.Series(np.asarray(sections[f'df.{col}']), dtype=dtype)
+        else:
+            data[col] = pd.Series(strings(f'df.{col}'), dtype=dtype)
+    df = pd.DataFrame(data)
+
+    prereq_edges = pd.DataFrame({
+        'row': sections['edges.row'], 'group': sections['edges.group'], 'source': strings('edges.source'),
+        'size': sections['edges.size'], 'options': strings('edges.options'),
+    })
+
+    graphs = {}
+    for campus in header['campuses']:
+        p = f'graph.{campus}.'
+        graphs[campus] = CampusGraph.from_csr(
+            [sys.intern(l) for l in strings(p + 'labels')], sections[p + 'kinds'], strings(p + 'titles'),
+            sections[p + 'pred_indptr'], sections[p + 'pred_indices'],
+            sections[p + 'succ_indptr'], sections[p + 'succ_indices'])
+    closures = {
+        campus: PrereqClosure(*(sections[f'closure.{campus}.{name}'] for name in ('indptr', 'indices', 'dist', 'cyclic', 'logic')))
+        for campus in header['campuses']
+    }
+    text_index = TextIndex(strings('text.terms').tolist(), *(sections[f'text.{name}'] for name in ('indptr', 'docs', 'tfs', 'lengths')))
+    return df, prereq_edges, graphs, closures, text_index, header
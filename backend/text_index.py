@@ -0,0 +1,107 @@
+import re
+
+import numpy as np
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has in into is it its of on or that the this to with will
+course courses student students topics include including introduction use using may not
+""".split())
+TITLE_WEIGHT = 2
+
+
+def stem(word):
+    # plural stripping only; enough for "algebras"/"theories" without a stemmer dependency
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    if not isinstance(text, str): return []
+    return [stem(w) for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+class TextIndex:
+    """BM25 inverted index over catalog rows (Title counted TITLE_WEIGHT times, plus Course Description).
+
+    `terms` maps a token to its id; the postings of term t are
+    `docs[indptr[t]:indptr[t + 1]]` (int32 row ids, ascending) with term
+    frequencies in `tfs` (uint16). `lengths` holds the weighted token count of
+    every row. Scoring is one bincount over the postings of the query terms.
+    """
+
+    def __init__(self, terms, indptr, docs, tfs, lengths, k1=1.2, b=0.75):
+        self.terms = terms
+        self.ids = {t: i for i, t in enumerate(terms)}
+        self.indptr = indptr
+        self.docs = docs
+        self.tfs = tfs
+        self.lengths = lengths
+        self.k1, self.b = k1, b
+        n = len(lengths)
+        df = np.diff(indptr)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        # per-row part of the BM25 denominator, so a query only adds tf
+        self.norm = (k1 * (1 - b + b * lengths / max(lengths.mean(), 1))).astype(np.float32)
+
+    @classmethod
+    def build(cls, titles, descriptions):
+        vocab = {}
+        term_ids, doc_ids, lengths = [], [], np.zeros(len(titles), dtype=np.int32)
+        for row, (title, desc) in enumerate(zip(titles, descriptions)):
+            tokens = tokenize(title) * TITLE_WEIGHT + tokenize(desc)
+            lengths[row] = len(tokens)
+            for t in tokens:
+                term_ids.append(vocab.setdefault(t, len(vocab)))
+            doc_ids.extend([row] * len(tokens))
+        pairs = np.array(term_ids, dtype=np.int64) << 32 | np.array(doc_ids, dtype=np.int64)
+        pairs, tfs = np.unique(pairs, return_counts=True)
+        terms = list(vocab)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs >> 32, minlength=len(terms)), out=indptr[1:])
+        docs = (pairs & 0xFFFFFFFF).astype(np.int32)
+        return cls(terms, indptr, docs, np.minimum(tfs, 65535).astype(np.uint16), lengths)
+
+    @classmethod
+    def from_catalog(cls, df):
+        return cls.build(df['Title'].to_numpy(dtype=object), df['Course Description'].to_numpy(dtype=object))
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def nbytes(self):
+        return self.indptr.nbytes + self.docs.nbytes + self.tfs.nbytes + self.lengths.nbytes
+
+    def scores(self, query):
+        """BM25 score of every row for `query` (free text), and the query's known terms."""
+        found = [self.ids[t] for t in dict.fromkeys(tokenize(query)) if t in self.ids]
+        if not found:
+            return np.zeros(len(self), dtype=np.float32), found
+        spans = [(self.indptr[t], self.indptr[t + 1]) for t in found]
+        docs = np.concatenate([self.docs[s:e] for s, e in spans])
+        tf = np.concatenate([self.tfs[s:e] for s, e in spans]).astype(np.float32)
+        idf = np.repeat(self.idf[found], [e - s for s, e in spans])
+        weights = idf * tf * (self.k1 + 1) / (tf + self.norm[docs])
+        return np.bincount(docs, weights=weights, minlength=len(self)).astype(np.float32), found
+
+    def search(self, query, k=20, mask=None):
+        """(rows, scores) of the `k` best rows with a positive score, limited to `mask` when given."""
+        scores, found = self.scores(query)
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if mask is not None:
+            scores = np.where(mask, scores, 0)
+        return top_rows(scores, k)
+
+
+def top_rows(scores, k):
+    hits = np.flatnonzero(scores > 0)
+    if len(hits) > k:
+        hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+    # best first, ties by row so results are stable
+    hits = hits[np.lexsort((hits, -scores[hits]))]
+    return hits, scores[hits]
+
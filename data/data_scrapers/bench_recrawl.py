@@ -0,0 +1,115 @@
+"""Incremental recrawls of the UCSD catalog from fixture_server.py, checked against full crawls.
+
+    python bench_recrawl.py [--latency 0.05] [--subjects 5]
+
+Runs against one crawl state:
+1. first crawl: every page is fetched and parsed.
+2. a few subject pages change (change_ucsd), then a conditional recrawl:
+   the rest answer 304.
+3. the server stops sending ETag/Last-Modified, pages change again: the
+   unchanged ones are caught by their content hash instead.
+4. pages change again and the crawl is cut off after a few pages, then
+   resumed from the state file.
+After every run, the rows must equal a fresh full crawl of the site and the
+delta must equal the difference between the two full crawls.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from campus_parsers import UCSDParser
+from fixture_server import default_site, serve
+from recrawl import by_course, course_keys, recrawl, row_hash
+from scrape_engine import HostPolicy, crawl
+
+
+def full_crawl(start, policy, path):
+    asyncio.run(crawl(UCSDParser(start), path, workers=16, policy=policy))
+    with open(path, encoding='utf-8') as f:
+        # rows per page are in page order, the pages themselves in completion order
+        rows = [json.loads(line) for line in f]
+    by_page = {}
+    for row in rows:
+        by_page.setdefault(row['URL'], []).append(row)
+    # course key -> hashes of its rows on all its pages, compared as the crawl state compares them
+    return by_course((key, row_hash(row), None) for page_rows in by_page.values()
+                     for key, row in course_keys(page_rows, UCSDParser.key_columns))[0]
+
+
+def expected_delta(before, after):
+    ops = Counter()
+    for key in before.keys() | after.keys():
+        if key not in before:
+            ops['added'] += 1
+        elif key not in after:
+            ops['removed'] += 1
+        elif before[key] != after[key]:
+            ops['changed'] += 1
+    return ops
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--subjects', type=int, default=5, help="subject pages changed between runs")
+    args = parser.parse_args()
+
+    site = default_site()
+    server, base = serve(site, latency=args.latency)
+    start = f"{base}/front/courses.html"
+    policy = HostPolicy(16, 0)
+    print(f"fixture at {base}: {len(site.pages)} pages, {args.latency * 1000:.0f} ms latency")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = os.path.join(tmp, 'ucsd.crawl.sqlite')
+        previous = {}
+        ok = True
+
+        def check(name, crawler, state, elapsed, kb):
+            nonlocal previous, ok
+            truth = full_crawl(start, policy, os.path.join(tmp, 'full.jsonl'))
+            rows = by_course(state.db.execute("SELECT course_key, hash, row FROM rows"))[0]
+            got = Counter(change['op'] for change in crawler.delta)
+            want = expected_delta(previous, truth)
+            same_rows, same_delta = rows == truth, got == want
+            ok = ok and same_rows and same_delta
+            print(f"{name:<26} {elapsed:6.2f} s  {crawler.pages:4d} pages  {kb:6d} KB  {crawler.not_modified:4d} x 304  "
+                  f"{crawler.unchanged:4d} same hash  delta {dict(got)}  "
+                  f"rows {'match' if same_rows else 'DIFFER'}, delta {'matches' if same_delta else 'DIFFERS'}")
+            previous = truth
+
+        def run(max_pages=None):
+            t0 = time.perf_counter()
+            crawler, fetcher, state = asyncio.run(recrawl(UCSDParser(start), state_path, policy=policy,
+                                                          max_pages=max_pages))
+            return crawler, state, time.perf_counter() - t0, fetcher.bytes >> 10
+
+        crawler, state, elapsed, kb = run()
+        check('1. first crawl', crawler, state, elapsed, kb)
+
+        site.change_ucsd(args.subjects, seed=1)
+        crawler, state, elapsed, kb = run()
+        check('2. conditional recrawl', crawler, state, elapsed, kb)
+
+        site.validators = False
+        site.change_ucsd(args.subjects, seed=2)
+        crawler, state, elapsed, kb = run()
+        check('3. no validators, by hash', crawler, state, elapsed, kb)
+
+        site.validators = True
+        site.change_ucsd(args.subjects, seed=3)
+        cut, _, cut_elapsed, cut_kb = run(max_pages=20)
+        print(f"{'4a. cut off':<26} {cut_elapsed:6.2f} s  {cut.pages:4d} pages  complete={cut.complete}")
+        crawler, state, elapsed, kb = run()
+        print(f"{'4b. resumed':<26} resumed={crawler.resumed}  run {crawler.run_id} (same as the cut-off run)")
+        check('4. cut off + resumed', crawler, state, cut_elapsed + elapsed, cut_kb + kb)
+    server.shutdown()
+    print('all runs match full crawls' if ok else 'MISMATCH')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Crawl time of the UCSD catalog from fixture_server.py: one request at a time vs. the engine's concurrency.
+
+    python bench_scrape.py [--latency 0.2] [--fail-rate 0.05]
+
+--latency stands in for the live site's response time. "serial" is one request
+in flight at 1 request/s, the pace of sanDiegoScraper.py's sleep(1) per page. The
+other runs lift the rate limit and allow 4 and 16 requests in flight. Every run
+also checks that it got all the rows.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from campus_parsers import UCSDParser
+from fixture_server import default_site, serve
+from scrape_engine import HostPolicy, crawl
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--fail-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    site = default_site()
+    server, base = serve(site, latency=args.latency, fail_rate=args.fail_rate)
+    expected = sum(body.count(b'class="course-name"') for path, (_, body) in site.pages.items()
+                   if path.startswith('/courses/'))
+    print(f"fixture at {base}: {len(site.pages)} pages, {expected} UCSD courses, "
+          f"{args.latency * 1000:.0f} ms latency, {args.fail_rate:.0%} of requests fail")
+
+    runs = [('serial, 1 req/s', HostPolicy(1, 1.0, 1)),
+            ('4 in flight', HostPolicy(4, 0)),
+            ('16 in flight', HostPolicy(16, 0))]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, policy in runs:
+            t0 = time.perf_counter()
+            crawler, fetcher = asyncio.run(crawl(UCSDParser(f"{base}/front/courses.html"), os.path.join(tmp, 'out.csv'),
+                                                 workers=16, policy=policy, retries=6))
+            elapsed = time.perf_counter() - t0
+            print(f"{name:<18} {elapsed:7.1f} s   {crawler.pages / elapsed:6.1f} pages/s   {crawler.rows} rows "
+                  f"({'all' if crawler.rows == expected else 'MISSING ROWS'})   {fetcher.retried} retries   "
+                  f"{len(crawler.failed)} failed")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
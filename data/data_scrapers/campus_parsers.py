@@ -0,0 +1,175 @@
+"""Per-campus parsers for scrape_engine.py (HTML through BeautifulSoup, JSON as is).
+
+A parser has `name`, `columns` (the CSV header), `host_policy`,
+`start_requests()` and one method per kind of page. Each page method yields
+course rows and further Requests. `base_url` defaults to the live catalog and
+can point at fixture_server.py instead.
+"""
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import BeautifulSoup
+
+from catalog_helpers import extractUnits, extractCourseCodeTitle, extractPrereqs
+from scrape_engine import HostPolicy, Request
+
+
+def element_text(el):
+    # like selenium's .text: lines trimmed and joined, runs of spaces inside a line kept
+    # (the saved scrapes have titles such as "Experimentation  I")
+    if el is None:
+        return ''
+    return ' '.join(line.strip() for line in el.get_text().splitlines() if line.strip())
+
+
+class CatalogParser:
+    name = ''
+    BASE_URL = ''
+    columns = []
+    key_columns = []  # what identifies a course between crawls (recrawl.py)
+    host_policy = HostPolicy()
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url or self.BASE_URL
+
+    def start_requests(self):
+        raise NotImplementedError
+
+
+class UCSDParser(CatalogParser):
+    """catalog.ucsd.edu: the subject list, then one static page per subject (sanDiegoScraper.py's crawl)."""
+    name = 'ucsd'
+    BASE_URL = "https://catalog.ucsd.edu/front/courses.html"
+    columns = ["Campus", "Subject", "Subject Code", "Course Code", "Title", "Description", "Prerequisites",
+               "Units Min", "Units Max", "Cross Listing", "URL"]
+    key_columns = ["Subject Code", "Course Code"]
+
+    def start_requests(self):
+        yield Request(self.base_url, 'parse_index')
+
+    def parse_index(self, page):
+        soup = BeautifulSoup(page.text(), 'html.parser')
+        for row in soup.select('.courseFacLink'):
+            link = row.find('a', string='courses')
+            if link is None or not link.get('href'):
+                continue
+            href = urljoin(page.url, link['href'])
+            subject_code = urlsplit(href).path.split('/')[-1].split('.')[0].upper()
+            yield Request(href, 'parse_subject',
+                          meta={'subject_name': link.get('title', '').strip(), 'subject_code': subject_code})
+
+    def parse_subject(self, page):
+        soup = BeautifulSoup(page.text(), 'html.parser')
+        subj = page.request.meta
+        # titles and descriptions are not nested together on these pages, so they are paired by position
+        for name_el, desc_el in zip(soup.select('.course-name'), soup.select('.course-descriptions')):
+            title = element_text(name_el)
+            description = element_text(desc_el)
+            unitsMin, unitsMax = extractUnits(title)
+            courseCode, courseTitle = extractCourseCodeTitle(title)
+            yield {
+                "Campus": "UC San Diego",
+                "Subject": subj["subject_name"],
+                "Subject Code": subj["subject_code"],
+                "Course Code": courseCode,
+                "Title": courseTitle,
+                "Description": description,
+                "Prerequisites": extractPrereqs(description),
+                "Units Min": unitsMin,
+                "Units Max": unitsMax,
+                "Cross Listing": "",
+                "URL": page.url,
+            }
+
+
+class UCSCParser(CatalogParser):
+    """pisa.ucsc.edu class search: result pages of the newest `terms` terms, then one detail page per class."""
+    name = 'ucsc'
+    BASE_URL = "https://pisa.ucsc.edu/class_search/index.php"
+    columns = ["Term", "Course Name", "Description", "Units", "Prerequisites"]
+    key_columns = ["Term", "Course Name"]
+    PAGE_SIZE = 100
+
+    def __init__(self, base_url=None, terms=4):
+        super().__init__(base_url)
+        self.terms = terms
+
+    def start_requests(self):
+        yield Request(self.base_url, 'parse_terms')
+
+    def results(self, term, start):
+        return Request(self.base_url, 'parse_results', method='POST', meta={'term': term, 'start': start}, data={
+            'action': 'results', 'binds[:term]': term, 'binds[:reg_status]': 'all', 'binds[:subject]': '',
+            'rec_start': str(start), 'rec_dur': str(self.PAGE_SIZE)})
+
+    def parse_terms(self, page):
+        soup = BeautifulSoup(page.text(), 'html.parser')
+        terms = [opt['value'] for opt in soup.select('#term_dropdown option') if opt.get('value')]
+        for term in terms[:self.terms]:
+            yield self.results(term, 0)
+
+    def parse_results(self, page):
+        soup = BeautifulSoup(page.text(), 'html.parser')
+        term = page.request.meta['term']
+        for link in soup.select("a[id^='class_id_']"):
+            if link.get('href'):
+                yield Request(urljoin(page.url, link['href']), 'parse_class', meta={'term': term})
+        next_link = soup.find('a', string='next')
+        if next_link is not None and 'disabled' not in (next_link.get('class') or []):
+            yield self.results(term, page.request.meta['start'] + self.PAGE_SIZE)
+
+    def parse_class(self, page):
+        soup = BeautifulSoup(page.text(), 'html.parser')
+        credits = soup.find('dt', string='Credits')
+        panels = {}
+        for panel in soup.select('div.panel.panel-default.row'):
+            heading = panel.select_one('div.panel-heading h2')
+            if heading is not None:
+                panels[element_text(heading)] = element_text(panel.select_one('div.panel-body'))
+        yield {
+            "Term": page.request.meta['term'],
+            "Course Name": element_text(soup.find('h2')),
+            "Description": next((v for k, v in panels.items() if 'Description' in k), "N/A"),
+            "Units": element_text(credits.find_next_sibling('dd')) if credits is not None else "N/A",
+            "Prerequisites": next((v for k, v in panels.items() if 'Enrollment Requirements' in k), "None"),
+        }
+
+
+class UCSBParser(CatalogParser):
+    """The coursedog JSON search behind catalog.ucsb.edu (UCSB_scraper_attempt.py), paged by `skip`."""
+    name = 'ucsb'
+    BASE_URL = "https://app.coursedog.com/api/v1/cm/ucsb/courses/search/%24filters"
+    columns = ['code', 'globalCourseTitle', 'longName', 'Units_Fixed', 'description']
+    key_columns = ['code']
+    PAGE_SIZE = 20
+    HEADERS = {'accept': 'application/json, text/plain, */*', 'origin': 'https://catalog.ucsb.edu',
+               'referer': 'https://catalog.ucsb.edu/courses', 'x-requested-with': 'catalog'}
+    FILTERS = {'condition': 'AND', 'filters': [{'filters': [
+        {'id': 'description-course', 'condition': 'field', 'name': 'description', 'inputType': 'text',
+         'group': 'course', 'type': 'isNotEmpty'}], 'id': 'HXkaROAK', 'condition': 'and'}]}
+
+    def start_requests(self):
+        yield self.search(0)
+
+    def search(self, skip):
+        params = {'catalogId': 'mZXlGvYb30h2fSq3aYLn', 'skip': str(skip), 'limit': str(self.PAGE_SIZE),
+                  'orderBy': 'code', 'formatDependents': 'false',
+                  'columns': 'displayName,description,name,courseNumber,subjectCode,code,longName,credits'}
+        return Request(self.base_url, 'parse_search', method='POST', params=params, json=self.FILTERS,
+                       headers=self.HEADERS, meta={'skip': skip})
+
+    def parse_search(self, page):
+        data = page.json().get('data', [])
+        if data:
+            yield self.search(page.request.meta['skip'] + self.PAGE_SIZE)
+        for d in data:
+            credits = d.get('credits') or {}
+            yield {
+                'code': d['code'],
+                'globalCourseTitle': d.get('globalCourseTitle', ''),
+                'longName': d.get('longName', ''),
+                'Units_Fixed': (credits.get('creditHours') or {}).get('min', ''),
+                'description': d.get('description', ''),
+            }
+
+
+PARSERS = {p.name: p for p in (UCSDParser, UCSCParser, UCSBParser)}
@@ -0,0 +1,29 @@
+import re
+
+#these functions help with cleaning the data while scraping it
+def extractUnits(title_text):
+    match = re.search(r"\((.*?)\)", title_text)
+    if not match:
+        return None, None
+    nums = re.findall(r"\d+", match.group(1))
+    if not nums:
+        return None, None
+    nums = [int(x) for x in nums]
+    if len(nums) == 1:
+        return nums[0], nums[0]
+    return nums[0], nums[-1]
+
+def extractCourseCodeTitle(title_text):
+    cleaned = re.sub(r"\(.*?\)", "", title_text).strip()
+    parts = cleaned.split(".", 1)
+    left = parts[0].strip()
+    title = parts[1].strip() if len(parts) > 1 else ""
+    if " " in left:
+        code = left.split(" ", 1)[1]
+    else:
+        code = ""
+    return code, title
+
+def extractPrereqs(text):
+    match = re.search(r"(Prereq[^.]*\.)", text, re.IGNORECASE)
+    return match.group(1).strip() if match else ""
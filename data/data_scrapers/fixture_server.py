@@ -0,0 +1,289 @@
+"""Local stand-in for the catalog sites, so the scrapers can run without the network.
+
+    python fixture_server.py [--port 8765] [--pages DIR] [--latency 0.05] [--fail-rate 0.05]
+
+Pages are rendered from the saved scrapes in data/uncleaned_data, in each
+site's markup:
+- UCSD: /front/courses.html and /courses/<SUBJ>.html, from ucsd_courses.csv.
+- UCSC: /class_search/index.php with its term list, POSTed result pages and
+  class detail pages, from ucsc_final_cleaned.csv.
+- UCSB: the coursedog JSON search at /api/v1/cm/ucsb/courses/search/$filters.
+  It serves the UCSD rows, since no UCSB scrape is saved.
+
+Files under --pages (saved catalog pages) are served as they are, by their
+relative path, and take precedence. --latency delays every response, and
+--fail-rate answers that share of requests with a 503 to exercise retries.
+
+Pages carry an ETag and a Last-Modified, and a GET with a matching
+If-None-Match (or, without one, an If-Modified-Since no older than the page)
+gets a 304. `site.validators = False` leaves them out, like a server that
+sends neither. `change_ucsd` edits the UCSD pages between two crawls.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uncleaned_data')
+UCSC_PAGE = '/class_search/index.php'
+UCSB_SEARCH = '/api/v1/cm/ucsb/courses/search/$filters'
+
+
+def _text(value):
+    return '' if pd.isna(value) else str(value)
+
+
+def _units(lo, hi):
+    if pd.isna(lo):
+        return ''
+    return f" ({int(lo)})" if lo == hi else f" ({int(lo)}–{int(hi)})"
+
+
+class FixtureSite:
+    """Pages by path (with query string), plus the POST endpoints of the UCSC and UCSB searches."""
+
+    def __init__(self):
+        self.pages = {}
+        self.stamps = {}  # path -> (ETag, Last-Modified), kept while the body stays the same
+        self.validators = True
+        self.ucsd = None
+        self.ucsc_terms = {}
+        self.ucsb_rows = []
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def put(self, path, body, content_type='text/html; charset=utf-8'):
+        body = body.encode() if isinstance(body, str) else body
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        with self.lock:
+            self.pages[path] = (content_type, body)
+            if self.stamps.get(path, (None,))[0] != etag:
+                self.stamps[path] = (etag, formatdate(time.time(), usegmt=True))
+
+    def get(self, path):
+        with self.lock:
+            return self.pages.get(path)
+
+    def not_modified(self, path, headers):
+        """Whether a GET of `path` with these request headers gets a 304."""
+        if not self.validators or path not in self.stamps:
+            return False
+        etag, last_modified = self.stamps[path]
+        if headers.get('If-None-Match'):
+            return etag in [t.strip() for t in headers['If-None-Match'].split(',')]
+        if headers.get('If-Modified-Since'):
+            try:
+                return parsedate_to_datetime(headers['If-Modified-Since']) >= parsedate_to_datetime(last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def remove(self, path):
+        with self.lock:
+            self.pages.pop(path, None)
+            self.stamps.pop(path, None)
+
+    def add_saved_pages(self, directory):
+        for root, _, files in os.walk(directory):
+            for name in files:
+                full = os.path.join(root, name)
+                kind = 'application/json' if name.endswith('.json') else 'text/html; charset=utf-8'
+                with open(full, 'rb') as f:
+                    self.put('/' + os.path.relpath(full, directory).replace(os.sep, '/'), f.read(), kind)
+
+    def subject_page(self, rows):
+        blocks = []
+        for _, r in rows.iterrows():
+            name = f"{r['Subject Code']} {_text(r['Course Code'])}. {_text(r['Title'])}{_units(r['Units Min'], r['Units Max'])}"
+            # on the live pages the prerequisites are the tail of the description
+            description = ' '.join(t for t in (_text(r['Description']), _text(r['Prerequisites'])) if t)
+            blocks.append(f'<p class="course-name">{html.escape(name)}</p>\n'
+                          f'<p class="course-descriptions">{html.escape(description)}</p>')
+        return '<html><body>\n' + '\n'.join(blocks) + '\n</body></html>'
+
+    def add_ucsd(self, df):
+        if self.ucsd is not None:
+            for code in set(self.ucsd['Subject Code']) - set(df['Subject Code']):
+                self.remove(f'/courses/{code}.html')
+        self.ucsd = df
+        links = []
+        for code, rows in df.groupby('Subject Code', sort=True):
+            links.append(f'<tr><td class="courseFacLink"><a href="../courses/{code}.html" '
+                         f'title="{html.escape(_text(rows["Subject"].iat[0]))}">courses</a></td></tr>')
+            self.put(f'/courses/{code}.html', self.subject_page(rows))
+        self.put('/front/courses.html', '<html><body><table>\n' + '\n'.join(links) + '\n</table></body></html>')
+
+    def add_ucsc(self, df):
+        options = ['<option value="">Select a term</option>']
+        for i, (term_name, rows) in enumerate(df.groupby('Term_Translated', sort=False)):
+            term = str(2230 - i)
+            options.append(f'<option value="{term}">{html.escape(term_name)}</option>')
+            ids = []
+            for n, (_, r) in enumerate(rows.iterrows()):
+                class_id = f"{term}-{n}"
+                panels = [('Description', _text(r['Description']))]
+                if _text(r['Prerequisites']):
+                    panels.append(('Enrollment Requirements', _text(r['Prerequisites'])))
+                body = ''.join(f'<div class="panel panel-default row"><div class="panel-heading panel-heading-custom">'
+                               f'<h2>{k}</h2></div><div class="panel-body">{html.escape(v)}</div></div>' for k, v in panels)
+                name = f"{r['Subject']} {r['Course Name']} - 01   {_text(r['Course_Title'])}"
+                self.put(f'{UCSC_PAGE}?action=detail&class_data={class_id}',
+                         f'<html><body><h2>{html.escape(name)}</h2>'
+                         f'<dl><dt>Credits</dt><dd>{html.escape(_text(r["Units"]))}</dd></dl>{body}</body></html>')
+                ids.append(class_id)
+            self.ucsc_terms[term] = ids
+        self.put(UCSC_PAGE, f'<html><body><select id="term_dropdown">{"".join(options)}</select></body></html>')
+
+    def change_ucsd(self, subjects=5, seed=0):
+        """Edits `subjects` random UCSD subject pages: one description changed, one course dropped and one added on
+        each, and the last of them removed from the index. Returns the subject codes touched."""
+        rng = random.Random(seed)
+        df = self.ucsd.copy()
+        codes = rng.sample(sorted(df['Subject Code'].unique()), subjects)
+        added = []
+        for code in codes[:-1]:
+            rows = df.index[df['Subject Code'] == code]
+            df.loc[rows[0], 'Description'] = _text(df.loc[rows[0], 'Description']) + ' (Revised.)'
+            if len(rows) > 1:
+                df = df.drop(rows[-1])
+            new = df.loc[rows[0]].copy()
+            new['Course Code'], new['Title'] = f"{rng.randint(300, 999)}X", 'New Course'
+            added.append(new)
+        df = pd.concat([df, pd.DataFrame(added)]).sort_index(kind='stable').reset_index(drop=True)
+        self.add_ucsd(df[df['Subject Code'] != codes[-1]])
+        return codes
+
+    def ucsc_results(self, form):
+        ids = self.ucsc_terms.get(form.get('binds[:term]', ''), [])
+        start, count = int(form.get('rec_start', 0)), int(form.get('rec_dur', 25))
+        links = ''.join(f'<a id="class_id_{i}" href="index.php?action=detail&class_data={c}">{c}</a>\n'
+                        for i, c in enumerate(ids[start:start + count], start))
+        more = '' if start + count < len(ids) else ' class="disabled"'
+        return f'<html><body>{links}<a href="#"{more}>next</a></body></html>'
+
+    def add_ucsb(self, df):
+        self.ucsb_rows = [{'code': f"{r['Subject Code']}{_text(r['Course Code'])}", 'longName': _text(r['Title']),
+                           'description': _text(r['Description']),
+                           'credits': {'creditHours': {'min': None if pd.isna(r['Units Min']) else int(r['Units Min'])}}}
+                          for _, r in df.iterrows()]
+
+    def ucsb_search(self, query):
+        skip, limit = int(query.get('skip', 0)), int(query.get('limit', 20))
+        return json.dumps({'data': self.ucsb_rows[skip:skip + limit]})
+
+
+def default_site(pages=None):
+    site = FixtureSite()
+    ucsd = pd.read_csv(os.path.join(DATA_DIR, 'ucsd_courses.csv'))
+    site.add_ucsd(ucsd)
+    site.add_ucsc(pd.read_csv(os.path.join(DATA_DIR, 'ucsc_final_cleaned.csv')))
+    site.add_ucsb(ucsd)
+    if pages:
+        site.add_saved_pages(pages)
+    return site
+
+
+def make_handler(site, latency=0.0, fail_rate=0.0, seed=0):
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=()):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != 'HEAD' and status != 304:
+                self.wfile.write(body)
+
+        def handle_request(self, form=None):
+            site.requests[self.path] += 1
+            if latency:
+                time.sleep(latency)
+            if fail_rate and rng.random() < fail_rate:
+                return self.send(503, b'busy')
+            url = urlsplit(self.path)
+            path = unquote(url.path)
+            if form is not None and path == UCSC_PAGE and form.get('action') == 'results':
+                return self.send(200, site.ucsc_results(form).encode())
+            if form is not None and path == UCSB_SEARCH:
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                return self.send(200, site.ucsb_search(query).encode(), 'application/json')
+            page = site.get(self.path) or site.get(url.path)
+            if page is None:
+                return self.send(404, b'not found')
+            content_type, body = page
+            key = self.path if site.get(self.path) is not None else url.path
+            stamp = site.stamps.get(key) if site.validators else None
+            headers = [('ETag', stamp[0]), ('Last-Modified', stamp[1])] if stamp else []
+            if self.command == 'GET' and site.not_modified(key, self.headers):
+                return self.send(304, b'', content_type, headers)
+            self.send(200, body, content_type, headers)
+
+        def do_GET(self):
+            self.handle_request()
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+            if 'json' in (self.headers.get('Content-Type') or ''):
+                form = json.loads(raw or '{}')
+            else:
+                form = {k: v[0] for k, v in parse_qs(raw, keep_blank_values=True).items()}
+            self.handle_request(form)
+
+    return Handler
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients that hang up mid-response (a crawl cut off on purpose) are not errors here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve(site, port=0, latency=0.0, fail_rate=0.0):
+    """Starts the server on a background thread; returns (server, 'http://127.0.0.1:port')."""
+    server = FixtureServer(('127.0.0.1', port), make_handler(site, latency, fail_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--pages', help="directory of saved catalog pages served by relative path")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    site = default_site(args.pages)
+    server, base = serve(site, args.port, args.latency, args.fail_rate)
+    print(f"Serving {len(site.pages)} pages on {base}")
+    print(f"  UCSD: {base}/front/courses.html  UCSC: {base}{UCSC_PAGE}  UCSB: {base}{UCSB_SEARCH}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Resumable, incremental crawls on top of scrape_engine.py.
+
+The crawl state is one SQLite file per catalog. For every request it holds
+the page's ETag, Last-Modified and content hash, plus what parsing it gave:
+the follow-up requests and the course rows (keyed by the page and the
+parser's `key_columns`, so a course listed on two pages is kept for each,
+as a full crawl would write it). A recrawl sends If-None-Match / If-Modified-Since. On a 304,
+or a 200 whose body hashes the same, the page is not parsed: its stored
+follow-up requests are queued again and its rows stay as they are.
+
+Every page is one unit of work. Its state update, its rows, the requests it
+queues and the removal of the request from the queue commit in one
+transaction. A crawl that dies resumes from the queue left in the file.
+
+When the queue is empty, rows of pages that were not reached any more are
+dropped. The rows are then compared with the copy taken when the run started,
+which gives the run's delta: added, changed and removed courses. Rows are
+read back by page and then in page order, so a page that did not change
+keeps its place in the output.
+"""
+import asyncio
+import csv
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from scrape_engine import FetchError, Fetcher, Request
+
+STATE_VERSION = '2'
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS pages (request_key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,
+                                  hash TEXT, children TEXT, seen_run INTEGER);
+CREATE TABLE IF NOT EXISTS rows (request_key TEXT, course_key TEXT, hash TEXT, row TEXT,
+                                 PRIMARY KEY (request_key, course_key));
+CREATE TABLE IF NOT EXISTS baseline (request_key TEXT, course_key TEXT, hash TEXT, row TEXT);
+CREATE TABLE IF NOT EXISTS queue (request_key TEXT PRIMARY KEY, request TEXT, done INTEGER DEFAULT 0);
+"""
+
+
+def request_key(request):
+    return json.dumps([request.method, request.url, request.params, request.data, request.json], sort_keys=True)
+
+
+def row_hash(row):
+    return hashlib.blake2b(json.dumps(row, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def course_keys(rows, key_columns):
+    """(key, row) pairs; a key repeated on one page gets a '#n' suffix from its second row on."""
+    seen = {}
+    for row in rows:
+        course_key = json.dumps([str(row.get(c, '')) for c in key_columns])
+        seen[course_key] = seen.get(course_key, 0) + 1
+        if seen[course_key] > 1:
+            course_key += f"#{seen[course_key]}"
+        yield course_key, row
+
+
+def by_course(pairs):
+    """course key -> the distinct hashes of its rows on all the pages it is on, and one of its rows."""
+    hashes, rows = defaultdict(list), {}
+    for course_key, h, row in pairs:
+        hashes[course_key].append(h)
+        rows.setdefault(course_key, row)
+    return {k: sorted(set(v)) for k, v in hashes.items()}, rows
+
+
+class CrawlState:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        version = self.get_meta('version')
+        if version is None and self.get_meta('run') is None:
+            self.set_meta('version', STATE_VERSION)
+        elif version != STATE_VERSION:
+            raise ValueError(f"{path} was written by an older recrawl.py; delete it to crawl from scratch")
+        self.db.commit()
+
+    def get_meta(self, name, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, str(value)))
+
+    def begin_run(self, start_requests):
+        """(run number, resumed): a new run copies the rows as its baseline and queues `start_requests`."""
+        run = int(self.get_meta('run', 0))
+        if self.get_meta('state') == 'running':
+            return run, True
+        run += 1
+        with self.db:
+            self.db.execute("DELETE FROM baseline")
+            self.db.execute("INSERT INTO baseline SELECT request_key, course_key, hash, row FROM rows")
+            self.db.execute("DELETE FROM queue")
+            for request in start_requests:
+                self.enqueue(request)
+            self.set_meta('run', run)
+            self.set_meta('state', 'running')
+            self.set_meta('started', time.strftime('%Y-%m-%d %H:%M:%S'))
+        return run, False
+
+    def enqueue(self, request):
+        """Whether `request` is new to this run's queue."""
+        return self.db.execute("INSERT OR IGNORE INTO queue (request_key, request) VALUES (?, ?)",
+                               (request_key(request), json.dumps(dataclasses.asdict(request)))).rowcount == 1
+
+    def pending(self):
+        return [Request(**json.loads(r)) for r, in self.db.execute("SELECT request FROM queue WHERE done = 0")]
+
+    def page(self, key):
+        return self.db.execute("SELECT etag, last_modified, hash, children FROM pages WHERE request_key = ?",
+                               (key,)).fetchone()
+
+    def checkpoint(self, run, request, page, body_hash, children, rows, key_columns):
+        """Commits one unit of work and returns the children new to the queue; `rows` is None when the page was unchanged."""
+        key = request_key(request)
+        with self.db:
+            headers = page.headers if page.status != 304 else {}
+            self.db.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (request_key) DO UPDATE SET "
+                "etag = coalesce(excluded.etag, etag), last_modified = coalesce(excluded.last_modified, last_modified), "
+                "hash = excluded.hash, children = excluded.children, seen_run = excluded.seen_run",
+                (key, request.url, headers.get('ETag'), headers.get('Last-Modified'), body_hash,
+                 json.dumps([dataclasses.asdict(c) for c in children]), run))
+            if rows is not None:
+                self.db.execute("DELETE FROM rows WHERE request_key = ?", (key,))
+                for course_key, row in course_keys(rows, key_columns):
+                    self.db.execute("INSERT INTO rows VALUES (?, ?, ?, ?)",
+                                    (key, course_key, row_hash(row), json.dumps(row, default=str)))
+            queued = [child for child in children if self.enqueue(child)]
+            self.db.execute("UPDATE queue SET done = 1 WHERE request_key = ?", (key,))
+        return queued
+
+    def finish_run(self, run, prune=True):
+        """Drops pages not reached this run (when `prune`) and returns the delta against the baseline."""
+        with self.db:
+            if prune:
+                self.db.execute("DELETE FROM rows WHERE request_key IN "
+                                "(SELECT request_key FROM pages WHERE seen_run < ?)", (run,))
+                self.db.execute("DELETE FROM pages WHERE seen_run < ?", (run,))
+            self.set_meta('state', 'finished')
+            self.set_meta('finished', time.strftime('%Y-%m-%d %H:%M:%S'))
+        # a course is compared over all the pages it is on, so moving between pages is not a change,
+        # and neither is the same row being listed on one page more or less
+        new, new_rows = by_course(self.db.execute("SELECT course_key, hash, row FROM rows"))
+        old, old_rows = by_course(self.db.execute("SELECT course_key, hash, row FROM baseline"))
+        delta = []
+        for course_key in sorted(new.keys() | old.keys()):
+            if new.get(course_key) == old.get(course_key):
+                continue
+            op = 'added' if course_key not in old else 'removed' if course_key not in new else 'changed'
+            delta.append({'op': op, 'key': json.loads(course_key.split('#')[0]),
+                          'row': json.loads(new_rows.get(course_key) or old_rows[course_key])})
+        return delta
+
+    def rows(self):
+        # a page's rows are rewritten together, in page order, only when it changes
+        return [json.loads(r) for r, in self.db.execute("SELECT row FROM rows ORDER BY request_key, rowid")]
+
+
+class Recrawler:
+    """Crawler that asks for pages conditionally, skips unchanged ones and checkpoints every page."""
+
+    def __init__(self, parser, fetcher, state, workers=16, max_pages=None):
+        self.parser = parser
+        self.fetcher = fetcher
+        self.state = state
+        self.workers = workers
+        self.max_pages = max_pages  # stop after this many pages, as if the crawl had died
+        self.pages = self.unchanged = self.not_modified = 0
+        self.failed = []
+
+    def conditional(self, request, known):
+        if known is None:
+            return request
+        etag, last_modified = known[0], known[1]
+        headers = dict(request.headers or {})
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return dataclasses.replace(request, headers=headers)
+
+    async def run(self):
+        self.run_id, self.resumed = self.state.begin_run(self.parser.start_requests())
+        queue = asyncio.Queue()
+        for request in self.state.pending():
+            queue.put_nowait(request)
+        self.stopped = asyncio.Event()
+        tasks = [asyncio.create_task(self._work(queue)) for _ in range(self.workers)]
+        done = asyncio.create_task(queue.join())
+        try:
+            await asyncio.wait([done, asyncio.create_task(self.stopped.wait())], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.complete = done.done() and not self.stopped.is_set()
+        done.cancel()
+        # a failed page hides whatever it links to, so nothing counts as gone after a failure
+        self.delta = self.state.finish_run(self.run_id, prune=not self.failed) if self.complete else None
+        return self
+
+    async def _work(self, queue):
+        while True:
+            request = await queue.get()
+            try:
+                if self.stopped.is_set() or (self.max_pages is not None and self.pages >= self.max_pages):
+                    # left undone in the state file for the resumed run
+                    self.stopped.set()
+                    continue
+                known = self.state.page(request_key(request))
+                page = await self.fetcher.fetch(self.conditional(request, known))
+                self.pages += 1
+                if page.status == 304:
+                    if known is None:
+                        # nothing was sent to be compared against, so there is no copy to keep
+                        raise FetchError(f"{request.method} {request.url} returned 304 to an unconditional request")
+                    self.not_modified += 1
+                    body_hash, rows = known[2], None
+                    children = [Request(**c) for c in json.loads(known[3])]
+                elif page.status >= 400:
+                    raise FetchError(f"{request.method} {request.url} returned HTTP {page.status}")
+                else:
+                    body_hash = hashlib.blake2b(page.body, digest_size=16).hexdigest()
+                    if known is not None and known[2] == body_hash:
+                        self.unchanged += 1
+                        rows, children = None, [Request(**c) for c in json.loads(known[3])]
+                    else:
+                        out = list(getattr(self.parser, request.callback)(page))
+                        children = [o for o in out if isinstance(o, Request)]
+                        rows = [o for o in out if not isinstance(o, Request)]
+                queued = self.state.checkpoint(self.run_id, request, page, body_hash, children, rows,
+                                               self.parser.key_columns)
+                for child in queued:
+                    queue.put_nowait(child)
+            except Exception as e:
+                self.failed.append((request_key(request), str(e)))
+                print(f"Error: {e}")
+            finally:
+                queue.task_done()
+
+
+def write_delta(path, delta):
+    with open(path, 'w', encoding='utf-8') as f:
+        for change in delta:
+            f.write(json.dumps(change, ensure_ascii=False) + '\n')
+
+
+def write_rows(path, rows, columns):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+async def recrawl(parser, state_path, workers=16, policy=None, retries=4, max_pages=None):
+    state = CrawlState(state_path)
+    policies = {urlsplit(parser.base_url).netloc: policy or parser.host_policy}
+    async with Fetcher(policies, retries=retries) as fetcher:
+        crawler = await Recrawler(parser, fetcher, state, workers, max_pages).run()
+    return crawler, fetcher, state
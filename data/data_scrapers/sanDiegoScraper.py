@@ -4,39 +4,12 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import time
-import re
 import pandas as pd
 from urllib.parse import urlparse
 
-BASE_URL = "https://catalog.ucsd.edu/front/courses.html"
+from catalog_helpers import extractUnits, extractCourseCodeTitle, extractPrereqs
 
-#these functions help with cleaning the data while scraping it
-def extractUnits(title_text):
-    match = re.search(r"\((.*?)\)", title_text)
-    if not match:
-        return None, None
-    nums = re.findall(r"\d+", match.group(1))
-    if not nums:
-        return None, None
-    nums = [int(x) for x in nums]
-    if len(nums) == 1:
-        return nums[0], nums[0]
-    return nums[0], nums[-1]
-
-def extractCourseCodeTitle(title_text):
-    cleaned = re.sub(r"\(.*?\)", "", title_text).strip()
-    parts = cleaned.split(".", 1)
-    left = parts[0].strip()
-    title = parts[1].strip() if len(parts) > 1 else ""
-    if " " in left:
-        code = left.split(" ", 1)[1]
-    else:
-        code = ""
-    return code, title
-
-def extractPrereqs(text):
-    match = re.search(r"(Prereq[^.]*\.)", text, re.IGNORECASE)
-    return match.group(1).strip() if match else ""
+BASE_URL = "https://catalog.ucsd.edu/front/courses.html"
 
 #main scraping function
 def scrape_ucsd_courses():
@@ -0,0 +1,69 @@
+"""Scrape a campus catalog with the asyncio engine, writing rows as they are parsed.
+
+    python scrape_catalog.py ucsd [--out ucsd_courses.csv] [--base-url URL] [--workers 16]
+                                  [--concurrency 4] [--rate 4] [--retries 4]
+                                  [--state ucsd.crawl.sqlite [--delta ucsd_delta.jsonl]]
+
+Campuses are the parsers in campus_parsers.PARSERS (ucsd, ucsc, ucsb). --base-url
+points the parser somewhere else than the live catalog, e.g. fixture_server.py:
+
+    python scrape_catalog.py ucsd --base-url http://127.0.0.1:8765/front/courses.html
+
+With --state the crawl is incremental and resumable (recrawl.py): unchanged
+pages are skipped, a crawl that was cut off picks up where it stopped, and
+the courses added, changed or removed since the last run go to --delta.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from campus_parsers import PARSERS
+from recrawl import recrawl, write_delta, write_rows
+from scrape_engine import HostPolicy, crawl
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('campus', choices=sorted(PARSERS))
+    parser.add_argument('--out', help="output .csv or .jsonl (default <campus>_courses.csv)")
+    parser.add_argument('--base-url', help="start URL instead of the live catalog")
+    parser.add_argument('--workers', type=int, default=16, help="requests in flight across hosts")
+    parser.add_argument('--concurrency', type=int, help="requests in flight per host")
+    parser.add_argument('--rate', type=float, help="requests per second per host (0 = no limit)")
+    parser.add_argument('--retries', type=int, default=4)
+    parser.add_argument('--state', help="SQLite crawl state; recrawls only what changed and resumes cut-off runs")
+    parser.add_argument('--delta', help="with --state: .jsonl of the courses added/changed/removed this run "
+                                        "(default <campus>_delta.jsonl)")
+    args = parser.parse_args()
+
+    campus = PARSERS[args.campus](args.base_url)
+    policy = campus.host_policy
+    if args.concurrency is not None or args.rate is not None:
+        policy = HostPolicy(args.concurrency or policy.concurrency, policy.rate if args.rate is None else args.rate,
+                            args.concurrency or policy.burst)
+    out = args.out or f"{args.campus}_courses.csv"
+
+    t0 = time.perf_counter()
+    if args.state:
+        crawler, fetcher, state = asyncio.run(recrawl(campus, args.state, args.workers, policy, args.retries))
+        if not crawler.complete:
+            print(f"Crawl stopped early; run again to resume from {args.state}")
+            return
+        rows = state.rows()
+        write_rows(out, rows, campus.columns)
+        delta = args.delta or f"{args.campus}_delta.jsonl"
+        write_delta(delta, crawler.delta)
+        ops = Counter(change['op'] for change in crawler.delta)
+        print(f"\nRun {crawler.run_id}{' (resumed)' if crawler.resumed else ''}: {len(rows)} courses saved to {out}; "
+              f"{ops['added']} added, {ops['changed']} changed, {ops['removed']} removed -> {delta}")
+        print(f"{crawler.not_modified} pages not modified (304), {crawler.unchanged} unchanged by hash")
+    else:
+        crawler, fetcher = asyncio.run(crawl(campus, out, args.workers, policy, args.retries))
+        print(f"\nCourses Scraped: {crawler.rows}, Saved to: {out}")
+    print(f"{crawler.pages} pages, {fetcher.requests} requests ({fetcher.retried} retries), "
+          f"{fetcher.bytes >> 10} KB in {time.perf_counter() - t0:.1f}s; {len(crawler.failed)} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Shared asyncio engine for the catalog scrapers (needs aiohttp).
+
+All requests go through one aiohttp session, so connections are pooled and
+reused. Each host gets its own concurrency limit and request rate (a token
+bucket). A 429, a 5xx or a connection error is retried with exponential
+backoff and jitter, or after Retry-After when the server sends it.
+
+A campus parser (see campus_parsers.py) starts with a few Requests. Each
+Request names the parser method that handles its page, and that method yields
+course rows (dicts) and further Requests. Rows go to the sink as soon as they
+are parsed, so output grows while the crawl runs.
+"""
+import asyncio
+import csv
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class Request:
+    url: str
+    callback: str
+    method: str = 'GET'
+    params: dict = None
+    data: dict = None
+    json: object = None
+    headers: dict = None
+    meta: dict = field(default_factory=dict)
+
+
+@dataclass
+class Page:
+    request: Request
+    url: str
+    status: int
+    headers: dict
+    body: bytes
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+
+@dataclass
+class HostPolicy:
+    concurrency: int = 4
+    rate: float = 4.0  # requests per second, 0 for no limit
+    burst: int = 4
+
+
+class FetchError(Exception):
+    pass
+
+
+class HostLimiter:
+    def __init__(self, policy):
+        self.semaphore = asyncio.Semaphore(policy.concurrency)
+        self.rate = policy.rate
+        self.capacity = max(policy.burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_after(page):
+    value = page.headers.get('Retry-After') if page is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class Fetcher:
+    """Pooled HTTP client with per-host limits and retries. Use as `async with Fetcher(...) as fetcher`."""
+
+    def __init__(self, policies=None, default=None, retries=4, backoff=0.5, max_backoff=30.0, timeout=30.0,
+                 pool_size=64, headers=None):
+        self.policies = policies or {}
+        self.default = default or HostPolicy()
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.headers = headers or {'User-Agent': 'UC-Course-Network catalog scraper'}
+        self.limiters = {}
+        self.session = None
+        self.requests = self.retried = self.bytes = 0
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size),
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout), headers=self.headers)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def limiter(self, host):
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.policies.get(host, self.default))
+        return self.limiters[host]
+
+    async def fetch(self, request):
+        """The Page for `request`; FetchError once retries are used up."""
+        limiter = self.limiter(urlsplit(request.url).netloc)
+        page = error = None
+        for attempt in range(self.retries + 1):
+            async with limiter.semaphore:
+                await limiter.wait_turn()
+                self.requests += 1
+                try:
+                    async with self.session.request(request.method, request.url, params=request.params,
+                                                    data=request.data, json=request.json,
+                                                    headers=request.headers) as resp:
+                        body = await resp.read()
+                        page, error = Page(request, str(resp.url), resp.status, dict(resp.headers), body), None
+                        self.bytes += len(body)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    page, error = None, e
+            if page is not None and page.status not in RETRY_STATUS:
+                return page
+            if attempt == self.retries:
+                break
+            self.retried += 1
+            # back off outside the semaphore, so the slot goes to other requests meanwhile
+            delay = retry_after(page)
+            if delay is None:
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+            await asyncio.sleep(delay)
+        reason = f"HTTP {page.status}" if page is not None else f"{type(error).__name__}: {error}"
+        raise FetchError(f"{request.method} {request.url} failed after {self.retries + 1} attempts ({reason})")
+
+
+class CsvSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    def __init__(self, path, columns=None):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, row):
+        self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def open_sink(path, columns):
+    return JsonlSink(path) if path.endswith('.jsonl') else CsvSink(path, columns)
+
+
+class Crawler:
+    """Runs a parser's requests on `workers` tasks and streams its rows to `sink`."""
+
+    def __init__(self, parser, fetcher, sink, workers=16):
+        self.parser = parser
+        self.fetcher = fetcher
+        self.sink = sink
+        self.workers = workers
+        self.rows = self.pages = 0
+        self.failed = []
+
+    async def run(self):
+        queue = asyncio.Queue()
+        for request in self.parser.start_requests():
+            queue.put_nowait(request)
+        tasks = [asyncio.create_task(self._work(queue)) for _ in range(self.workers)]
+        try:
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return self
+
+    async def _work(self, queue):
+        while True:
+            request = await queue.get()
+            try:
+                page = await self.fetcher.fetch(request)
+                self.pages += 1
+                if page.status >= 400:
+                    raise FetchError(f"{request.method} {request.url} returned HTTP {page.status}")
+                for out in getattr(self.parser, request.callback)(page):
+                    if isinstance(out, Request):
+                        queue.put_nowait(out)
+                    else:
+                        self.sink.write(out)
+                        self.rows += 1
+            except Exception as e:
+                self.failed.append((request.url, str(e)))
+                print(f"Error: {e}")
+            finally:
+                queue.task_done()
+
+
+async def crawl(parser, out, workers=16, policy=None, retries=4):
+    policies = {urlsplit(parser.base_url).netloc: policy or parser.host_policy}
+    sink = open_sink(out, parser.columns)
+    try:
+        async with Fetcher(policies, retries=retries) as fetcher:
+            crawler = await Crawler(parser, fetcher, sink, workers).run()
+    finally:
+        sink.close()
+    return crawler, fetcher
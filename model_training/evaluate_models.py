@@ -0,0 +1,257 @@
+"""Model comparison from Model_Testing.ipynb as one reproducible command.
+
+    python model_training/evaluate_models.py [--models bge-base-en-v1.5,mpnet] [--variants full,dim256,int8]
+                                             [--processes 2] [--cache model_training/encode_cache]
+                                             [--out model_training/model_results] [--cost-weight 0.05]
+
+Every model encodes the distinct course texts of evaluation.csv on the CPU in
+its own worker process, so the peak RSS of that process is the model's memory
+cost. Encodings are cached on disk per (model, max_seq_length, text hash), so a
+rerun only encodes texts it has not seen and reports the throughput measured
+when they were encoded.
+
+Each model is scored as is ("full") and as every --variants entry: "dimN"
+keeps the first N dimensions, "int8"/"float16" are the quantized store's codes
+(embedding_store.quantize), "binary" keeps the signs, and "dimN+int8" chains
+them. Metrics match the notebook: spearman, AUC, T1/T2 by Youden's J,
+acc_equiv, acc_similar and mean similarity per label.
+
+The leaderboard ranks by `weighted` = metric - cost_weight * log2(cost), where
+cost is the geometric mean of encode time per text and serving memory (peak
+RSS plus the catalog's vectors at that variant's size), each relative to the
+cheapest row. Each doubling of cost has to buy cost_weight of the metric.
+`pareto` marks rows no other row beats on both metric and cost.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import spearmanr
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score, roc_curve
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(REPO_DIR, 'backend'))
+from embedding_store import quantize  # noqa: E402
+
+MODELS = {
+    "bge-base-en-v1.5": "BAAI/bge-base-en-v1.5",
+    "e5-large-v2": "intfloat/e5-large-v2",
+    "gte-base-en-v1.5": "Alibaba-NLP/gte-base-en-v1.5",
+    "mpnet": "sentence-transformers/all-mpnet-base-v2",
+    "embeddinggemma-300m": "google/embeddinggemma-300m",
+    "jina-v3": "jinaai/jina-embeddings-v3"
+}
+CATALOG_ROWS = 15390  # rows of combined_CLEAN.csv the server keeps vectors for
+
+
+def load_pairs(path):
+    df = pd.read_csv(path)
+    for col in ["Course A Title", "Course A Description", "Course B Title", "Course B Description"]:
+        df[col] = df[col].fillna("").astype(str)
+    text_A = (df["Course A Title"] + ". " + df["Course A Description"]).tolist()
+    text_B = (df["Course B Title"] + ". " + df["Course B Description"]).tolist()
+    labels = df["Match Label"].fillna(0).astype(int).values
+    return text_A, text_B, labels
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def cache_path(cache_dir, model_path, max_seq_length):
+    return os.path.join(cache_dir, f"{model_path.replace('/', '_')}.{max_seq_length}.npz")
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}, {"encoded": 0, "seconds": 0.0, "peak_rss_mb": 0.0}
+    with np.load(path) as f:
+        vectors = dict(zip((k.tobytes() for k in f['keys']), f['vectors']))
+        return vectors, json.loads(str(f['meta']))
+
+
+def save_cache(path, vectors, meta):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    keys = list(vectors)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, keys=np.frombuffer(b''.join(keys), dtype=np.uint8).reshape(len(keys), 16),
+             vectors=np.stack([vectors[k] for k in keys]), meta=np.array(json.dumps(meta)))
+    os.replace(tmp, path)
+
+
+def encode_model(model_path, texts, cache_dir, batch_size, max_seq_length, threads):
+    """(vectors in `texts` order, cache meta). Runs in a fresh worker process per model."""
+    path = cache_path(cache_dir, model_path, max_seq_length)
+    vectors, meta = load_cache(path)
+    todo = list(dict.fromkeys(t for t in texts if text_key(t) not in vectors))
+    if todo:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(model_path, device='cpu', trust_remote_code=True)
+        model.max_seq_length = max_seq_length
+        t0 = time.perf_counter()
+        encoded = model.encode(todo, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        meta["seconds"] += time.perf_counter() - t0
+        meta["encoded"] += len(todo)
+        # ru_maxrss is KiB on Linux
+        meta["peak_rss_mb"] = max(meta["peak_rss_mb"], resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        vectors.update(zip((text_key(t) for t in todo), np.asarray(encoded, dtype=np.float32)))
+        save_cache(path, vectors, meta)
+    return np.stack([vectors[text_key(t)] for t in texts]), dict(meta, new=len(todo))
+
+
+def normalize(m):
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+def variant_scores(variant, emb_A, emb_B):
+    """(cosine similarity per pair, dims, bytes per stored vector) of `variant`."""
+    A, B = normalize(emb_A), normalize(emb_B)
+    dim, bytes_per_value, extra = A.shape[1], 4, 0
+    for step in variant.split('+'):
+        if step == 'full':
+            continue
+        if step.startswith('dim'):
+            dim = min(int(step[3:]), dim)
+            A, B = normalize(A[:, :dim]), normalize(B[:, :dim])
+        elif step in ('int8', 'float16'):
+            (a, sa), (b, sb) = quantize(A, step), quantize(B, step)
+            A, B = normalize(a.astype(np.float32) * sa[:, None]), normalize(b.astype(np.float32) * sb[:, None])
+            bytes_per_value, extra = (1, 4) if step == 'int8' else (2, 0)
+        elif step == 'binary':
+            A, B = normalize(np.where(A > 0, 1.0, -1.0)), normalize(np.where(B > 0, 1.0, -1.0))
+            bytes_per_value, extra = 1 / 8, 0
+        else:
+            raise ValueError(f"Unknown variant step {step!r}")
+    return (A * B).sum(axis=1), dim, int(np.ceil(dim * bytes_per_value)) + extra
+
+
+def optimal_threshold(y_true, y_scores):
+    fpr, tpr, thresh = roc_curve(y_true, y_scores)
+    J = tpr - fpr
+    return thresh[np.argmax(J)]
+
+
+def evaluate(similarity_scores, labels):
+    """The notebook's evaluate_model metrics for one set of pair similarities."""
+    spearman_corr, _ = spearmanr(similarity_scores, labels)
+    auc = roc_auc_score((labels > 0).astype(int), similarity_scores)
+
+    T2 = optimal_threshold((labels == 2).astype(int), similarity_scores)
+    T1 = optimal_threshold((labels > 0).astype(int), similarity_scores)
+
+    pred = np.zeros_like(similarity_scores)
+    pred[similarity_scores >= T2] = 2
+    pred[(similarity_scores >= T1) & (similarity_scores < T2)] = 1
+    pred[similarity_scores < T1] = 0
+
+    return {
+        "scores": similarity_scores,
+        "pred": pred,
+        "true": labels,
+        "T1": T1,
+        "T2": T2,
+        "spearman": spearman_corr,
+        "auc": auc,
+        "acc_equiv": accuracy_score((labels == 2), (pred == 2)),
+        "acc_similar": accuracy_score((labels > 0), (pred > 0)),
+        "mean_simi_2": float(np.mean(similarity_scores[labels == 2])),
+        "mean_simi_1": float(np.mean(similarity_scores[labels == 1])),
+        "mean_simi_0": float(np.mean(similarity_scores[labels == 0])),
+        "confusion_matrix": confusion_matrix(labels, pred),
+        "classification_report": classification_report(labels, pred, output_dict=True, zero_division=0)
+    }
+
+
+def leaderboard(results, metric, cost_weight, catalog_rows):
+    board = pd.DataFrame([{"model": res["model"],
+                           "variant": res["variant"],
+                           "spearman": res["spearman"],
+                           "auc": res["auc"],
+                           "equiv_acc": res["acc_equiv"],
+                           "similar_acc": res["acc_similar"],
+                           "mean_simi_2": res["mean_simi_2"],
+                           "mean_simi_1": res["mean_simi_1"],
+                           "mean_simi_0": res["mean_simi_0"],
+                           "equiv_thr": res["T2"],
+                           "similar_thr": res["T1"],
+                           "dim": res["dim"],
+                           "bytes_per_vec": res["bytes_per_vec"],
+                           "texts_per_sec": res["texts_per_sec"],
+                           "peak_rss_mb": res["peak_rss_mb"]} for res in results.values()])
+    board["serving_mb"] = board["peak_rss_mb"] + board["bytes_per_vec"] * catalog_rows / 2**20
+    encode_cost = (1 / board["texts_per_sec"]) / (1 / board["texts_per_sec"]).min()
+    memory_cost = board["serving_mb"] / board["serving_mb"].min()
+    board["cost"] = np.sqrt(encode_cost * memory_cost)
+    board["weighted"] = board[metric] - cost_weight * np.log2(board["cost"])
+    quality, cost = board[metric].to_numpy(), board["cost"].to_numpy()
+    board["pareto"] = [not np.any((quality >= q) & (cost <= c) & ((quality > q) | (cost < c)))
+                       for q, c in zip(quality, cost)]
+    return board.sort_values(by="weighted", ascending=False).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', default=os.path.join(REPO_DIR, 'data', 'cleaned_data', 'evaluation.csv'))
+    parser.add_argument('--models', default=','.join(MODELS), help="comma separated names from MODELS or hub paths")
+    parser.add_argument('--variants', default='full,float16,int8,dim256,dim256+int8,binary')
+    parser.add_argument('--processes', type=int, default=1, help="models encoded at once, CPUs split between them")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--max-seq-length', type=int, default=384)
+    parser.add_argument('--cache', default=os.path.join(HERE, 'encode_cache'))
+    parser.add_argument('--out', default=os.path.join(HERE, 'model_results'))
+    parser.add_argument('--metric', default='spearman', choices=['spearman', 'auc', 'equiv_acc', 'similar_acc'])
+    parser.add_argument('--cost-weight', type=float, default=0.05, help="metric given up per doubling of cost")
+    parser.add_argument('--catalog-rows', type=int, default=CATALOG_ROWS)
+    args = parser.parse_args()
+
+    text_A, text_B, labels = load_pairs(args.pairs)
+    texts = list(dict.fromkeys(text_A + text_B))
+    position = {t: i for i, t in enumerate(texts)}
+    rows_A, rows_B = [position[t] for t in text_A], [position[t] for t in text_B]
+    models = {name: MODELS.get(name, name) for name in args.models.split(',')}
+    variants = args.variants.split(',')
+    if 'full' not in variants:
+        variants.insert(0, 'full')
+    print(f"{len(labels)} pairs, {len(texts)} distinct texts, {len(models)} models, variants {', '.join(variants)}")
+
+    threads = max(1, (os.cpu_count() or 1) // args.processes)
+    results = {}
+    # one task per worker process, so every model's peak RSS is its own
+    with ProcessPoolExecutor(args.processes, max_tasks_per_child=1) as pool:
+        jobs = {name: pool.submit(encode_model, path, texts, args.cache, args.batch_size, args.max_seq_length, threads)
+                for name, path in models.items()}
+        for name, job in jobs.items():
+            embeddings, meta = job.result()
+            tps = meta["encoded"] / meta["seconds"] if meta["seconds"] else float('nan')
+            print(f"{name}: {meta['new']} texts encoded, {len(texts) - meta['new']} cached, "
+                  f"{tps:.1f} texts/s, peak RSS {meta['peak_rss_mb']:.0f} MB")
+            for variant in variants:
+                scores, dim, nbytes = variant_scores(variant, embeddings[rows_A], embeddings[rows_B])
+                key = name if variant == 'full' else f"{name}:{variant}"
+                results[key] = dict(evaluate(scores, labels), model=name, variant=variant, dim=dim,
+                                    bytes_per_vec=nbytes, texts_per_sec=tps, peak_rss_mb=meta["peak_rss_mb"])
+
+    board = leaderboard(results, args.metric, args.cost_weight, args.catalog_rows)
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "model_results.pkl"), "wb") as f:
+        pickle.dump(results, f)
+    board.to_csv(os.path.join(args.out, "leaderboard.csv"), index=False)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(board[["model", "variant", args.metric, "auc", "texts_per_sec", "serving_mb", "cost", "weighted", "pareto"]]
+              .to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    print(f"Wrote {args.out}/leaderboard.csv and model_results.pkl")
+
+
+if __name__ == '__main__':
+    main()